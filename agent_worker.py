@@ -1,47 +1,312 @@
-from PySide6.QtCore import QObject, Signal, QProcess
+from PySide6.QtCore import QObject, Signal, QProcess, QTimer
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import count
+from typing import Dict, List, Optional
+import codecs
+import heapq
 import json
+import time
+
+from cli_pool import WarmProcessPool
+from instrumentation import get_tracer
+from resilience import ConcurrencyLimit, Failure, RATE_LIMITED, ResilienceStats, RetryPolicy, classify_failure
+
+# Request priorities, lower values are started first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+@dataclass
+class AgentRequest:
+    id: int
+    prompt: str
+    priority: int = INTERACTIVE
+    session_id: Optional[int] = None
+    process: Optional[QProcess] = None
+    decoder: Optional[codecs.IncrementalDecoder] = None
+    chunks: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    cancelled: bool = False
+    attempt: int = 0  # 1 for the first run, counting up with retries
+    started_at: float = 0.0  # time.monotonic() when the current attempt was launched
+    timer: Optional[QTimer] = None  # Fires when the current attempt times out
+    timed_out: bool = False
+    failures: List[Failure] = field(default_factory=list)  # Of earlier attempts
 
 class AgentWorker(QObject):
     """
-    Handles asynchronous communication with the Gemini CLI using QProcess
+    Handles asynchronous communication with the Gemini CLI using QProcess.
+
+    Prompts are tagged with a request ID and scheduled onto a bounded number
+    of concurrent CLI processes; the rest wait in a priority-ordered FIFO
+    backlog. All signals carry the request ID so callers can route results.
+    With ``warm_pool_size`` set, prompts are written to pre-started processes
+    from a WarmProcessPool whenever one is ready.
+
+    Failed runs are classified from their exit code and stderr; rate
+    limits, transient errors and runs that stop producing output for the
+    policy's timeout are retried with jittered
+    exponential backoff per the RetryPolicy, unless output was already
+    streamed to the caller. Rate limits also halve the number of concurrent
+    processes, which grows back towards ``max_concurrent`` with successes.
     """
-    response_ready = Signal(str)  # Emitted when Gemini response is ready
-    error_occurred = Signal(str)  # Emitted when an error occurs
+    request_queued = Signal(int)  # Emitted when a request enters the backlog
+    request_started = Signal(int)  # Emitted when a request's process is launched
+    response_ready = Signal(int, str)  # Emitted when Gemini response is ready
+    chunk_received = Signal(int, str)  # Emitted with each partial piece of output while streaming
+    error_occurred = Signal(int, str)  # Emitted when an error occurs
+    request_cancelled = Signal(int)  # Emitted when a request is cancelled
+    request_retrying = Signal(int, int, int, str)  # Request ID, next attempt, delay in ms, failure
 
-    def __init__(self):
+    def __init__(self, cli_path: str = "gemini", streaming: bool = True, max_concurrent: int = 3,
+                 warm_pool_size: int = 0, retry_policy: Optional[RetryPolicy] = None,
+                 adaptive_concurrency: bool = True):
         super().__init__()
-        self.process = None
+        self.cli_path = cli_path
+        self.pool = None
+        self.start_warm_pool(warm_pool_size)
+        self.streaming = streaming
+        self.max_concurrent = max(1, max_concurrent)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.concurrency = ConcurrencyLimit(self.max_concurrent, adaptive=adaptive_concurrency)
+        self.stats = ResilienceStats()
+        self._ids = count(1)
+        self._backlog = []  # Heap of (priority, sequence, request)
+        self._requests: Dict[int, AgentRequest] = {}
+        self._running: Dict[int, AgentRequest] = {}
+        self._waiting = []  # Heap of (monotonic due time, sequence, request) backing off before a retry
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._retry_due)
+        # Finished processes, kept until the signal handler that released them has returned.
+        # They have no parent, so no deferred deletion can outlive the worker
+        self._finished_processes: List[QProcess] = []
 
-    def send_prompt(self, prompt: str):
+    def start_warm_pool(self, size: int):
+        """Begin keeping ``size`` CLI processes pre-started, e.g. once start-up is done"""
+        if size > 0 and self.pool is None:
+            self.pool = WarmProcessPool(self.cli_path, size=size, parent=self)
+
+    def send_prompt(self, prompt: str, priority: int = INTERACTIVE,
+                    session_id: Optional[int] = None) -> int:
+        """
+        Queues a prompt for the Gemini CLI and returns its request ID
         """
-        Sends a prompt to Gemini CLI asynchronously
+        request = AgentRequest(next(self._ids), prompt, priority, session_id)
+        self._requests[request.id] = request
+        heapq.heappush(self._backlog, (priority, request.id, request))
+        get_tracer().mark(request.id, "queued")
+        self.request_queued.emit(request.id)
+        # Start on the next event loop pass so callers can register the ID first
+        QTimer.singleShot(0, self._start_next)
+        return request.id
+
+    def cancel(self, request_id: int) -> bool:
         """
-        if self.process is not None and self.process.state() == QProcess.Running:
-            self.process.kill()
+        Cancels a queued or running request. Returns False if it already finished
+        """
+        request = self._requests.pop(request_id, None)
+        if request is None:
+            return False
+
+        request.cancelled = True
+        get_tracer().discard(request_id)
+        if request.process is not None:
+            # The finished handler releases the slot and starts the next request
+            request.process.kill()
+        # A request waiting to be retried is dropped when its backoff ends
+        self.request_cancelled.emit(request_id)
+        return True
+
+    def cancel_all(self):
+        """Cancels every queued and running request"""
+        for request_id in list(self._requests):
+            self.cancel(request_id)
+
+    def get_request(self, request_id: int) -> Optional[AgentRequest]:
+        """Returns a pending request by ID"""
+        return self._requests.get(request_id)
+
+    def pending_count(self) -> int:
+        """Number of requests that are queued, running or waiting to be retried"""
+        return len(self._requests)
+
+    def resilience_stats(self) -> dict:
+        """Retry and failure counters with the current concurrency limit"""
+        return dict(
+            self.stats.to_dict(),
+            concurrency_limit=self.concurrency.limit,
+            max_concurrent=self.max_concurrent,
+            concurrency_decreases=self.concurrency.decreases,
+            running=len(self._running),
+            queued=len(self._backlog),
+        )
+
+    def shutdown(self):
+        """Cancels all requests, waits for their processes to exit and stops pooled ones"""
+        self.cancel_all()
+        for request in list(self._running.values()):
+            # Delivers finished, which releases the request
+            if request.process is not None and not request.process.waitForFinished(1000):
+                self._release(request, start_next=False)
+        self._retry_timer.stop()
+        self._waiting.clear()
+        self._backlog.clear()
+        self._free_processes()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _start_next(self):
+        """Launches backlog requests while there are free process slots"""
+        while self._backlog and len(self._running) < self.concurrency.limit:
+            _, _, request = heapq.heappop(self._backlog)
+            if request.cancelled:
+                continue
+            self._launch(request)
+
+    def _launch(self, request: AgentRequest):
+        """Starts the CLI process for a request, preferring a warm one"""
+        process = self.pool.acquire() if self.pool is not None else None
+        warm = process is not None
+        if not warm:
+            process = QProcess()
+        request.process = process
+        request.attempt += 1
+        request.started_at = time.monotonic()
+        request.timed_out = False
+        request.error = None
+        self._running[request.id] = request
+        self.stats.attempts += 1
+
+        # Decode incrementally so multi-byte characters split across reads survive
+        request.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        process.finished.connect(partial(self._handle_response, request))
+        process.errorOccurred.connect(partial(self._handle_error, request))
+        process.readyReadStandardOutput.connect(partial(self._handle_output, request))
+
+        if warm:
+            # The warm process is blocked reading its prompt from stdin
+            process.setParent(None)
+            process.write(request.prompt.encode("utf-8"))
+            process.closeWriteChannel()
+        else:
+            # Start Gemini CLI process
+            process.start(self.cli_path, ["-p", request.prompt])
+
+        if self.retry_policy.timeout_ms:
+            # Owned by the request rather than the worker, so it goes away with it
+            request.timer = QTimer()
+            request.timer.setSingleShot(True)
+            request.timer.timeout.connect(partial(self._handle_timeout, request))
+            request.timer.start(self.retry_policy.timeout_ms)
+        get_tracer().mark(request.id, "started")
+        self.request_started.emit(request.id)
 
-        self.process = QProcess()
-        self.process.finished.connect(self._handle_response)
-        self.process.errorOccurred.connect(self._handle_error)
-        
-        # Start Gemini CLI process
-        self.process.start("gemini", ["-p", prompt])
+    def _handle_output(self, request: AgentRequest):
+        """
+        Restarts the idle timeout and, when streaming, forwards whatever
+        stdout is available as a partial chunk
+        """
+        if request.timer is not None:
+            request.timer.start()
+        if not self.streaming:
+            return
+        chunk = request.decoder.decode(request.process.readAllStandardOutput().data())
+        if chunk and not request.cancelled:
+            if not request.chunks:
+                get_tracer().mark(request.id, "first_byte")
+            request.chunks.append(chunk)
+            self.chunk_received.emit(request.id, chunk)
 
-    def _handle_response(self):
+    def _handle_response(self, request: AgentRequest, exit_code: int = 0,
+                         exit_status: QProcess.ExitStatus = QProcess.NormalExit):
         """
         Handles the response from Gemini CLI
         """
-        if self.process is None:
+        if request.id not in self._running:
             return
+        process = request.process
 
-        exit_code = self.process.exitCode()
-        if exit_code == 0:
-            response = self.process.readAllStandardOutput().data().decode().strip()
-            self.response_ready.emit(response)
+        if request.cancelled:
+            # Already reported through request_cancelled
+            self._release(request)
+            return
+
+        if exit_status == QProcess.NormalExit and exit_code == 0:
+            # Drain anything that arrived after the last readyRead
+            tail = request.decoder.decode(process.readAllStandardOutput().data(), final=True)
+            if tail and self.streaming:
+                request.chunks.append(tail)
+                self.chunk_received.emit(request.id, tail)
+            response = ("".join(request.chunks) if self.streaming else tail).strip()
+            get_tracer().mark(request.id, "finished")
+            self._requests.pop(request.id, None)
+            self.stats.succeeded += 1
+            self.concurrency.on_success()
+            self.response_ready.emit(request.id, response)
         else:
-            error = self.process.readAllStandardError().data().decode().strip()
-            self.error_occurred.emit(f"Gemini CLI Error (Exit code: {exit_code}): {error}")
+            stderr = process.readAllStandardError().data().decode(errors="replace").strip()
+            if request.timed_out:
+                request.error = f"Gemini CLI produced no output for {self.retry_policy.timeout_ms / 1000:g} s"
+            failure = classify_failure(exit_code, stderr, request.error or "",
+                                       crashed=exit_status == QProcess.CrashExit, timed_out=request.timed_out)
+            self._release(request, start_next=False)
+            self._fail(request, failure)
+            self._start_next()
+            return
+
+        self._release(request)
+
+    def _handle_timeout(self, request: AgentRequest):
+        """Kills a request's process once it has produced no output for the timeout"""
+        if request.process is not None and request.id in self._running:
+            request.timed_out = True
+            request.process.kill()
 
-    def _handle_error(self, error: QProcess.ProcessError):
+    def _fail(self, request: AgentRequest, failure: Failure):
+        """Schedules a retry for a retryable failure, or reports it"""
+        self.stats.record_failure(failure)
+        if failure.kind == RATE_LIMITED:
+            self.concurrency.on_rate_limited(request.started_at)
+        request.failures.append(failure)
+
+        # Retrying after streamed output would repeat it to the caller
+        if (failure.retryable and request.attempt < self.retry_policy.max_attempts
+                and not request.chunks and not request.cancelled):
+            delay = self.retry_policy.delay_ms(request.attempt, failure)
+            self.stats.retries += 1
+            self.stats.backoff.record(delay)
+            heapq.heappush(self._waiting, (time.monotonic() + delay / 1000, request.id, request))
+            self._schedule_retries()
+            self.request_retrying.emit(request.id, request.attempt + 1, int(delay), failure.message)
+            return
+
+        if failure.retryable:
+            self.stats.gave_up += 1
+        get_tracer().discard(request.id)
+        self._requests.pop(request.id, None)
+        message = failure.message
+        if request.attempt > 1:
+            message += f" (after {request.attempt} attempts)"
+        self.error_occurred.emit(request.id, message)
+
+    def _schedule_retries(self):
+        """Times the retry timer for the request whose backoff ends first"""
+        if self._waiting:
+            self._retry_timer.start(max(0, int((self._waiting[0][0] - time.monotonic()) * 1000) + 1))
+
+    def _retry_due(self):
+        """Puts requests back in the backlog once their backoff has passed"""
+        now = time.monotonic()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, request = heapq.heappop(self._waiting)
+            if not request.cancelled:
+                # Its original sequence number keeps it ahead of prompts queued since
+                heapq.heappush(self._backlog, (request.priority, request.id, request))
+        self._schedule_retries()
+        self._start_next()
+
+    def _handle_error(self, request: AgentRequest, error: QProcess.ProcessError):
         """
         Handles QProcess errors
         """
@@ -53,4 +318,34 @@ class AgentWorker(QObject):
             QProcess.ReadError: "Failed to read from Gemini CLI process",
             QProcess.UnknownError: "An unknown error occurred"
         }
-        self.error_occurred.emit(error_messages.get(error, "An unknown error occurred"))
\ No newline at end of file
+        request.error = error_messages.get(error, "An unknown error occurred")
+
+        # A process that never started will not emit finished
+        if error == QProcess.FailedToStart and request.id in self._running:
+            self._release(request, start_next=False)
+            if not request.cancelled:
+                self._fail(request, classify_failure(None, "", request.error))
+            self._start_next()
+
+    def _release(self, request: AgentRequest, start_next: bool = True):
+        """Frees the request's process slot and starts queued work"""
+        self._running.pop(request.id, None)
+        if request.timer is not None:
+            request.timer.stop()
+            request.timer = None
+        if request.process is not None:
+            # Often called from the process's own finished signal, so it is freed later
+            process = request.process
+            request.process = None
+            process.finished.disconnect()
+            process.errorOccurred.disconnect()
+            process.readyReadStandardOutput.disconnect()
+            self._finished_processes.append(process)
+            if len(self._finished_processes) == 1:
+                QTimer.singleShot(0, self._free_processes)
+        if start_next:
+            self._start_next()
+
+    def _free_processes(self):
+        """Drops finished processes, which deletes them"""
+        self._finished_processes.clear()
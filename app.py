@@ -1,24 +1,81 @@
+import time
+_START = time.perf_counter()
+
+import argparse
+import os
 import sys
+from functools import partial
 from pathlib import Path
-from PySide6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+
+from instrumentation import StartupProfile
+
+FIRST_PAINT_TARGET_MS = 300
+
+def parse_args(argv):
+    """Parse command line options, leaving Qt's own arguments alone"""
+    parser = argparse.ArgumentParser(description="Gemini Agent Desktop")
+    parser.add_argument("project", nargs="?",
+                        help="Project directory to open (default: the project open last time)")
+    parser.add_argument("--warm-pool", type=int, default=0, metavar="N",
+                        help="Keep N pre-started Gemini CLI processes ready for prompts")
+    parser.add_argument("--context-budget", type=int, default=4000, metavar="TOKENS",
+                        help="Approximate token budget for a prompt and its attached code")
+    parser.add_argument("--trace", action="store_true", default=bool(os.environ.get("GEMINI_AGENT_TRACE")),
+                        help="Record latency traces and event-loop stalls (Ctrl+Shift+I shows them); "
+                             "also enabled by GEMINI_AGENT_TRACE=1")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print a timing breakdown of imports and start-up steps")
+    args, _ = parser.parse_known_args(argv[1:])
+    return args
+
+def print_startup_profile(profile: StartupProfile):
+    """Print the start-up breakdown once deferred start-up work is done"""
+    profile.mark("restore project")
+    profile.stop_tracing_imports()
+    print(profile.report())
+    first_paint = profile.elapsed_ms("first paint")
+    if first_paint is not None:
+        print("First paint after %.0f ms (target %d ms)" % (first_paint, FIRST_PAINT_TARGET_MS))
 
 def main():
+    args = parse_args(sys.argv)
+    profile = StartupProfile(_START)
+    if args.profile_startup:
+        profile.trace_imports()
+    profile.mark("parse arguments")
+
+    # Qt and the UI modules are imported here so the import tracing sees them
+    from PySide6.QtWidgets import QApplication
+    profile.mark("import Qt")
+
     # Create the Qt Application
     app = QApplication(sys.argv)
+    app.setOrganizationName("GeminiAgent")
+    app.setApplicationName("Gemini Agent Desktop")
+    profile.mark("create application")
+
+    from ui.main_window import MainWindow
+    profile.mark("import main window")
 
     # Create and show the main window
-    window = MainWindow()
+    window = MainWindow(warm_pool_size=args.warm_pool, context_budget=args.context_budget, trace=args.trace,
+                        startup_profile=profile)
+    profile.mark("build main window")
     window.show()
+    profile.mark("show window")
 
-    # If a project path is provided as argument, open it
-    if len(sys.argv) > 1:
-        project_path = Path(sys.argv[1]).absolute()
+    # Open the project given as argument, or the last one, after the first frame
+    if args.project:
+        project_path = Path(args.project).absolute()
         if project_path.is_dir():
-            window.open_project(str(project_path))
+            window.call_after_first_paint(partial(window.open_project, str(project_path)))
+    else:
+        window.call_after_first_paint(window.restore_last_project)
+    if args.profile_startup:
+        window.call_after_first_paint(partial(print_startup_profile, profile))
 
     # Start the event loop
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,292 @@
+"""
+Headless batch mode: runs a JSONL file of prompts through the Gemini CLI
+without the GUI, with bounded concurrency.
+
+Each input line is an object with a "prompt" and optionally an "id" (the
+line number otherwise) and a "file" whose code is packed into the prompt
+like the editor's current file. Every finished item is saved as a chat
+turn of one session per run, then appended to the output JSONL:
+
+    {"id": ..., "prompt": ..., "file": ..., "response": ..., "turn_id": ..., "elapsed_ms": ...}
+
+or with "error" instead of "response". Items already in the output are
+skipped, so an interrupted run resumes where it stopped; failed items are
+retried with --retry-failed. Within a run, rate limits, timeouts and
+transient CLI errors are retried with backoff, and rate limits lower the
+number of processes until the quota recovers.
+
+Usage: python batch.py PROMPTS.jsonl [-o RESULTS.jsonl] [--concurrency N] [--project DIR]
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Signal
+
+from agent_worker import AgentWorker, BACKGROUND
+from context_packer import ContextPacker
+from database import Database
+from resilience import RetryPolicy
+
+@dataclass
+class BatchItem:
+    id: object  # From the input, or the 1-based line number
+    prompt: str
+    file: Optional[str] = None
+    started: float = 0.0
+
+def item_key(item_id) -> str:
+    """Identity of an item when matching input against earlier output"""
+    return json.dumps(item_id)
+
+def load_items(path: str) -> List[BatchItem]:
+    """Parse the input JSONL, reporting and skipping malformed lines"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                prompt = data["prompt"]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"{path}:{number}: skipped, not a prompt object ({e})", file=sys.stderr)
+                continue
+            items.append(BatchItem(data.get("id", number), prompt, data.get("file")))
+    return items
+
+def load_completed(path: str, retry_failed: bool) -> Set[str]:
+    """
+    Keys of the items an earlier run already finished. A line cut short by
+    an interruption is truncated away so appended results stay valid JSONL
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        good_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            good_end += len(line)
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if "response" in result or not retry_failed:
+                done.add(item_key(result.get("id")))
+        f.truncate(good_end)
+    return done
+
+class BatchRunner(QObject):
+    """
+    Feeds batch items to an AgentWorker, keeping at most ``max_in_flight``
+    queued or running. Successful responses are queued to the database's
+    batched writer, and each result is appended to the output once its
+    turn is committed, so the output doubles as the resume journal.
+    """
+    finished = Signal()
+
+    PROGRESS_INTERVAL_MS = 2000
+
+    def __init__(self, items: List[BatchItem], worker: AgentWorker, database: Database,
+                 session_id: int, output_path: str, packer: Optional[ContextPacker] = None,
+                 max_in_flight: int = 6, parent=None):
+        super().__init__(parent)
+        self.items = items
+        self.worker = worker
+        self.database = database
+        self.session_id = session_id
+        self.packer = packer
+        self.max_in_flight = max(1, max_in_flight)
+        self.completed = 0
+        self.failed = 0
+        self.stopped = False
+        self._done = False
+        self._next = 0
+        self._in_flight: Dict[int, BatchItem] = {}
+        self._output = open(output_path, "a", encoding="utf-8")
+        self._output_lock = threading.Lock()
+        self._start = time.monotonic()
+
+        worker.response_ready.connect(self._handle_response)
+        worker.error_occurred.connect(self._handle_error)
+        # Also gives Python a chance to run its Ctrl+C handler while Qt waits
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(self.PROGRESS_INTERVAL_MS)
+        self._progress_timer.timeout.connect(self.report_progress)
+
+    def start(self):
+        self._start = time.monotonic()
+        self._progress_timer.start()
+        self._fill()
+
+    def stop(self):
+        """Stop sending prompts and abandon the ones in flight; they rerun on resume"""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.worker.cancel_all()
+        self._in_flight.clear()
+        self._finish()
+
+    def throughput(self) -> float:
+        """Finished items per minute so far"""
+        minutes = (time.monotonic() - self._start) / 60
+        return (self.completed + self.failed) / minutes if minutes > 0 else 0.0
+
+    def report_progress(self):
+        done = self.completed + self.failed
+        rate = self.throughput()
+        remaining = len(self.items) - done
+        eta = ", ETA %.1f min" % (remaining / rate) if rate and remaining else ""
+        stats = self.worker.resilience_stats()
+        print("[%d/%d] %d failed, %d in flight, %d retries, %d/%d processes, %.1f prompts/min%s" % (
+            done, len(self.items), self.failed, len(self._in_flight), stats["retries"],
+            stats["concurrency_limit"], stats["max_concurrent"], rate, eta
+        ), file=sys.stderr, flush=True)
+
+    def _fill(self):
+        """Send prompts until the in-flight limit is reached"""
+        while not self.stopped and len(self._in_flight) < self.max_in_flight and self._next < len(self.items):
+            item = self.items[self._next]
+            self._next += 1
+            try:
+                prompt = self._build_prompt(item)
+            except OSError as e:
+                self._record_failure(item, f"Cannot read {item.file}: {e}")
+                continue
+            item.started = time.monotonic()
+            request_id = self.worker.send_prompt(prompt, BACKGROUND, self.session_id)
+            self._in_flight[request_id] = item
+        if not self._in_flight and self._next >= len(self.items):
+            self._finish()
+
+    def _build_prompt(self, item: BatchItem) -> str:
+        if item.file is None or self.packer is None:
+            return item.prompt
+        path = item.file
+        if self.packer.project_root and not os.path.isabs(path):
+            path = os.path.join(self.packer.project_root, path)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        return self.packer.pack(item.prompt, path, text).text
+
+    def _handle_response(self, request_id: int, response: str):
+        item = self._in_flight.pop(request_id, None)
+        if item is None:
+            return
+        self.completed += 1
+        elapsed_ms = (time.monotonic() - item.started) * 1000
+
+        def saved(future):
+            # Runs on the database writer thread
+            if future.exception() is not None:
+                self._write({"id": item.id, "prompt": item.prompt, "file": item.file,
+                             "error": f"Could not save the turn: {future.exception()}"})
+                return
+            self._write({"id": item.id, "prompt": item.prompt, "file": item.file, "response": response,
+                         "turn_id": future.result(), "elapsed_ms": round(elapsed_ms, 1)})
+
+        self.database.queue_chat_turn(self.session_id, item.prompt, response).add_done_callback(saved)
+        self._fill()
+
+    def _handle_error(self, request_id: int, error: str):
+        item = self._in_flight.pop(request_id, None)
+        if item is None:
+            return
+        self._record_failure(item, error)
+        self._fill()
+
+    def _record_failure(self, item: BatchItem, error: str):
+        self.failed += 1
+        print(f"Item {item.id} failed: {error}", file=sys.stderr)
+        self._write({"id": item.id, "prompt": item.prompt, "file": item.file, "error": error})
+
+    def _write(self, result: dict):
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._output_lock:
+            if not self._output.closed:
+                self._output.write(line)
+                self._output.flush()
+
+    def _finish(self):
+        """Wait for queued turns to be committed, then close the output"""
+        if self._done:
+            return
+        self._done = True
+        self._progress_timer.stop()
+        self.database.flush()
+        with self._output_lock:
+            self._output.close()
+        self.report_progress()
+        self.finished.emit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of prompts")
+    parser.add_argument("-o", "--output", help="Results JSONL, appended to (default: INPUT.results.jsonl)")
+    parser.add_argument("--db", default="agent_data.db", help="Path to the SQLite database")
+    parser.add_argument("--project", help="Project directory for file context and the session (default: cwd)")
+    parser.add_argument("--concurrency", type=int, default=3, help="Most Gemini CLI processes run at once")
+    parser.add_argument("--context-budget", type=int, default=4000, metavar="TOKENS",
+                        help="Approximate token budget for a prompt and its attached code")
+    parser.add_argument("--cli", default="gemini", help="Gemini CLI executable")
+    parser.add_argument("--retry-failed", action="store_true", help="Run items that failed last time again")
+    parser.add_argument("--max-attempts", type=int, default=RetryPolicy.max_attempts,
+                        help="Tries per prompt for rate limits, timeouts and transient errors")
+    parser.add_argument("--timeout", type=float, default=RetryPolicy.timeout_ms / 1000, metavar="SECONDS",
+                        help="Time an attempt may go without output, 0 for none")
+    args = parser.parse_args(argv)
+
+    output = args.output or str(Path(args.input).with_suffix(".results.jsonl"))
+    project = str(Path(args.project or os.getcwd()).absolute())
+    completed = load_completed(output, args.retry_failed)
+    items = [item for item in load_items(args.input) if item_key(item.id) not in completed]
+    if completed:
+        print(f"Resuming: {len(completed)} items already done, {len(items)} to go", file=sys.stderr)
+    if not items:
+        return 0
+
+    app = QCoreApplication(sys.argv[:1])
+    database = Database(args.db)
+    policy = RetryPolicy(max_attempts=max(1, args.max_attempts),
+                         timeout_ms=int(args.timeout * 1000) if args.timeout > 0 else None)
+    worker = AgentWorker(cli_path=args.cli, streaming=False, max_concurrent=args.concurrency,
+                         retry_policy=policy)
+    session_id = database.create_session(project)
+    # A small backlog beyond the running processes keeps them busy without
+    # packing every prompt up front
+    runner = BatchRunner(items, worker, database, session_id, output,
+                         ContextPacker(args.context_budget, project), max_in_flight=args.concurrency * 2)
+    runner.finished.connect(app.quit)
+
+    def interrupt(*_args):
+        print("Interrupted; finished items are saved, rerun to resume", file=sys.stderr)
+        runner.stop()
+
+    signal.signal(signal.SIGINT, interrupt)
+    QTimer.singleShot(0, runner.start)
+    app.exec()
+
+    worker.shutdown()
+    database.close()
+    stats = worker.resilience_stats()
+    print(f"Done: {runner.completed} succeeded, {runner.failed} failed, "
+          f"{runner.throughput():.1f} prompts/min. Results in {output}", file=sys.stderr)
+    if stats["retries"]:
+        print(f"{stats['retries']} retries after {stats['failures']}, "
+              f"{stats['backoff_total_ms'] / 1000:.1f} s spent backing off", file=sys.stderr)
+    if runner.stopped:
+        return 130
+    return 1 if runner.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+History archive throughput: streaming a populated database out to a
+compressed JSONL archive and importing it into an empty one, in rows per
+second, with the archive size and the process's peak memory.
+
+Usage: python benchmarks/bench_archive.py [--turns N] [--sessions N]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+from history_archive import export_history, import_history
+from bench_database import RESPONSE
+
+def populate(db: Database, sessions: int, turns: int):
+    """Fill the database directly, in large transactions"""
+    session_ids = [db.create_session(f"/project/{i}") for i in range(sessions)]
+    conn = db._connect()
+    for offset in range(0, turns, 10_000):
+        with conn:
+            conn.executemany(Database.INSERT_TURN_SQL, (
+                (session_ids[i % sessions], f"prompt {i}", RESPONSE, None, None, 0)
+                for i in range(offset, min(turns, offset + 10_000))
+            ))
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200_000)
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Database(str(Path(tmp) / "source.db"))
+        populate(source, args.sessions, args.turns)
+        archive = str(Path(tmp) / "history.jsonl.gz")
+        rss_before = peak_rss_mb()
+
+        start = time.perf_counter()
+        exported = export_history(source, archive)
+        export_time = time.perf_counter() - start
+        source.close()
+
+        target = Database(str(Path(tmp) / "target.db"))
+        start = time.perf_counter()
+        imported = import_history(target, archive)
+        import_time = time.perf_counter() - start
+        target.close()
+
+        rows = exported.sessions + exported.turns
+        print(f"{exported.turns} turns in {exported.sessions} sessions, "
+              f"archive {os.path.getsize(archive) / 1024 / 1024:.1f} MB")
+        print(f"export: {rows / export_time:10.0f} rows/s ({export_time:.2f}s)")
+        print(f"import: {rows / import_time:10.0f} rows/s ({import_time:.2f}s, "
+              f"{imported.turns} turns)")
+        print(f"peak RSS {peak_rss_mb():.0f} MB (after populating: {rss_before:.0f} MB)")
+
+if __name__ == "__main__":
+    main()
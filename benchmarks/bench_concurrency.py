@@ -0,0 +1,53 @@
+"""
+Measures wall time for a burst of prompts at different AgentWorker
+concurrency limits against the fake gemini CLI.
+
+Usage: python benchmarks/bench_concurrency.py [--prompts N]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, QEventLoop
+
+from agent_worker import AgentWorker
+
+FAKE_GEMINI = str(Path(__file__).resolve().parent / "fake_gemini.py")
+
+def run_burst(max_concurrent: int, prompts: int) -> float:
+    """Send a burst of prompts and return the seconds until all have finished"""
+    worker = AgentWorker(cli_path=FAKE_GEMINI, max_concurrent=max_concurrent)
+    loop = QEventLoop()
+    remaining = {"count": prompts}
+
+    def on_finished(*_args):
+        remaining["count"] -= 1
+        if remaining["count"] == 0:
+            loop.quit()
+
+    worker.response_ready.connect(on_finished)
+    worker.error_occurred.connect(on_finished)
+    start = time.perf_counter()
+    for i in range(prompts):
+        worker.send_prompt(f"prompt {i}")
+    loop.exec()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=8)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    for limit in (1, 2, 4, 8):
+        elapsed = run_burst(limit, args.prompts)
+        print(f"max_concurrent={limit}: {args.prompts} prompts in {elapsed * 1000:8.1f} ms")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Database throughput: per-turn synchronous inserts versus the batched
+background writer, followed by history queries on the populated database.
+
+Usage: python benchmarks/bench_database.py [--turns N] [--sessions N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+
+RESPONSE = "Here is the explanation.\n\n```python\ndef f(x):\n    return x * 2\n```\n" * 4
+
+def bench_sync(db: Database, sessions: list, turns: int) -> float:
+    """Insert turns one committed transaction at a time"""
+    start = time.perf_counter()
+    for i in range(turns):
+        db.add_chat_turn(sessions[i % len(sessions)], f"prompt {i}", RESPONSE)
+    return time.perf_counter() - start
+
+def bench_queued(db: Database, sessions: list, turns: int) -> float:
+    """Insert turns through the batched background writer"""
+    start = time.perf_counter()
+    futures = [db.queue_chat_turn(sessions[i % len(sessions)], f"prompt {i}", RESPONSE)
+               for i in range(turns)]
+    futures[-1].result()
+    return time.perf_counter() - start
+
+def bench_history(db: Database, sessions: list) -> float:
+    """Load the full history of every session"""
+    start = time.perf_counter()
+    for session_id in sessions:
+        db.get_session_history(session_id)
+    return (time.perf_counter() - start) / len(sessions)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--sync-turns", type=int, default=10_000,
+                        help="Turns for the slower synchronous path")
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        sessions = [db.create_session(f"/project/{i}") for i in range(args.sessions)]
+
+        elapsed = bench_sync(db, sessions, args.sync_turns)
+        print(f"add_chat_turn   : {args.sync_turns / elapsed:10.0f} turns/s")
+
+        elapsed = bench_queued(db, sessions, args.turns)
+        print(f"queue_chat_turn : {args.turns / elapsed:10.0f} turns/s ({args.turns} turns)")
+
+        per_session = bench_history(db, sessions)
+        total = args.turns + args.sync_turns
+        print(f"history query   : {per_session * 1000:10.2f} ms/session "
+              f"({total // args.sessions} turns each)")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Cost of turning an answer's diff into editor edits on a large file:
+parsing the response, locating the hunks and minimizing them. The editor
+then only replaces the few changed lines instead of the whole document.
+
+Usage: python benchmarks/bench_diff_apply.py [--lines N] [--hunks N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from diff_apply import apply_to_text, diff_edits, parse_changes, plan_edits
+
+def make_source(lines: int) -> str:
+    return "\n".join(
+        "def function_%d(value):\n    return value + %d\n" % (i, i) for i in range(lines // 3)
+    )
+
+def make_diff(hunks: int, lines: int) -> str:
+    """A unified diff changing one function every lines/hunks lines"""
+    parts = ["Here is the fix:", "```diff", "--- a/big.py", "+++ b/big.py"]
+    step = max(1, (lines // 3) // hunks)
+    for h in range(hunks):
+        i = h * step
+        parts += [
+            "@@ -%d,3 +%d,3 @@" % (i * 3 + 1, i * 3 + 1),
+            " def function_%d(value):" % i,
+            "-    return value + %d" % i,
+            "+    return value * %d" % i,
+            " ",
+        ]
+    parts.append("```")
+    return "\n".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=60000)
+    parser.add_argument("--hunks", type=int, default=20)
+    args = parser.parse_args()
+
+    source = make_source(args.lines)
+    response = make_diff(args.hunks, args.lines)
+
+    start = time.perf_counter()
+    changes = parse_changes(response)
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    edits = plan_edits(source, changes[0])
+    planned = time.perf_counter() - start
+
+    result = apply_to_text(source, edits)
+    start = time.perf_counter()
+    revert = diff_edits(result, source)
+    reverted = time.perf_counter() - start
+
+    print(f"{source.count(chr(10)) + 1} lines, {len(changes[0].hunks)} hunks")
+    print(f"Parse response:   {parsed * 1000:.2f}ms")
+    print(f"Locate and plan:  {planned * 1000:.2f}ms -> {len(edits)} edits "
+          f"touching {sum(e.end - e.start for e in edits)} lines")
+    print(f"Plan revert diff: {reverted * 1000:.2f}ms -> {len(revert)} edits")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+File tree responsiveness on a huge directory: expanding a directory of
+N files (next to a node_modules the ignore rules skip) with the lazy
+FileTreeModel, cold and from the listing cache. Reports the time to the
+first rows and to the complete listing, and the longest the event loop
+was blocked meanwhile.
+
+Usage: python benchmarks/bench_file_navigator.py [--files N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QEventLoop, QTimer
+from PySide6.QtWidgets import QApplication
+
+from ui.file_navigator import FileNavigator
+
+def make_tree(root: Path, files: int):
+    big = root / "big"
+    big.mkdir()
+    for i in range(files):
+        (big / f"module_{i:06d}.py").touch()
+    ignored = root / "node_modules" / "pkg"
+    ignored.mkdir(parents=True)
+    for i in range(1000):
+        (ignored / f"{i}.js").touch()
+    (root / ".gitignore").write_text("*.log\n")
+
+def expand_big(cache_path: str, root: Path) -> dict:
+    """Open the tree, expand the big directory and time it while measuring event-loop gaps"""
+    view = FileNavigator(cache_path)
+    view.resize(300, 800)
+    view.show()
+    model = view.model
+    loaded = []
+    model.directory_loaded.connect(loaded.append)
+
+    def run_until(done, timeout_s: float = 60):
+        loop = QEventLoop()
+        gaps = [0.0]
+        last = [time.perf_counter()]
+
+        def tick():
+            now = time.perf_counter()
+            gaps[0] = max(gaps[0], now - last[0])
+            last[0] = now
+            if done():
+                loop.quit()
+        timer = QTimer()
+        timer.timeout.connect(tick)
+        timer.start(1)
+        QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+        loop.exec()
+        timer.stop()
+        return gaps[0]
+
+    view.set_root_path(str(root))
+    run_until(lambda: str(root) in loaded)
+    big = str(root / "big")
+    start = time.perf_counter()
+    index = model.index(0, 0)  # Directories come first
+    first_rows = []
+    model.rowsInserted.connect(lambda *_: first_rows.append(time.perf_counter()) if not first_rows else None)
+    view.expand(index)
+    worst_gap = run_until(lambda: big in loaded)
+    total = time.perf_counter() - start
+    rows = model.rowCount(index)
+    top_level = [model.data(model.index(row, 0)) for row in range(model.rowCount())]
+    model.close()
+    view.deleteLater()
+    return {
+        "first_rows_ms": (first_rows[0] - start) * 1000 if first_rows else None,
+        "complete_ms": total * 1000,
+        "worst_gap_ms": worst_gap * 1000,
+        "rows": rows,
+        "top_level": top_level,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=50_000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "project"
+        root.mkdir()
+        make_tree(root, args.files)
+        cache_path = str(Path(tmp) / "listings.db")
+        for label in ("cold", "cached"):
+            result = expand_big(cache_path, root)
+            print(f"{label:6}: {result['rows']} rows, first rows after {result['first_rows_ms']:.0f}ms, "
+                  f"complete after {result['complete_ms']:.0f}ms, "
+                  f"longest event-loop block {result['worst_gap_ms']:.0f}ms")
+        print(f"top level: {', '.join(result['top_level'])}")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares the original per-keyword regex Python highlighter with the
+single-pass SyntaxHighlighter: tokenizer cost per line and full-document
+highlight time on a large generated file.
+
+Usage: python benchmarks/bench_highlighter.py [--lines N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtGui import QGuiApplication, QTextDocument, QSyntaxHighlighter, QTextCharFormat, QColor
+
+from ui.syntax import SyntaxHighlighter, PYTHON, scan_line
+
+class LegacyPythonHighlighter(QSyntaxHighlighter):
+    """The original highlighter: one regex per keyword, each run over every block"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.highlight_rules = []
+        keyword_format = QTextCharFormat()
+        keyword_format.setForeground(QColor("#FF6B68"))
+        for word in PYTHON.keywords:
+            self.highlight_rules.append((re.compile(r"\b" + re.escape(word) + r"\b"), keyword_format))
+        string_format = QTextCharFormat()
+        string_format.setForeground(QColor("#6A8759"))
+        self.highlight_rules.append((re.compile(r'".*?"'), string_format))
+        self.highlight_rules.append((re.compile(r"'.*?'"), string_format))
+        comment_format = QTextCharFormat()
+        comment_format.setForeground(QColor("#808080"))
+        self.highlight_rules.append((re.compile(r"#[^\n]*"), comment_format))
+
+    def highlightBlock(self, text):
+        for pattern, fmt in self.highlight_rules:
+            for m in pattern.finditer(text):
+                self.setFormat(m.start(), m.end() - m.start(), fmt)
+
+SAMPLE = '''class Example(object):
+    """Docstring that
+    spans lines"""
+
+    def method(self, value, other=None):  # comment with if and for
+        if value is not None and other in (1, 2, 3):
+            return "string with 'quotes' and # hash" + str(value)
+        for item in range(10):
+            yield item * 2.5
+'''
+
+def time_document(highlighter_class, text: str) -> float:
+    """Seconds to highlight a whole document once"""
+    document = QTextDocument()
+    document.setPlainText(text)
+    start = time.perf_counter()
+    # Attaching only schedules highlighting for a later event loop pass
+    highlighter = highlighter_class(document)
+    highlighter.rehighlight()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    app = QGuiApplication(sys.argv)
+    sample_lines = SAMPLE.splitlines()
+    lines = (sample_lines * (args.lines // len(sample_lines) + 1))[:args.lines]
+    text = "\n".join(lines)
+
+    # Tokenizer-only cost per line, without Qt formatting
+    legacy = LegacyPythonHighlighter()
+    start = time.perf_counter()
+    for line in lines:
+        for pattern, _ in legacy.highlight_rules:
+            for _ in pattern.finditer(line):
+                pass
+    legacy_scan = (time.perf_counter() - start) / len(lines)
+    start = time.perf_counter()
+    state = 0
+    for line in lines:
+        _, state = scan_line(PYTHON, line, state)
+    new_scan = (time.perf_counter() - start) / len(lines)
+    print(f"scan per line   : legacy {legacy_scan * 1e6:7.2f} us, single-pass {new_scan * 1e6:7.2f} us")
+
+    legacy_doc = time_document(LegacyPythonHighlighter, text)
+    new_doc = time_document(lambda document: SyntaxHighlighter(document, PYTHON), text)
+    print(f"full document   : legacy {legacy_doc * 1000:7.0f} ms, single-pass {new_doc * 1000:7.0f} ms "
+          f"({args.lines} lines)")
+    print(f"per block       : legacy {legacy_doc / args.lines * 1e6:7.2f} us, "
+          f"single-pass {new_doc / args.lines * 1e6:7.2f} us")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Cost of showing a session's agent messages: parsing every response with
+markdown-it (what reopening a session used to do on the GUI thread) versus
+hits in the in-memory and persisted render caches, plus fenced code
+highlighting cold and cached.
+
+Usage: python benchmarks/bench_markdown.py [--messages N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+from ui.markdown_renderer import highlight_code, make_markdown, render_key
+
+CODE = "\n".join(
+    'def handler_%d(request, *args):\n    """Handle it"""\n    return request.get("key_%d", 0x1F) + %d  # done' % (i, i, i)
+    for i in range(20)
+)
+RESPONSE = "## Answer %d\n\nHere is the change, *with* `inline` code:\n\n```python\n# answer %d\n" + CODE + "\n```\n\n- one\n- two\n"
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+
+    texts = [RESPONSE % (i, i) for i in range(args.messages)]
+    md = make_markdown()
+
+    parse = timed(lambda: [md.render(text) for text in texts])
+    rendered = {render_key(text): md.render(text) for text in texts}
+    memory = timed(lambda: [rendered.get(render_key(text)) for text in texts])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        db.store_rendered_html(list(rendered.items()))
+        keys = [render_key(text) for text in texts]
+        stored = timed(lambda: db.get_rendered_html(keys))
+        db.close()
+
+    sources = [CODE + "\n# %d" % i for i in range(args.messages)]
+    cold = timed(lambda: [highlight_code(source, "python") for source in sources])
+    warm = timed(lambda: [highlight_code(source, "python") for source in sources])
+
+    per = 1000 / args.messages
+    print(f"{args.messages} messages of {len(texts[0])} chars")
+    print(f"markdown-it parse:      {parse * per:.3f}ms per message")
+    print(f"memory cache hit:       {memory * per:.4f}ms per message")
+    print(f"persisted cache lookup: {stored * per:.4f}ms per message")
+    print(f"code highlight cold:    {cold * per:.3f}ms per block, cached {warm * per:.4f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Builds a synthetic project tree, indexes it with ProjectIndex (full scan,
+no-change rescan, watcher-style delta) and times fuzzy file and symbol
+queries against it.
+
+Usage: python benchmarks/bench_project_index.py [--files N] [--queries N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from project_index import ProjectIndex
+
+WORDS = ["core", "ui", "widget", "model", "view", "utils", "api", "server", "client",
+         "db", "index", "parser", "render", "cache", "config", "session", "worker"]
+
+QUERIES = ["widget_model", "wdgmdl", "cache", "ui", "srvcfg", "parser/render", "x", "session_worker.py"]
+
+def make_tree(root: Path, files: int, rng: random.Random):
+    """Write a project of small Python and text files in nested directories"""
+    for i in range(files):
+        parts = [rng.choice(WORDS) + str(rng.randint(0, 30)) for _ in range(rng.randint(1, 4))]
+        directory = root.joinpath(*parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = "_".join(rng.sample(WORDS, 2)) + str(i)
+        if i % 3 == 0:
+            (directory / (name + ".py")).write_text(
+                f"class {name.title().replace('_', '')}:\n    pass\n\ndef {name}_helper():\n    pass\n"
+            )
+        else:
+            (directory / (name + ".md")).write_text(name)
+
+def timed_queries(search, queries, repeat: int) -> float:
+    """Slowest average time per query in milliseconds"""
+    worst = 0.0
+    for query in queries:
+        search(query)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            search(query)
+        worst = max(worst, (time.perf_counter() - start) / repeat * 1000)
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=20, help="Repetitions per query")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "project"
+        root.mkdir()
+        print(f"Writing {args.files} files...")
+        make_tree(root, args.files, rng)
+        db_path = os.path.join(tmp, "project_index.db")
+
+        index = ProjectIndex(db_path, str(root))
+        start = time.perf_counter()
+        changed, _ = index.scan()
+        print(f"Full scan: {changed} files in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        changed, _ = index.scan()
+        print(f"Rescan without changes: {changed} files in {time.perf_counter() - start:.2f}s")
+
+        directory = next(path for path in root.iterdir() if path.is_dir())
+        (directory / "added_module.py").write_text("def added():\n    pass\n")
+        start = time.perf_counter()
+        changed = index.update_paths([str(directory)])
+        print(f"Directory delta: {changed} files in {(time.perf_counter() - start) * 1000:.1f}ms")
+        index.close()
+
+        start = time.perf_counter()
+        index = ProjectIndex(db_path, str(root))
+        index.load()
+        print(f"Reload from disk: {len(index)} files in {time.perf_counter() - start:.2f}s")
+
+        worst = timed_queries(index.search_files, QUERIES, args.queries)
+        print(f"File queries: slowest {worst:.2f}ms")
+        worst = timed_queries(index.search_symbols, QUERIES, args.queries)
+        print(f"Symbol queries: slowest {worst:.2f}ms")
+        index.close()
+
+if __name__ == "__main__":
+    main()
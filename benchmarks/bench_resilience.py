@@ -0,0 +1,82 @@
+"""
+Throughput under quota pressure: a burst of prompts against the fake
+gemini CLI when it only allows a few concurrent runs and rejects the
+rest with a 429. Compares retrying at a fixed concurrency with the
+adaptive (AIMD) limit, and a run with a transient failure rate, by
+prompts per second, attempts and retries.
+
+Usage: python benchmarks/bench_resilience.py [--prompts N] [--quota N] [--concurrency N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, QEventLoop
+
+from agent_worker import AgentWorker
+from resilience import RetryPolicy
+
+FAKE_GEMINI = str(Path(__file__).resolve().parent / "fake_gemini.py")
+
+def run_burst(prompts: int, concurrency: int, adaptive: bool) -> dict:
+    """Send a burst of prompts and return the outcome with the worker's stats"""
+    policy = RetryPolicy(max_attempts=8, base_delay_ms=200, max_delay_ms=5000, timeout_ms=30_000)
+    worker = AgentWorker(cli_path=FAKE_GEMINI, streaming=False, max_concurrent=concurrency,
+                         retry_policy=policy, adaptive_concurrency=adaptive)
+    loop = QEventLoop()
+    outcome = {"ok": 0, "failed": 0}
+
+    def finished(key):
+        outcome[key] += 1
+        if outcome["ok"] + outcome["failed"] == prompts:
+            loop.quit()
+
+    worker.response_ready.connect(lambda *_args: finished("ok"))
+    worker.error_occurred.connect(lambda *_args: finished("failed"))
+    start = time.perf_counter()
+    for i in range(prompts):
+        worker.send_prompt(f"prompt {i}")
+    loop.exec()
+    elapsed = time.perf_counter() - start
+    stats = worker.resilience_stats()
+    worker.shutdown()
+    return dict(outcome, elapsed=elapsed, stats=stats)
+
+def report(label: str, prompts: int, result: dict):
+    stats = result["stats"]
+    print(f"{label:28}: {prompts / result['elapsed']:5.2f} prompts/s, {result['ok']} ok, "
+          f"{result['failed']} failed, {stats['attempts']} attempts, {stats['retries']} retries "
+          f"{stats['failures']}, backoff {stats['backoff_total_ms'] / 1000:.1f} s, "
+          f"final limit {stats['concurrency_limit']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=40)
+    parser.add_argument("--quota", type=int, default=2, help="Concurrent runs the fake CLI accepts")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ["FAKE_GEMINI_STARTUP_MS"] = "100"
+    os.environ["FAKE_GEMINI_TOKENS"] = "100"
+    os.environ["FAKE_GEMINI_TOKEN_RATE"] = "500"
+    app = QCoreApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as quota_dir:
+        os.environ["FAKE_GEMINI_QUOTA"] = str(args.quota)
+        os.environ["FAKE_GEMINI_QUOTA_DIR"] = quota_dir
+        for adaptive in (False, True):
+            label = f"quota {args.quota}, {'adaptive' if adaptive else 'fixed'} {args.concurrency}"
+            report(label, args.prompts, run_burst(args.prompts, args.concurrency, adaptive))
+        del os.environ["FAKE_GEMINI_QUOTA"]
+
+    os.environ["FAKE_GEMINI_FAILURE_RATE"] = "0.2"
+    report("20% transient failures", args.prompts, run_burst(args.prompts, args.concurrency, True))
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Replays thousands of small edits to a large source file through the
+SnapshotStore and reports snapshot/restore speed and disk use compared
+with keeping a full copy per edit.
+
+Usage: python benchmarks/bench_snapshots.py [--edits N] [--lines N]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from snapshot_store import SnapshotStore
+
+def make_source(lines: int) -> list:
+    """Build a Python-looking file as a list of lines"""
+    return [
+        f"def function_{i}(value):\n" if i % 10 == 0 else f"    value = value * {i} + {i % 7}\n"
+        for i in range(lines)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edits", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lines = make_source(args.lines)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(str(Path(tmp) / ".gemini-versions"))
+        target = Path(tmp) / "module.py"
+
+        refs = []
+        full_copy_bytes = 0
+        start = time.perf_counter()
+        for i in range(args.edits):
+            lines[rng.randrange(len(lines))] = f"    value = edited({i})\n"
+            target.write_text("".join(lines))
+            full_copy_bytes += target.stat().st_size
+            refs.append(store.snapshot(str(target)))
+        snapshot_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for ref in refs[-100:]:
+            store.restore(ref, str(target))
+        restore_time = (time.perf_counter() - start) / min(100, len(refs))
+
+        used = store.disk_usage()
+        file_size = target.stat().st_size
+        print(f"file size        : {file_size / 1024:10.1f} KB")
+        print(f"snapshot         : {snapshot_time / args.edits * 1000:10.2f} ms/edit "
+              f"({file_size / (snapshot_time / args.edits) / 1e6:.1f} MB/s)")
+        print(f"restore          : {restore_time * 1000:10.2f} ms/snapshot")
+        print(f"store size       : {used / 1e6:10.2f} MB (full copies: {full_copy_bytes / 1e6:.2f} MB, "
+              f"{full_copy_bytes / used:.1f}x smaller)")
+
+        start = time.perf_counter()
+        removed, freed = store.gc(refs[-10:])
+        print(f"gc keep last 10  : {removed} objects, {freed / 1e6:.2f} MB freed "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
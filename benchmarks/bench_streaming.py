@@ -0,0 +1,61 @@
+"""
+Measures time-to-first-chunk versus time-to-full-response for AgentWorker
+against the fake gemini CLI.
+
+Usage: python benchmarks/bench_streaming.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, QEventLoop
+
+from agent_worker import AgentWorker
+
+FAKE_GEMINI = str(Path(__file__).resolve().parent / "fake_gemini.py")
+
+def run_once(worker: AgentWorker) -> tuple:
+    """Send one prompt and return (first chunk seconds, full response seconds)"""
+    loop = QEventLoop()
+    times = {}
+    start = time.perf_counter()
+
+    def on_chunk(_request_id, _chunk):
+        times.setdefault("first", time.perf_counter() - start)
+
+    def on_done(_request_id, _response):
+        times["done"] = time.perf_counter() - start
+        loop.quit()
+
+    worker.chunk_received.connect(on_chunk)
+    worker.response_ready.connect(on_done)
+    worker.error_occurred.connect(lambda _request_id, _error: loop.quit())
+    worker.send_prompt("explain this function")
+    loop.exec()
+    worker.chunk_received.disconnect(on_chunk)
+    worker.response_ready.disconnect(on_done)
+    return times.get("first", times.get("done")), times.get("done")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    for streaming in (False, True):
+        worker = AgentWorker(cli_path=FAKE_GEMINI, streaming=streaming)
+        results = [run_once(worker) for _ in range(args.runs)]
+        first = statistics.median(r[0] for r in results) * 1000
+        done = statistics.median(r[1] for r in results) * 1000
+        label = "streaming" if streaming else "buffered"
+        print(f"{label:>10}: first output {first:8.1f} ms, full response {done:8.1f} ms")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares prompt-to-first-output latency with and without the warm CLI
+process pool, using the fake gemini CLI with a simulated start-up cost.
+
+Usage: python benchmarks/bench_warm_pool.py [--prompts N] [--startup-ms MS]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from agent_worker import AgentWorker
+
+FAKE_GEMINI = str(Path(__file__).resolve().parent / "fake_gemini.py")
+
+def wait(ms: int):
+    """Run the event loop for a while so the pool can refill"""
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+def first_output_latency(worker: AgentWorker) -> float:
+    """Send one prompt and return the seconds until its first chunk"""
+    loop = QEventLoop()
+    times = {}
+    start = time.perf_counter()
+
+    def on_chunk(_request_id, _chunk):
+        times.setdefault("first", time.perf_counter() - start)
+
+    worker.chunk_received.connect(on_chunk)
+    worker.response_ready.connect(lambda *_args: loop.quit())
+    worker.error_occurred.connect(lambda *_args: loop.quit())
+    worker.send_prompt("explain this function")
+    loop.exec()
+    worker.chunk_received.disconnect(on_chunk)
+    worker.response_ready.disconnect()
+    worker.error_occurred.disconnect()
+    return times.get("first", float("nan"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=5)
+    parser.add_argument("--startup-ms", type=int, default=400)
+    args = parser.parse_args()
+
+    os.environ["FAKE_GEMINI_STARTUP_MS"] = str(args.startup_ms)
+    os.environ.setdefault("FAKE_GEMINI_TOKENS", "50")
+    app = QCoreApplication(sys.argv)
+
+    for pool_size in (0, 2):
+        worker = AgentWorker(cli_path=FAKE_GEMINI, warm_pool_size=pool_size)
+        latencies = []
+        for _ in range(args.prompts):
+            # Think time between prompts, long enough for a warm process to start
+            wait(args.startup_ms * 2)
+            latencies.append(first_output_latency(worker))
+        label = f"warm pool {pool_size}" if pool_size else "cold start"
+        print(f"{label:>12}: median first output {statistics.median(latencies) * 1000:8.1f} ms")
+        if worker.pool is not None:
+            print(f"{'':>12}  pool stats {worker.pool.stats()}")
+        worker.shutdown()
+    app.quit()
+
+if __name__ == "__main__":
+    main()
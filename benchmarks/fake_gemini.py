@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the gemini CLI, used by the benchmarks.
+
+Accepts the same ``-p PROMPT`` invocation as the real CLI, or reads the
+prompt from stdin after start-up when ``-p`` is absent, and writes a
+markdown answer to stdout. Behaviour is tuned with environment variables:
+
+    FAKE_GEMINI_STARTUP_MS   delay before the first byte (default 200)
+    FAKE_GEMINI_TOKENS       number of tokens in the answer (default 400)
+    FAKE_GEMINI_TOKEN_RATE   tokens written per second (default 200)
+    FAKE_GEMINI_FAILURE_RATE probability of failing with exit code 1 (default 0)
+    FAKE_GEMINI_SEED         seed for the failure draw, unset for random
+    FAKE_GEMINI_QUOTA        concurrent runs allowed before failing with a
+                             429 rate-limit error (default 0, unlimited)
+    FAKE_GEMINI_QUOTA_DIR    directory in which runs count each other for
+                             the quota (required with FAKE_GEMINI_QUOTA)
+"""
+import atexit
+import os
+import random
+import sys
+import time
+
+def env_number(name: str, default: float) -> float:
+    """Read a numeric knob from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def answer_tokens(count: int):
+    """Yield a markdown answer made of paragraphs, a list and a code block"""
+    words = ["gemini", "answer", "token", "stream", "latency", "render", "chunk"]
+    for i in range(count):
+        if i and i % 60 == 0:
+            yield "\n\n```python\ndef f(x):\n    return x * 2\n```\n\n"
+        elif i and i % 25 == 0:
+            yield "\n\n- item %d " % i
+        else:
+            yield words[i % len(words)] + " "
+
+def over_quota() -> bool:
+    """Register this run in the quota directory; True if too many are running"""
+    quota = int(env_number("FAKE_GEMINI_QUOTA", 0))
+    directory = os.environ.get("FAKE_GEMINI_QUOTA_DIR")
+    if quota <= 0 or not directory:
+        return False
+    marker = os.path.join(directory, str(os.getpid()))
+    open(marker, "w").close()
+    atexit.register(os.remove, marker)
+    return len(os.listdir(directory)) > quota
+
+def main():
+    # Simulated interpreter, auth and module load cost
+    time.sleep(env_number("FAKE_GEMINI_STARTUP_MS", 200) / 1000)
+
+    args = sys.argv[1:]
+    prompt = args[args.index("-p") + 1] if "-p" in args else sys.stdin.read()
+
+    if over_quota():
+        sys.stderr.write("Error: 429 Too Many Requests: RESOURCE_EXHAUSTED, quota exceeded for "
+                         "concurrent requests. Please retry after 1s.\n")
+        sys.exit(1)
+
+    seed = os.environ.get("FAKE_GEMINI_SEED")
+    rng = random.Random(seed + prompt if seed is not None else None)
+    if rng.random() < env_number("FAKE_GEMINI_FAILURE_RATE", 0):
+        sys.stderr.write("Error: simulated API failure (500 Internal Server Error)\n")
+        sys.exit(1)
+
+    rate = env_number("FAKE_GEMINI_TOKEN_RATE", 200)
+    delay = 1 / rate if rate > 0 else 0
+    sys.stdout.write("You asked: %s\n\n" % prompt.strip()[:80])
+    for token in answer_tokens(int(env_number("FAKE_GEMINI_TOKENS", 400))):
+        sys.stdout.write(token)
+        sys.stdout.flush()
+        if delay:
+            time.sleep(delay)
+    sys.stdout.write("\n")
+
+if __name__ == "__main__":
+    main()
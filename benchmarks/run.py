@@ -0,0 +1,279 @@
+"""
+Offline benchmark suite. Runs headless (offscreen Qt) against the fake
+gemini CLI and writes the results as JSON; pass --compare with an earlier
+results file to see what got faster or slower.
+
+    latency      prompt to first byte, first render and full response
+    chat_view    ChatWidget.add_message cost at growing history lengths
+    database     insert throughput and history/search query time
+    highlighter  PythonHighlighter and tokenizer time per line
+
+Usage: python benchmarks/run.py [--output FILE] [--compare OLD.json] [--only NAME ...] [--quick]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import PySide6
+from PySide6.QtCore import QEventLoop, QTimer
+from PySide6.QtWidgets import QApplication
+
+from agent_worker import AgentWorker
+from database import Database
+from ui.chat_view import ChatMessage
+from ui.chat_widget import ChatWidget
+from ui.code_editor import PythonHighlighter
+from ui.syntax import PYTHON, scan_line
+from bench_database import RESPONSE, bench_sync, bench_queued
+from bench_highlighter import SAMPLE, time_document
+
+FAKE_GEMINI = str(Path(__file__).resolve().parent / "fake_gemini.py")
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def wait_until(done, timeout_ms: int = 30000):
+    """Run the event loop until done() is true or the timeout passes"""
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: loop.quit() if done() else None)
+    timer.start(1)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec()
+    timer.stop()
+
+def bench_latency(args) -> dict:
+    """Prompt to first streamed byte, first rendered update and full response through ChatWidget"""
+    os.environ["FAKE_GEMINI_STARTUP_MS"] = str(args.startup_ms)
+    os.environ["FAKE_GEMINI_TOKENS"] = str(args.tokens)
+    os.environ["FAKE_GEMINI_TOKEN_RATE"] = str(args.token_rate)
+    os.environ["FAKE_GEMINI_FAILURE_RATE"] = str(args.failure_rate)
+
+    worker = AgentWorker(cli_path=FAKE_GEMINI)
+    widget = ChatWidget(worker)
+    widget.resize(500, 700)
+    widget.show()
+    model = widget.chat_view.chat_model
+
+    samples = {"first_byte": [], "first_render": [], "complete": []}
+    failures = 0
+    for run in range(args.runs):
+        times = {}
+        start = time.perf_counter()
+
+        def on_chunk(_request_id, _chunk):
+            times.setdefault("first_byte", time.perf_counter() - start)
+
+        def on_changed(*_args):
+            if "first_byte" in times and model.messages()[-1].html is not None:
+                times.setdefault("first_render", time.perf_counter() - start)
+
+        def on_finished(*_args):
+            times["complete"] = time.perf_counter() - start
+
+        def on_error(*_args):
+            times["failed"] = True
+
+        worker.chunk_received.connect(on_chunk)
+        model.dataChanged.connect(on_changed)
+        worker.response_ready.connect(on_finished)
+        worker.error_occurred.connect(on_error)
+        widget.input_text.setPlainText(f"benchmark prompt {run}")
+        widget.submit_prompt()
+        wait_until(lambda: "complete" in times or "failed" in times)
+        worker.chunk_received.disconnect(on_chunk)
+        model.dataChanged.disconnect(on_changed)
+        worker.response_ready.disconnect(on_finished)
+        worker.error_occurred.disconnect(on_error)
+
+        if "complete" not in times:
+            failures += 1
+            continue
+        for name in samples:
+            if name in times:
+                samples[name].append(times[name] * 1000)
+
+    worker.shutdown()
+    widget.close_renderer()
+    widget.close()
+    results = {"runs": args.runs, "failures": failures}
+    for name, values in samples.items():
+        if values:
+            results[f"{name}_ms_p50"] = percentile(values, 0.5)
+            results[f"{name}_ms_p95"] = percentile(values, 0.95)
+    return results
+
+def bench_chat_view(args) -> dict:
+    """Cost of adding one message, including layout and paint, as history grows"""
+    worker = AgentWorker(cli_path=FAKE_GEMINI)
+    widget = ChatWidget(worker)
+    widget.resize(500, 700)
+    widget.show()
+    app = QApplication.instance()
+    model = widget.chat_view.chat_model
+    text = RESPONSE
+
+    results = {}
+    for length in args.history_lengths:
+        missing = length - len(model.messages())
+        if missing > 0:
+            widget.chat_view.prepend_messages(
+                [ChatMessage(text, is_user=i % 2 == 0) for i in range(missing)]
+            )
+            app.processEvents()
+        start = time.perf_counter()
+        for i in range(args.adds):
+            widget.add_message(text, is_user=i % 2 == 0)
+            app.processEvents()
+        results[f"add_message_ms_at_{length}"] = (time.perf_counter() - start) / args.adds * 1000
+
+    worker.shutdown()
+    widget.close_renderer()
+    widget.close()
+    return results
+
+def bench_database(args) -> dict:
+    """Insert throughput and query latency on a fresh database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        sessions = [db.create_session(f"/project/{i}") for i in range(20)]
+        sync_turns = args.turns // 10
+        results = {
+            "sync_insert_per_s": sync_turns / bench_sync(db, sessions, sync_turns),
+            "queued_insert_per_s": args.turns / bench_queued(db, sessions, args.turns),
+        }
+
+        start = time.perf_counter()
+        for session_id in sessions:
+            db.get_history_page(session_id, None, 50)
+        results["history_page_ms"] = (time.perf_counter() - start) / len(sessions) * 1000
+
+        start = time.perf_counter()
+        for session_id in sessions:
+            db.get_session_history(session_id)
+        results["full_history_ms"] = (time.perf_counter() - start) / len(sessions) * 1000
+
+        if db.search_available:
+            queries = ["explanation", "return", "prompt 42", "def f"]
+            start = time.perf_counter()
+            for query in queries:
+                db.search_history(query)
+            results["search_ms"] = (time.perf_counter() - start) / len(queries) * 1000
+        db.close()
+    return results
+
+def bench_highlighter(args) -> dict:
+    """PythonHighlighter time per line, and the tokenizer alone"""
+    sample_lines = SAMPLE.splitlines()
+    lines = (sample_lines * (args.lines // len(sample_lines) + 1))[:args.lines]
+
+    start = time.perf_counter()
+    state = 0
+    for line in lines:
+        _, state = scan_line(PYTHON, line, state)
+    scan = time.perf_counter() - start
+
+    document = time_document(PythonHighlighter, "\n".join(lines))
+    return {
+        "lines": args.lines,
+        "highlight_us_per_line": document / args.lines * 1e6,
+        "scan_us_per_line": scan / args.lines * 1e6,
+    }
+
+BENCHMARKS = {
+    "latency": bench_latency,
+    "chat_view": bench_chat_view,
+    "database": bench_database,
+    "highlighter": bench_highlighter,
+}
+
+def metadata() -> dict:
+    """Where and on what version the suite ran"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pyside6": PySide6.__version__,
+        "platform": platform.platform(),
+    }
+
+def lower_is_better(metric: str) -> bool:
+    return not metric.endswith("_per_s")
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """Print the change of every shared metric and return the number of regressions"""
+    regressions = 0
+    print(f"\nCompared with {old['meta'].get('commit')} ({old['meta'].get('timestamp')}):")
+    for name, metrics in new["results"].items():
+        for metric, value in metrics.items():
+            before = old["results"].get(name, {}).get(metric)
+            if not isinstance(before, (int, float)) or not before or metric in ("runs", "lines"):
+                continue
+            change = (value - before) / before
+            worse = change > threshold if lower_is_better(metric) else change < -threshold
+            regressions += worse
+            print(f"  {name}.{metric:<28} {before:12.3f} -> {value:12.3f} {change:+7.1%}"
+                  f"{'  REGRESSION' if worse else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default 0.10)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast check")
+    parser.add_argument("--runs", type=int, help="Prompts sent by the latency benchmark")
+    parser.add_argument("--startup-ms", type=float, default=200, help="Fake CLI start-up delay")
+    parser.add_argument("--tokens", type=int, default=400, help="Fake CLI answer length in tokens")
+    parser.add_argument("--token-rate", type=float, default=200, help="Fake CLI tokens per second")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fake CLI failure probability")
+    args = parser.parse_args()
+
+    args.runs = args.runs or (5 if args.quick else 20)
+    args.history_lengths = [0, 100, 1000] if args.quick else [0, 100, 1000, 5000]
+    args.adds = 10 if args.quick else 50
+    args.turns = 5000 if args.quick else 50000
+    args.lines = 5000 if args.quick else 20000
+
+    app = QApplication(sys.argv[:1])
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "only")}
+    report = {"meta": metadata(), "config": config, "results": {}}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", flush=True)
+        report["results"][name] = BENCHMARKS[name](args)
+        for metric, value in report["results"][name].items():
+            print(f"  {metric:<28} {value:12.3f}" if isinstance(value, float) else f"  {metric:<28} {value:>12}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        app.quit()
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from PySide6.QtCore import QObject, QProcess, QTimer, QElapsedTimer
+from typing import Dict, List, Optional
+
+class WarmProcessPool(QObject):
+    """
+    Keeps pre-started Gemini CLI processes waiting on stdin.
+
+    Without ``-p`` the CLI reads its prompt from stdin until EOF, so a process
+    launched ahead of time has already paid its interpreter, auth and module
+    load cost by the time a prompt arrives. Each warm process answers one
+    prompt and is then replaced in the background. Idle processes that exit
+    on their own are counted as crashes and replaced; ones idle for longer
+    than ``max_idle_ms`` are recycled so stale auth state does not linger.
+    If the CLI keeps dying, refilling pauses and is retried after a backoff
+    that doubles while the retries keep failing.
+    """
+
+    MAX_CONSECUTIVE_CRASHES = 3  # Pause refilling if the CLI keeps dying while idle
+    RETRY_BACKOFF_MS = 30 * 1000  # First pause, doubled up to MAX_RETRY_BACKOFF_MS
+    MAX_RETRY_BACKOFF_MS = 10 * 60 * 1000
+
+    def __init__(self, program: str, arguments: Optional[List[str]] = None,
+                 size: int = 2, max_idle_ms: int = 5 * 60 * 1000, parent=None):
+        super().__init__(parent)
+        self.program = program
+        self.arguments = arguments or []
+        self.size = max(0, size)
+        self.max_idle_ms = max_idle_ms
+        self._starting: List[QProcess] = []
+        self._idle: List[QProcess] = []
+        self._idle_since: Dict[QProcess, QElapsedTimer] = {}
+        self._consecutive_crashes = 0
+        self._stats = {"hits": 0, "misses": 0, "spawned": 0, "crashed": 0, "recycled": 0}
+        self._dropped: List[QProcess] = []  # Unparented and freed on the next event loop pass
+
+        self._recycle_timer = QTimer(self)
+        self._recycle_timer.setInterval(max(1000, max_idle_ms // 4))
+        self._recycle_timer.timeout.connect(self._recycle_stale)
+        self._recycle_timer.start()
+        self._backoff_ms = self.RETRY_BACKOFF_MS
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._retry_refill)
+        self._refill()
+
+    def acquire(self) -> Optional[QProcess]:
+        """
+        Takes a ready process out of the pool, or returns None on a miss.
+        The caller owns the returned process and must write the prompt to it
+        """
+        if not self._idle:
+            self._stats["misses"] += 1
+            self._refill()
+            return None
+
+        process = self._idle.pop(0)
+        self._idle_since.pop(process, None)
+        self._detach(process)
+        self._stats["hits"] += 1
+        self._mark_healthy()
+        QTimer.singleShot(0, self._refill)
+        return process
+
+    def stats(self) -> dict:
+        """Pool hit/miss counters and current occupancy"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return dict(
+            self._stats,
+            idle=len(self._idle),
+            starting=len(self._starting),
+            hit_rate=self._stats["hits"] / lookups if lookups else 0.0,
+        )
+
+    def shutdown(self):
+        """Kills every process still owned by the pool"""
+        self._recycle_timer.stop()
+        self._retry_timer.stop()
+        self.size = 0
+        for process in self._starting + self._idle:
+            self._detach(process)
+            process.kill()
+            process.waitForFinished(1000)
+            process.setParent(None)
+        self._starting.clear()
+        self._idle.clear()
+        self._idle_since.clear()
+        self._free_dropped()
+
+    def _refill(self):
+        """Starts processes until idle plus starting ones reach the pool size"""
+        if self._consecutive_crashes >= self.MAX_CONSECUTIVE_CRASHES:
+            if self.size and not self._retry_timer.isActive():
+                self._retry_timer.start(self._backoff_ms)
+                self._backoff_ms = min(self.MAX_RETRY_BACKOFF_MS, self._backoff_ms * 2)
+            return
+        while len(self._idle) + len(self._starting) < self.size:
+            process = QProcess(self)
+            process.started.connect(self._handle_started)
+            process.finished.connect(self._handle_exit)
+            process.errorOccurred.connect(self._handle_error)
+            self._starting.append(process)
+            self._stats["spawned"] += 1
+            process.start(self.program, self.arguments)
+
+    def _handle_started(self):
+        """Moves a freshly launched process into the idle list"""
+        process = self.sender()
+        if process in self._starting:
+            self._starting.remove(process)
+            self._idle.append(process)
+            timer = QElapsedTimer()
+            timer.start()
+            self._idle_since[process] = timer
+
+    def _handle_exit(self, *_args):
+        """Replaces a pooled process that exited before being used"""
+        process = self.sender()
+        if self._forget(process):
+            self._stats["crashed"] += 1
+            self._consecutive_crashes += 1
+            self._refill()
+
+    def _handle_error(self, error: QProcess.ProcessError):
+        """Treats a pooled process that failed to launch like a crash"""
+        if error == QProcess.FailedToStart:
+            self._handle_exit()
+
+    def _recycle_stale(self):
+        """Replaces processes that have been idle for longer than max_idle_ms"""
+        stale = [p for p, timer in self._idle_since.items() if timer.hasExpired(self.max_idle_ms)]
+        for process in stale:
+            self._forget(process)
+            process.kill()
+            self._stats["recycled"] += 1
+        if stale:
+            self._refill()
+        elif self._idle:
+            # Pooled processes are staying up, so the CLI is healthy again
+            self._mark_healthy()
+
+    def _retry_refill(self):
+        """Tries refilling again after a pause; one more crash pauses it again"""
+        self._consecutive_crashes = self.MAX_CONSECUTIVE_CRASHES - 1
+        self._refill()
+
+    def _mark_healthy(self):
+        self._consecutive_crashes = 0
+        self._backoff_ms = self.RETRY_BACKOFF_MS
+
+    def _forget(self, process: QProcess) -> bool:
+        """Drops a process from the pool. Returns False if it was not pooled"""
+        if process in self._starting:
+            self._starting.remove(process)
+        elif process in self._idle:
+            self._idle.remove(process)
+            self._idle_since.pop(process, None)
+        else:
+            return False
+        self._detach(process)
+        # Often called from the process's own signals, so it is freed later
+        process.setParent(None)
+        self._dropped.append(process)
+        if len(self._dropped) == 1:
+            QTimer.singleShot(0, self._free_dropped)
+        return True
+
+    def _free_dropped(self):
+        self._dropped.clear()
+
+    def _detach(self, process: QProcess):
+        """Disconnects the pool's handlers from a process"""
+        process.started.disconnect(self._handle_started)
+        process.finished.disconnect(self._handle_exit)
+        process.errorOccurred.disconnect(self._handle_error)
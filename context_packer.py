@@ -0,0 +1,317 @@
+import ast
+import hashlib
+import math
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, FrozenSet, List, Optional, Set, Tuple
+
+CHARS_PER_TOKEN = 4  # Rough average for code and English with Gemini's tokenizer
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def extract_terms(text: str) -> FrozenSet[str]:
+    """Lowercased identifiers in a text, plus the parts of snake_case names"""
+    terms = set()
+    for word in _IDENTIFIER.findall(text):
+        word = word.lower()
+        terms.add(word)
+        if "_" in word:
+            terms.update(part for part in word.split("_") if len(part) > 2)
+    return frozenset(terms)
+
+@dataclass(eq=False)
+class Chunk:
+    """A contiguous piece of a file that can be attached to a prompt"""
+    path: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+    name: Optional[str] = None  # Function or class defined by the chunk
+    tokens: int = 0
+    terms: FrozenSet[str] = frozenset()
+
+    def __post_init__(self):
+        self.tokens = estimate_tokens(self.text)
+        self.terms = extract_terms(self.text)
+
+@dataclass
+class FileChunks:
+    """Cached chunking of one file version"""
+    mtime: Optional[float]
+    size: int  # Bytes on disk, or of the UTF-8 buffer text
+    digest: str
+    chunks: List[Chunk]
+    imports: List[Tuple[str, int]]  # (module, relative import level)
+    imported_names: Set[str] = field(default_factory=set)
+
+@dataclass
+class PackedContext:
+    """A prompt with the code chunks chosen to accompany it"""
+    prompt: str
+    text: str  # What is sent to the CLI
+    chunks: List[Chunk]
+    tokens: int
+    dropped: int  # Candidate chunks that did not fit in the budget
+
+    @property
+    def attachments(self) -> List[Tuple[str, str]]:
+        """(label, content) pairs identifying the attached code, e.g. for cache keys"""
+        return [("%s:%d-%d" % (c.path, c.start_line, c.end_line), c.text) for c in self.chunks]
+
+    @property
+    def files(self) -> List[str]:
+        return list(dict.fromkeys(chunk.path for chunk in self.chunks))
+
+def _first_line(node: ast.AST) -> int:
+    """First line of a definition, including its decorators"""
+    return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+def chunk_source(path: str, text: str, max_lines: int = 80) -> Tuple[List[Chunk], List[Tuple[str, int]]]:
+    """
+    Split a file into chunks and list its imports. Python modules are split
+    at top-level definitions (the module header becomes its own chunk);
+    other files, or definitions longer than max_lines, are cut into windows
+    """
+    lines = text.splitlines(keepends=True)
+    spans: List[Tuple[int, int, Optional[str]]] = []
+    imports: List[Tuple[str, int]] = []
+
+    tree = None
+    if path.endswith(".py"):
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            pass
+
+    if tree is not None:
+        starts = []
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                starts.append((_first_line(node), node.name))
+                # Long classes are split further at their methods
+                if isinstance(node, ast.ClassDef) and node.end_lineno - node.lineno > max_lines:
+                    starts.extend(
+                        (_first_line(child), "%s.%s" % (node.name, child.name)) for child in node.body
+                        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    )
+            elif isinstance(node, ast.Import):
+                imports.extend((alias.name, 0) for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                module = node.module or ""
+                imports.append((module, node.level))
+                # "from package import module" may name submodules
+                imports.extend(("%s.%s" % (module, a.name) if module else a.name, node.level)
+                               for a in node.names)
+        if not starts or starts[0][0] > 1:
+            starts.insert(0, (1, None))
+        for (start, name), following in zip(starts, starts[1:] + [(len(lines) + 1, None)]):
+            spans.append((start, following[0] - 1, name))
+    else:
+        spans.append((1, len(lines), None))
+
+    chunks = []
+    for start, end, name in spans:
+        for window in range(start, end + 1, max_lines):
+            window_end = min(end, window + max_lines - 1)
+            body = "".join(lines[window - 1:window_end])
+            if body.strip():
+                chunks.append(Chunk(path, window, window_end, body, name if window == start else None))
+    return chunks, imports
+
+class ContextPacker:
+    """
+    Assembles the code context sent with a prompt: the editor selection,
+    the most relevant parts of the current file, and parts of files it
+    imports or that define names mentioned in the prompt, packed greedily
+    by relevance under a token budget.
+
+    Chunked files are cached; an entry is reused while the file's mtime
+    and size are unchanged, or when its content hash still matches.
+    """
+
+    MAX_CACHED_FILES = 500
+    MAX_FILE_BYTES = 1024 * 1024  # Larger related files are not attached
+    MAX_RELATED_FILES = 8
+    HEADER_TOKENS = 12  # Allowance for the per-chunk file/line header and fences
+
+    def __init__(self, budget_tokens: int = 4000, project_root: Optional[str] = None,
+                 symbol_lookup: Optional[Callable[[str], List[str]]] = None):
+        self.budget_tokens = budget_tokens
+        self.project_root = project_root
+        # Maps a symbol name to the absolute paths of files defining it
+        self.symbol_lookup = symbol_lookup
+        self._cache: "OrderedDict[str, FileChunks]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def set_project(self, project_root: Optional[str]):
+        self.project_root = project_root
+        self._cache.clear()
+
+    def pack(self, prompt: str, current_path: Optional[str] = None, current_text: Optional[str] = None,
+             selection: str = "", cursor_line: Optional[int] = None) -> PackedContext:
+        """Build the prompt text with as much relevant context as fits the budget"""
+        budget = self.budget_tokens - estimate_tokens(prompt)
+        query = extract_terms(prompt + "\n" + selection)
+        candidates: List[Tuple[float, int, Chunk]] = []
+        order = 0
+
+        selected = None
+        if selection.strip() and budget > self.HEADER_TOKENS:
+            text = selection[:(budget - self.HEADER_TOKENS) * CHARS_PER_TOKEN]
+            selected = Chunk(current_path or "selection", 0, 0, text)  # Line 0 marks the selection
+            budget -= selected.tokens + self.HEADER_TOKENS
+
+        current = None
+        if current_path is not None:
+            current = self.file_chunks(current_path, current_text)
+        if current is not None:
+            for chunk in current.chunks:
+                score = 2.0 + self._relevance(chunk, query)
+                if cursor_line is not None and chunk.start_line <= cursor_line <= chunk.end_line:
+                    score += 5.0
+                candidates.append((score, order, chunk))
+                order += 1
+
+            wanted = query | {name.lower() for name in current.imported_names}
+            for path in self._related_files(current_path, current, query):
+                related = self.file_chunks(path)
+                if related is None:
+                    continue
+                for chunk in related.chunks:
+                    score = self._relevance(chunk, query)
+                    if chunk.name is not None and chunk.name.rpartition(".")[2].lower() in wanted:
+                        score += 2.0
+                    if score > 0:
+                        candidates.append((score, order, chunk))
+                    order += 1
+
+        chosen = []
+        dropped = 0
+        for score, position, chunk in sorted(candidates, key=lambda c: (-c[0], c[1])):
+            cost = chunk.tokens + self.HEADER_TOKENS
+            if cost <= budget:
+                chosen.append((position, chunk))
+                budget -= cost
+            else:
+                dropped += 1
+
+        # Present chunks in file order so neighbouring code reads naturally
+        chosen = [chunk for _, chunk in sorted(chosen, key=lambda c: c[0])]
+        if selected is not None:
+            chosen.insert(0, selected)
+        text = self._render(prompt, chosen)
+        return PackedContext(prompt, text, chosen, estimate_tokens(text), dropped)
+
+    def file_chunks(self, path: str, text: Optional[str] = None) -> Optional[FileChunks]:
+        """
+        Chunks of a file, from the cache when unchanged. ``text`` is the
+        editor buffer for files with unsaved edits
+        """
+        entry = self._cache.get(path)
+        mtime = size = None
+        if text is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if stat.st_size > self.MAX_FILE_BYTES:
+                return None
+            mtime, size = stat.st_mtime, stat.st_size
+            if entry is not None and entry.mtime == mtime and entry.size == stat.st_size:
+                self.hits += 1
+                self._cache.move_to_end(path)
+                return entry
+            try:
+                with open(path, "rb") as f:
+                    text = f.read().decode("utf-8", errors="replace")
+            except OSError:
+                return None
+
+        data = text.encode("utf-8")
+        digest = hashlib.sha1(data).hexdigest()
+        if entry is not None and entry.digest == digest:
+            # Touched but not changed; the next lookup takes the stat check
+            self.hits += 1
+            if mtime is not None:
+                entry.mtime, entry.size = mtime, size
+            self._cache.move_to_end(path)
+            return entry
+
+        self.misses += 1
+        chunks, imports = chunk_source(path, text)
+        entry = FileChunks(mtime, size if size is not None else len(data), digest, chunks, imports)
+        entry.imported_names = {module.rpartition(".")[2] for module, _ in imports if module}
+        self._cache[path] = entry
+        self._cache.move_to_end(path)
+        while len(self._cache) > self.MAX_CACHED_FILES:
+            self._cache.popitem(last=False)
+        return entry
+
+    def display_path(self, path: str) -> str:
+        """Path relative to the project root when inside it"""
+        if self.project_root:
+            try:
+                return Path(path).relative_to(self.project_root).as_posix()
+            except ValueError:
+                pass
+        return path
+
+    @staticmethod
+    def _relevance(chunk: Chunk, query: FrozenSet[str]) -> float:
+        """Shared identifiers, discounted for long chunks"""
+        if not query or not chunk.terms:
+            return 0.0
+        return len(chunk.terms & query) / math.sqrt(1 + chunk.tokens / 100)
+
+    def _related_files(self, current_path: str, current: FileChunks, query: FrozenSet[str]) -> List[str]:
+        """Project files imported by the current file or defining names in the prompt"""
+        related = []
+        base = Path(current_path).parent
+        roots = [Path(self.project_root)] if self.project_root else []
+        for module, level in current.imports:
+            if level:
+                anchor = base
+                for _ in range(level - 1):
+                    anchor = anchor.parent
+                search = [anchor]
+            else:
+                search = roots + [base]
+            parts = [part for part in module.split(".") if part]
+            for root in search:
+                candidate = root.joinpath(*parts) if parts else root
+                for path in (candidate.with_suffix(".py"), candidate / "__init__.py"):
+                    if parts and path.is_file():
+                        related.append(str(path))
+                        break
+
+        if self.symbol_lookup is not None:
+            for term in sorted(query, key=len, reverse=True)[:20]:
+                related.extend(self.symbol_lookup(term))
+
+        current_resolved = os.path.abspath(current_path)
+        unique = []
+        for path in dict.fromkeys(os.path.abspath(p) for p in related):
+            if path != current_resolved:
+                unique.append(path)
+        return unique[:self.MAX_RELATED_FILES]
+
+    def _render(self, prompt: str, chunks: List[Chunk]) -> str:
+        if not chunks:
+            return prompt
+        parts = [prompt, "", "Relevant code from the project:"]
+        for chunk in chunks:
+            fence = Path(chunk.path).suffix.lstrip(".")
+            if chunk.start_line == 0:
+                header = "Selected code in %s:" % self.display_path(chunk.path)
+            else:
+                header = "%s (lines %d-%d):" % (self.display_path(chunk.path), chunk.start_line, chunk.end_line)
+            parts.extend(["", header, "```" + fence, chunk.text.rstrip("\n"), "```"])
+        return "\n".join(parts)
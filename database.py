@@ -1,9 +1,119 @@
+import queue
+import re
 import sqlite3
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from concurrent.futures import Future
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+from instrumentation import get_tracer
+
+@dataclass
+class SearchHit:
+    turn_id: int
+    session_id: int
+    project_path: str
+    timestamp: datetime
+    prompt_snippet: str
+    response_snippet: str
+    rank: float
+
+def _to_fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all words, the last as a prefix"""
+    words = [word.replace('"', '') for word in text.split()]
+    words = [word for word in words if word]
+    if not words:
+        return ""
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+_TOKEN = re.compile(r"\w+")
+
+def _snippet(text: str, query: str, highlight: tuple, size: int) -> str:
+    """
+    What FTS5's snippet() returns for an index that keeps the text: the
+    ``size`` words of ``text`` with the most words of ``query``, the last
+    matching as a prefix, wrapped in the ``highlight`` markers
+    """
+    words = _TOKEN.findall(query.lower())
+    terms, prefix = set(words[:-1]), words[-1] if words else None
+    tokens = list(_TOKEN.finditer(text))
+    if not tokens:
+        return text
+    matched = [i for i, token in enumerate(tokens)
+               if token.group().lower() in terms or (prefix and token.group().lower().startswith(prefix))]
+    start = 0
+    if matched:
+        best = 0
+        for j, first in enumerate(matched):
+            count = bisect_left(matched, first + size) - j
+            if count > best:
+                best, start = count, first
+        # Lead in with a little context, but keep the window full at the end
+        start = max(0, min(start - size // 4, len(tokens) - size))
+    end = min(len(tokens), start + size)
+    matched = set(matched)
+    parts = ["…"] if start else []
+    position = tokens[start].start() if start else 0
+    for i in range(start, end):
+        token = tokens[i]
+        parts.append(text[position:token.start()])
+        if i in matched:
+            parts += [highlight[0], token.group(), highlight[1]]
+        else:
+            parts.append(token.group())
+        position = token.end()
+    parts.append(text[position:] if end == len(tokens) else "…")
+    return "".join(parts)
+
+# Bits of chat_turns.compressed
+PROMPT_COMPRESSED = 1
+RESPONSE_COMPRESSED = 2
+UNCHECKED = 4  # Written before compression existed; compress_turns has not looked at it yet
+
+COMPRESS_MIN_BYTES = 1024
+
+def _pack_text(text: str, flag: int) -> tuple:
+    """(stored value, flag) for a prompt or response, zlib-compressed if large and that helps"""
+    data = text.encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return packed, flag
+    return text, 0
+
+def _unpack_text(value, compressed: int):
+    """The text of a stored prompt or response"""
+    if compressed and isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+def _stored_size(value) -> int:
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+def _pack_turn(session_id: int, prompt: str, response: str, file_modified: Optional[str],
+               version_snapshot: Optional[str], compress: bool = True) -> tuple:
+    """INSERT_TURN_SQL parameters, with large prompts and responses compressed"""
+    if not compress:
+        return (session_id, prompt, response, file_modified, version_snapshot, 0)
+    prompt, prompt_flag = _pack_text(prompt, PROMPT_COMPRESSED)
+    response, response_flag = _pack_text(response, RESPONSE_COMPRESSED)
+    return (session_id, prompt, response, file_modified, version_snapshot, prompt_flag | response_flag)
+
+@dataclass
+class SessionUsage:
+    id: int
+    project_path: str
+    last_active: str  # Timestamp of the newest turn, or the session's creation
+    turns: int
+    bytes: int  # Stored size of prompts and responses
+
 @dataclass
 class ChatTurn:
     id: int
@@ -14,14 +124,183 @@ class ChatTurn:
     file_modified: Optional[str] = None
     version_snapshot: Optional[str] = None
 
+class _ChatTurnWriter(threading.Thread):
+    """
+    Background thread that batches queued chat turn inserts into transactions
+    """
+
+    def __init__(self, database: "Database", batch_size: int):
+        super().__init__(name="chat-turn-writer", daemon=True)
+        self.database = database
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Drain whatever else is already waiting, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if item is not None and item[0] is not None]
+            if rows:
+                self._write(rows)
+            # Flush markers carry no row, just a future to resolve
+            for item in batch:
+                if item is not None and item[0] is None:
+                    item[1].set_result(None)
+            if any(item is None for item in batch):
+                self.database.close_thread_connection()
+                return
+
+    def _write(self, rows):
+        """Insert one batch in a single transaction and resolve its futures"""
+        try:
+            with self.database._connect() as conn:
+                ids = [self.database._insert_turn(conn, values) for values, _ in rows]
+        except Exception as e:
+            for _, future in rows:
+                future.set_exception(e)
+            return
+        for (_, future), turn_id in zip(rows, ids):
+            future.set_result(turn_id)
+
 class Database:
-    def __init__(self, db_path: str = "agent_data.db"):
+    """
+    SQLite store for sessions and chat turns.
+
+    Each thread gets one long-lived connection in WAL mode. Chat turns can
+    be queued with ``queue_chat_turn``; a background writer inserts them in
+    batched transactions so the GUI thread never waits on a commit. With
+    ``lazy`` set, the file is not opened nor the schema migrated until the
+    first query, keeping construction off the start-up path.
+
+    Prompts and responses of COMPRESS_MIN_BYTES or more are stored
+    zlib-compressed, marked in the ``compressed`` column, and reads
+    decompress them. The search index is contentless, so it holds no second
+    copy of the text: triggers index turns stored as text, and the turns
+    compressed here are indexed from Python. The schema needs no custom SQL
+    functions, so any SQLite client can still write to it. SQLite before
+    3.43 cannot delete from a contentless index; there the index keeps the
+    text and turns are stored uncompressed, see ``compression_enabled``.
+    """
+
+    INSERT_TURN_SQL = """
+        INSERT INTO chat_turns 
+        (session_id, prompt, response, file_modified, version_snapshot, compressed)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    IMPORT_TURN_SQL = """
+        INSERT INTO chat_turns
+        (session_id, prompt, response, file_modified, version_snapshot, compressed, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    """
+
+    FTS_CONTENTLESS_SQL = """
+        CREATE VIRTUAL TABLE chat_turns_fts USING fts5(prompt, response, content='', contentless_delete=1)
+    """
+
+    FTS_PLAIN_SQL = "CREATE VIRTUAL TABLE chat_turns_fts USING fts5(prompt, response)"
+
+    FTS_INSERT_SQL = "INSERT INTO chat_turns_fts (rowid, prompt, response) VALUES (?, ?, ?)"
+
+    # Compressed turns are indexed by _insert_turn and _index_turns instead
+    FTS_INSERT_TRIGGER_SQL = """
+        CREATE TRIGGER IF NOT EXISTS chat_turns_fts_insert AFTER INSERT ON chat_turns
+        WHEN new.compressed & 3 = 0 BEGIN
+            INSERT INTO chat_turns_fts (rowid, prompt, response)
+            VALUES (new.id, new.prompt, new.response);
+        END
+    """
+
+    def __init__(self, db_path: str = "agent_data.db", batch_size: int = 500, lazy: bool = False):
         self.db_path = db_path
-        self._init_db()
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._schema_ready = False
+        self._schema_lock = threading.RLock()
+        self._migrating = False
+        self._search_available = False
+        self._index_keeps_text = False
+        if not lazy:
+            self._ensure_schema()
+
+    @property
+    def search_available(self) -> bool:
+        """Whether SQLite has FTS5, so search_history can return results"""
+        self._ensure_schema()
+        return self._search_available
+
+    @property
+    def compression_enabled(self) -> bool:
+        """Whether large turns are compressed, which needs a search index without its own copy"""
+        self._ensure_schema()
+        return not self._index_keeps_text
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # Must come before WAL to apply to a new file; enable_incremental_vacuum converts old ones
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps the database consistent without an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        if not self._schema_ready:
+            self._ensure_schema()
+        return conn
+
+    def _ensure_schema(self):
+        """Create or migrate the schema once, before the first query of any thread"""
+        with self._schema_lock:
+            # _init_db connects too; the thread running it must not recurse
+            if self._schema_ready or self._migrating:
+                return
+            self._migrating = True
+            try:
+                self._init_db()
+            finally:
+                self._migrating = False
+            self._schema_ready = True
+
+    def close_thread_connection(self):
+        """Close the calling thread's connection, e.g. before a worker thread exits"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._connections_lock:
+                self._connections.remove(conn)
+            conn.close()
+
+    def close(self):
+        """Write out queued turns, stop the writer and close all connections"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.queue.put(None)
+            writer.join()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
     def _init_db(self):
         """Initialize the database schema if it doesn't exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Create sessions table
@@ -43,14 +322,209 @@ class Database:
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     file_modified TEXT,
                     version_snapshot TEXT,
+                    compressed INTEGER NOT NULL DEFAULT 0,
                     FOREIGN KEY (session_id) REFERENCES sessions(id)
                 )
             """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_turns_session
+                ON chat_turns (session_id, id)
+            """)
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(chat_turns)")]
+            if "compressed" not in columns:
+                # Existing turns are stored as text; compress_turns finds them by the UNCHECKED bit
+                cursor.execute("ALTER TABLE chat_turns ADD COLUMN compressed INTEGER NOT NULL DEFAULT %d"
+                               % UNCHECKED)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_turns_unchecked
+                ON chat_turns (id) WHERE compressed & 4
+            """)
+            # Older versions read turns through this view and a turn_text() function
+            cursor.execute("DROP VIEW IF EXISTS chat_turns_text")
+
+            # Create response cache table, evicted least recently used first
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_response_cache_last_used
+                ON response_cache (last_used)
+            """)
+
+            # Create rendered markdown table, keyed by a hash of the response and renderer version
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rendered_html (
+                    key TEXT PRIMARY KEY,
+                    html TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_rendered_html_last_used
+                ON rendered_html (last_used)
+            """)
+
+            # Create prompt latency traces table, milliseconds since the prompt was queued
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS prompt_traces (
+                    turn_id INTEGER PRIMARY KEY,
+                    started_ms REAL,
+                    first_byte_ms REAL,
+                    finished_ms REAL,
+                    rendered_ms REAL,
+                    persisted_ms REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (turn_id) REFERENCES chat_turns(id)
+                )
+            """)
             conn.commit()
 
+        self._init_search_index()
+
+    def _init_search_index(self):
+        """Create the FTS5 index over chat_turns, backfilling it for existing databases"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'chat_turns_fts'"
+            )
+            row = cursor.fetchone()
+            try:
+                cursor.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, content='', contentless_delete=1)")
+                cursor.execute("DROP TABLE temp.fts_probe")
+                contentless = True
+            except sqlite3.OperationalError:
+                contentless = False
+            exists = row is not None and (
+                "contentless_delete" in row[0] if contentless else "content=" not in row[0])
+            if row is not None and not exists:
+                # Older indexes read their text through turn_text(), or keep a copy SQLite no longer needs
+                for trigger in ("insert", "delete", "update"):
+                    cursor.execute("DROP TRIGGER IF EXISTS chat_turns_fts_%s" % trigger)
+                cursor.execute("DROP TABLE chat_turns_fts")
+            try:
+                if not exists:
+                    cursor.execute(self.FTS_CONTENTLESS_SQL if contentless else self.FTS_PLAIN_SQL)
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5, search stays unavailable
+                self._search_available = False
+                return
+            self._search_available = True
+            self._index_keeps_text = not contentless
+
+            # Keep the index in sync with chat_turns, in plain SQL so any client can write turns
+            cursor.execute(self.FTS_INSERT_TRIGGER_SQL)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS chat_turns_fts_delete AFTER DELETE ON chat_turns BEGIN
+                    DELETE FROM chat_turns_fts WHERE rowid = old.id;
+                END
+            """)
+            # Compressing a turn changes how it is stored, not its text: no reindexing
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS chat_turns_fts_update
+                AFTER UPDATE OF prompt, response ON chat_turns
+                WHEN new.compressed & 3 = 0
+                  AND (old.prompt IS NOT new.prompt OR old.response IS NOT new.response)
+                BEGIN
+                    DELETE FROM chat_turns_fts WHERE rowid = old.id;
+                    INSERT INTO chat_turns_fts (rowid, prompt, response)
+                    VALUES (new.id, new.prompt, new.response);
+                END
+            """)
+            conn.commit()
+
+        if not exists:
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self) -> int:
+        """Rebuild the full-text index from chat_turns. Returns the number of indexed turns"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chat_turns_fts")
+            self._index_turns(conn, 0)
+            conn.commit()
+            return conn.execute("SELECT COUNT(*) FROM chat_turns").fetchone()[0]
+
+    def _index_turns(self, conn: sqlite3.Connection, after_id: int, page_size: int = 500):
+        """Add the turns after ``after_id`` to the search index, decompressing the compressed ones"""
+        conn.execute("""
+            INSERT INTO chat_turns_fts (rowid, prompt, response)
+            SELECT id, prompt, response FROM chat_turns WHERE id > ? AND compressed & 3 = 0
+        """, (after_id,))
+        while True:
+            rows = conn.execute("""
+                SELECT id, prompt, response, compressed FROM chat_turns
+                WHERE id > ? AND compressed & 3 ORDER BY id LIMIT ?
+            """, (after_id, page_size)).fetchall()
+            conn.executemany(self.FTS_INSERT_SQL, [
+                (turn_id, _unpack_text(prompt, compressed & PROMPT_COMPRESSED),
+                 _unpack_text(response, compressed & RESPONSE_COMPRESSED))
+                for turn_id, prompt, response, compressed in rows
+            ])
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1][0]
+
+    def _insert_turn(self, conn: sqlite3.Connection, values: tuple) -> int:
+        """Insert a chat turn from add_chat_turn's arguments and return its ID"""
+        row = _pack_turn(*values, compress=not self._index_keeps_text)
+        turn_id = conn.execute(self.INSERT_TURN_SQL, row).lastrowid
+        if row[-1] and self._search_available:
+            # The insert trigger only indexes turns stored as text
+            conn.execute(self.FTS_INSERT_SQL, (turn_id, values[1], values[2]))
+        return turn_id
+
+    def search_history(self, text: str, session_id: Optional[int] = None,
+                       project_path: Optional[str] = None, limit: int = 20, offset: int = 0,
+                       highlight: tuple = ("<b>", "</b>")) -> List[SearchHit]:
+        """
+        Full-text search over prompts and responses, best matches first.
+        Matched words in the snippets are wrapped in the ``highlight`` markers
+        """
+        query = _to_fts_query(text)
+        if not query or not self.search_available:
+            return []
+
+        filters = ""
+        params = [query]
+        if session_id is not None:
+            filters += " AND t.session_id = ?"
+            params.append(session_id)
+        if project_path is not None:
+            filters += " AND s.project_path = ?"
+            params.append(project_path)
+        params += [limit, offset]
+
+        with get_tracer().span("db.search"), self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.id, t.session_id, s.project_path, t.timestamp,
+                       t.prompt, t.response, t.compressed, bm25(chat_turns_fts) AS rank
+                FROM chat_turns_fts
+                JOIN chat_turns t ON t.id = chat_turns_fts.rowid
+                JOIN sessions s ON s.id = t.session_id
+                WHERE chat_turns_fts MATCH ?%s
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """ % filters, params)
+            # The index has no text to cut snippets from; build them from the turns
+            return [
+                SearchHit(turn_id, session, path, datetime.fromisoformat(timestamp),
+                          _snippet(_unpack_text(prompt, compressed & PROMPT_COMPRESSED), text, highlight, 12),
+                          _snippet(_unpack_text(response, compressed & RESPONSE_COMPRESSED), text, highlight, 24),
+                          rank)
+                for turn_id, session, path, timestamp, prompt, response, compressed, rank in cursor.fetchall()
+            ]
+
     def create_session(self, project_path: str) -> int:
         """Create a new chat session for a project"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO sessions (project_path) VALUES (?)",
@@ -59,53 +533,534 @@ class Database:
             conn.commit()
             return cursor.lastrowid
 
+    def get_session_project(self, session_id: int) -> Optional[str]:
+        """Get the project path of a session, or None if it does not exist"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT project_path FROM sessions WHERE id = ?", (session_id,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+
     def add_chat_turn(self, session_id: int, prompt: str, response: str,
                      file_modified: Optional[str] = None,
                      version_snapshot: Optional[str] = None) -> int:
         """Add a new chat turn to a session"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO chat_turns 
-                (session_id, prompt, response, file_modified, version_snapshot)
-                VALUES (?, ?, ?, ?, ?)
-            """, (session_id, prompt, response, file_modified, version_snapshot))
+        with self._connect() as conn:
+            turn_id = self._insert_turn(conn, (session_id, prompt, response, file_modified, version_snapshot))
             conn.commit()
-            return cursor.lastrowid
+            return turn_id
+
+    def queue_chat_turn(self, session_id: int, prompt: str, response: str,
+                        file_modified: Optional[str] = None,
+                        version_snapshot: Optional[str] = None) -> Future:
+        """Queue a chat turn for the background writer. The future resolves to its ID"""
+        future = Future()
+        values = (session_id, prompt, response, file_modified, version_snapshot)
+        self._get_writer().queue.put((values, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every chat turn queued so far has been written"""
+        with self._writer_lock:
+            writer = self._writer
+        if writer is None:
+            return
+        marker = Future()
+        writer.queue.put((None, marker))
+        marker.result(timeout)
+
+    def _get_writer(self) -> _ChatTurnWriter:
+        """Start the background writer on first use"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = _ChatTurnWriter(self, self.batch_size)
+                self._writer.start()
+            return self._writer
 
     def get_session_history(self, session_id: int) -> List[ChatTurn]:
         """Get all chat turns for a session"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        return list(self.iter_session_history(session_id))
+
+    def iter_session_history(self, session_id: int, page_size: int = 500) -> Iterator[ChatTurn]:
+        """Yield a session's chat turns oldest first, reading one page at a time"""
+        after_id = 0
+        while True:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute("""
+                    SELECT * FROM chat_turns 
+                    WHERE session_id = ? AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (session_id, after_id, page_size))
+                rows = cursor.fetchall()
+            for row in rows:
+                yield self._row_to_turn(row)
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1]['id']
+
+    def get_history_page(self, session_id: int, before_id: Optional[int] = None,
+                         limit: int = 50) -> List[ChatTurn]:
+        """Get up to ``limit`` turns older than ``before_id`` (or the newest), oldest first"""
+        with get_tracer().span("db.history_page"), self._connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute("""
                 SELECT * FROM chat_turns 
-                WHERE session_id = ? 
-                ORDER BY timestamp
-            """, (session_id,))
-            
-            turns = []
-            for row in cursor.fetchall():
-                turn = ChatTurn(
-                    id=row['id'],
-                    session_id=row['session_id'],
-                    prompt=row['prompt'],
-                    response=row['response'],
-                    timestamp=datetime.fromisoformat(row['timestamp']),
-                    file_modified=row['file_modified'],
-                    version_snapshot=row['version_snapshot']
-                )
-                turns.append(turn)
-            
-            return turns
+                WHERE session_id = ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (session_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+            return [self._row_to_turn(row) for row in reversed(cursor.fetchall())]
+
+    def _row_to_turn(self, row: sqlite3.Row) -> ChatTurn:
+        """Build a ChatTurn from a chat_turns row"""
+        return ChatTurn(
+            id=row['id'],
+            session_id=row['session_id'],
+            prompt=_unpack_text(row['prompt'], row['compressed'] & PROMPT_COMPRESSED),
+            response=_unpack_text(row['response'], row['compressed'] & RESPONSE_COMPRESSED),
+            timestamp=datetime.fromisoformat(row['timestamp']),
+            file_modified=row['file_modified'],
+            version_snapshot=row['version_snapshot']
+        )
+
+    def add_prompt_trace(self, turn_id: int, spans: Dict[str, float]):
+        """Save the latency milestones of the request that produced a turn"""
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO prompt_traces
+                (turn_id, started_ms, first_byte_ms, finished_ms, rendered_ms, persisted_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (turn_id, spans.get("started"), spans.get("first_byte"), spans.get("finished"),
+                  spans.get("rendered"), spans.get("persisted")))
+            conn.commit()
+
+    def get_prompt_traces(self, session_id: Optional[int] = None, limit: int = 100) -> List[dict]:
+        """Get the most recent prompt traces, newest first"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("""
+                SELECT p.* FROM prompt_traces p
+                JOIN chat_turns t ON t.id = p.turn_id
+                WHERE ? IS NULL OR t.session_id = ?
+                ORDER BY p.turn_id DESC
+                LIMIT ?
+            """, (session_id, session_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
 
     def get_version_snapshot(self, turn_id: int) -> Optional[str]:
         """Get the version snapshot path for a specific chat turn"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT version_snapshot FROM chat_turns WHERE id = ?",
                 (turn_id,)
             )
             result = cursor.fetchone()
-            return result[0] if result else None
\ No newline at end of file
+            return result[0] if result else None
+
+    def get_turn_snapshot(self, turn_id: int) -> Optional[tuple]:
+        """Get (file_modified, version_snapshot) of a turn whose change was applied, or None"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT file_modified, version_snapshot FROM chat_turns WHERE id = ?",
+                (turn_id,)
+            )
+            result = cursor.fetchone()
+            return tuple(result) if result and result[0] and result[1] else None
+
+    def get_cached_response(self, key: str, max_age_seconds: Optional[float] = None) -> Optional[str]:
+        """
+        Look up a cached response, None if missing or created more than
+        ``max_age_seconds`` ago. Only reads; record the use with
+        touch_cached_responses
+        """
+        oldest = time.time() - max_age_seconds if max_age_seconds is not None else None
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT response FROM response_cache WHERE key = ? AND (? IS NULL OR created_at >= ?)",
+                (key, oldest, oldest)
+            )
+            result = cursor.fetchone()
+            return result[0] if result else None
+
+    def touch_cached_responses(self, uses: List[tuple]):
+        """Mark cached responses as recently used from (key, time) pairs, in one transaction"""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE response_cache SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(used, key) for key, used in uses]
+            )
+            conn.commit()
+
+    def store_cached_response(self, key: str, response: str):
+        """Insert or replace a cached response"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO response_cache
+                (key, response, size, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, response, len(response.encode("utf-8")), now, now))
+            conn.commit()
+
+    def evict_cached_responses(self, max_bytes: int, max_age_seconds: Optional[float] = None) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            removed = 0
+            if max_age_seconds is not None:
+                cursor.execute(
+                    "DELETE FROM response_cache WHERE created_at < ?",
+                    (time.time() - max_age_seconds,)
+                )
+                removed += cursor.rowcount
+
+            total = cursor.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM response_cache"
+            ).fetchone()[0]
+            if total > max_bytes:
+                victims = []
+                for key, size in cursor.execute(
+                    "SELECT key, size FROM response_cache ORDER BY last_used"
+                ):
+                    if total <= max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                cursor.executemany("DELETE FROM response_cache WHERE key = ?", victims)
+                removed += len(victims)
+            conn.commit()
+            return removed
+
+    def get_response_cache_size(self) -> tuple:
+        """Return (entry count, total bytes) of the response cache"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache")
+            return tuple(cursor.fetchone())
+
+    def get_rendered_html(self, keys: List[str]) -> Dict[str, str]:
+        """Look up rendered HTML for several keys and mark the found ones as recently used"""
+        found = {}
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Stay below SQLite's host parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                cursor.execute(
+                    "SELECT key, html FROM rendered_html WHERE key IN (%s)" % ",".join("?" * len(batch)),
+                    batch
+                )
+                found.update(cursor.fetchall())
+            if found:
+                now = time.time()
+                cursor.executemany(
+                    "UPDATE rendered_html SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            conn.commit()
+        return found
+
+    def store_rendered_html(self, items: List[tuple]):
+        """Insert or replace (key, html) pairs of rendered markdown"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO rendered_html (key, html, size, last_used)
+                VALUES (?, ?, ?, ?)
+            """, [(key, html, len(html.encode("utf-8")), now) for key, html in items])
+            conn.commit()
+
+    def evict_rendered_html(self, max_bytes: int) -> int:
+        """Drop least recently used rendered HTML until under max_bytes"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            total = cursor.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM rendered_html"
+            ).fetchone()[0]
+            victims = []
+            if total > max_bytes:
+                for key, size in cursor.execute(
+                    "SELECT key, size FROM rendered_html ORDER BY last_used"
+                ):
+                    if total <= max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                cursor.executemany("DELETE FROM rendered_html WHERE key = ?", victims)
+            conn.commit()
+            return len(victims)
+
+    def set_turn_snapshot(self, turn_id: int, file_modified: str, version_snapshot: str):
+        """Record the file a turn modified and the snapshot taken before the change"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE chat_turns SET file_modified = ?, version_snapshot = ? WHERE id = ?",
+                (file_modified, version_snapshot, turn_id)
+            )
+            conn.commit()
+
+    def iter_history_records(self, session_ids: Optional[List[int]] = None,
+                             project_path: Optional[str] = None,
+                             page_size: int = 1000) -> Iterator[dict]:
+        """
+        Yield every matching session, then their chat turns oldest first, as
+        export records. Rows are read a page at a time from one read
+        transaction on a separate connection, so memory stays bounded and the
+        records are consistent even while other threads keep writing
+        """
+        filters = ""
+        params: list = []
+        if project_path is not None:
+            filters += " AND project_path = ?"
+            params.append(project_path)
+        if session_ids is not None:
+            filters += " AND id IN (%s)" % ",".join("?" * len(session_ids))
+            params.extend(session_ids)
+
+        self._ensure_schema()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("BEGIN")
+            after_id = 0
+            while True:
+                rows = conn.execute(
+                    "SELECT id, project_path, created_at FROM sessions WHERE id > ?%s ORDER BY id LIMIT ?"
+                    % filters, [after_id] + params + [page_size]
+                ).fetchall()
+                for session_id, path, created_at in rows:
+                    yield {"type": "session", "id": session_id, "project_path": path, "created_at": created_at}
+                if len(rows) < page_size:
+                    break
+                after_id = rows[-1][0]
+
+            session_filter = ""
+            if filters:
+                session_filter = " AND session_id IN (SELECT id FROM sessions WHERE 1%s)" % filters
+            after_id = 0
+            while True:
+                rows = conn.execute("""
+                    SELECT id, session_id, prompt, response, timestamp, file_modified, version_snapshot, compressed
+                    FROM chat_turns WHERE id > ?%s ORDER BY id LIMIT ?
+                """ % session_filter, [after_id] + params + [page_size]).fetchall()
+                for _, session_id, prompt, response, timestamp, file_modified, version_snapshot, compressed in rows:
+                    yield {"type": "turn", "session_id": session_id,
+                           "prompt": _unpack_text(prompt, compressed & PROMPT_COMPRESSED),
+                           "response": _unpack_text(response, compressed & RESPONSE_COMPRESSED),
+                           "timestamp": timestamp, "file_modified": file_modified,
+                           "version_snapshot": version_snapshot}
+                if len(rows) < page_size:
+                    break
+                after_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    def insert_history_records(self, records: Iterable[dict], batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        Insert exported session and turn records in a single transaction, so
+        an import lands completely or not at all. Sessions get new IDs and
+        their turns are pointed at them; a turn's session must come before
+        it. Turns are inserted with executemany in batches and indexed for
+        search in bulk at the end, which is several times faster than the
+        per-row trigger. Records of other types are ignored.
+        Returns (sessions, turns) inserted
+        """
+        session_ids: Dict[int, int] = {}
+        batch = []
+        turns = 0
+        conn = self._connect()
+        search = self.search_available
+        compress = self.compression_enabled
+        with conn:
+            # Taking the write lock up front keeps the new turn IDs above last_id
+            conn.execute("BEGIN IMMEDIATE")
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM chat_turns").fetchone()[0]
+            if search:
+                # Rolled back with the rest if the import fails
+                conn.execute("DROP TRIGGER IF EXISTS chat_turns_fts_insert")
+            for record in records:
+                kind = record.get("type")
+                if kind == "session":
+                    cursor = conn.execute(
+                        "INSERT INTO sessions (project_path, created_at) VALUES (?, COALESCE(?, CURRENT_TIMESTAMP))",
+                        (record["project_path"], record.get("created_at"))
+                    )
+                    session_ids[record["id"]] = cursor.lastrowid
+                elif kind == "turn":
+                    try:
+                        session_id = session_ids[record["session_id"]]
+                    except KeyError:
+                        raise ValueError("Turn of session %r comes before that session" % record["session_id"])
+                    batch.append(_pack_turn(session_id, record["prompt"], record["response"],
+                                            record.get("file_modified"), record.get("version_snapshot"),
+                                            compress)
+                                 + (record.get("timestamp"),))
+                    if len(batch) >= batch_size:
+                        conn.executemany(self.IMPORT_TURN_SQL, batch)
+                        turns += len(batch)
+                        batch = []
+            if batch:
+                conn.executemany(self.IMPORT_TURN_SQL, batch)
+                turns += len(batch)
+            if search:
+                self._index_turns(conn, last_id)
+                conn.execute(self.FTS_INSERT_TRIGGER_SQL)
+        return len(session_ids), turns
+
+    def get_snapshot_refs(self, project_path: Optional[str] = None) -> List[str]:
+        """Get every distinct snapshot reference, optionally for one project's sessions"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            if project_path is None:
+                cursor.execute("""
+                    SELECT DISTINCT version_snapshot FROM chat_turns
+                    WHERE version_snapshot IS NOT NULL
+                """)
+            else:
+                cursor.execute("""
+                    SELECT DISTINCT t.version_snapshot FROM chat_turns t
+                    JOIN sessions s ON s.id = t.session_id
+                    WHERE t.version_snapshot IS NOT NULL AND s.project_path = ?
+                """, (project_path,))
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_session_usage(self) -> List[SessionUsage]:
+        """Every session with its last activity and stored size, most recently active first"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.id, s.project_path, COALESCE(MAX(t.timestamp), s.created_at) AS last_active,
+                       COUNT(t.id),
+                       COALESCE(SUM(LENGTH(CAST(t.prompt AS BLOB)) + LENGTH(CAST(t.response AS BLOB))), 0)
+                FROM sessions s LEFT JOIN chat_turns t ON t.session_id = s.id
+                GROUP BY s.id
+                ORDER BY last_active DESC, s.id DESC
+            """)
+            return [SessionUsage(*row) for row in cursor.fetchall()]
+
+    def delete_sessions(self, session_ids: List[int], batch_size: int = 100) -> int:
+        """
+        Delete sessions with their turns and traces, a batch of sessions per
+        transaction so the writer thread is never blocked for long.
+        Returns the number of turns deleted
+        """
+        deleted = 0
+        for offset in range(0, len(session_ids), batch_size):
+            batch = session_ids[offset:offset + batch_size]
+            marks = ",".join("?" * len(batch))
+            with self._connect() as conn:
+                conn.execute("""
+                    DELETE FROM prompt_traces
+                    WHERE turn_id IN (SELECT id FROM chat_turns WHERE session_id IN (%s))
+                """ % marks, batch)
+                deleted += conn.execute("DELETE FROM chat_turns WHERE session_id IN (%s)" % marks,
+                                        batch).rowcount
+                conn.execute("DELETE FROM sessions WHERE id IN (%s)" % marks, batch)
+        return deleted
+
+    def compress_turns(self, batch_size: int = 200,
+                       should_stop: Optional[Callable[[], bool]] = None) -> Tuple[int, int]:
+        """
+        Compress the large prompts and responses of turns stored before
+        compression existed, a batch per transaction. The search index is
+        left alone since the text does not change. Does nothing unless
+        compression_enabled.
+        Returns (turns compressed, bytes saved)
+        """
+        compressed = saved = 0
+        after_id = 0
+        if not self.compression_enabled:
+            return compressed, saved
+        while should_stop is None or not should_stop():
+            with self._connect() as conn:
+                rows = conn.execute("""
+                    SELECT id, prompt, response FROM chat_turns
+                    WHERE compressed & 4 AND id > ? ORDER BY id LIMIT ?
+                """, (after_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for turn_id, prompt, response in rows:
+                    _, new_prompt, new_response, _, _, flags = _pack_turn(None, prompt, response, None, None)
+                    if flags:
+                        compressed += 1
+                        saved += (_stored_size(prompt) + _stored_size(response)
+                                  - _stored_size(new_prompt) - _stored_size(new_response))
+                    updates.append((new_prompt, new_response, flags, turn_id))
+                conn.executemany(
+                    "UPDATE chat_turns SET prompt = ?, response = ?, compressed = ? WHERE id = ?", updates
+                )
+            after_id = rows[-1][0]
+        return compressed, saved
+
+    def get_space_usage(self) -> Tuple[int, int]:
+        """(database size, bytes in free pages) in bytes"""
+        with self._connect() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            return pages * page_size, free * page_size
+
+    def merge_search_index(self, pages: int = 500, should_stop: Optional[Callable[[], bool]] = None):
+        """
+        Merge the full-text index segments, dropping what deleted turns left
+        behind, writing up to ``pages`` pages per transaction
+        """
+        if not self.search_available:
+            return
+        while should_stop is None or not should_stop():
+            with self._connect() as conn:
+                before = conn.total_changes
+                # A negative page count merges every level, as 'optimize' does, but in steps
+                conn.execute("INSERT INTO chat_turns_fts (chat_turns_fts, rank) VALUES ('merge', ?)", (-pages,))
+                done = conn.total_changes - before < 2
+            if done:
+                return
+
+    def get_search_index_size(self) -> Optional[int]:
+        """Bytes of pages held by the full-text index, or None if SQLite lacks the dbstat table"""
+        with self._connect() as conn:
+            try:
+                return conn.execute(
+                    "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name LIKE 'chat_turns_fts%'"
+                ).fetchone()[0]
+            except sqlite3.OperationalError:
+                return None
+
+    def incremental_vacuum_available(self) -> bool:
+        """Whether free pages can be returned to the file system without a full VACUUM"""
+        with self._connect() as conn:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def incremental_vacuum(self, max_pages: int = 0) -> int:
+        """
+        Return up to ``max_pages`` free pages (all if 0) to the file system
+        and checkpoint the WAL so the file shrinks. Returns the bytes freed
+        """
+        size_before, _ = self.get_space_usage()
+        with self._connect() as conn:
+            # execute() would only step the pragma once, freeing a single page
+            conn.executescript("PRAGMA incremental_vacuum(%d);" % max_pages)
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        size_after, _ = self.get_space_usage()
+        return size_before - size_after
+
+    def enable_incremental_vacuum(self) -> int:
+        """
+        Switch a database created before incremental vacuum to it. This takes
+        a full VACUUM, rewriting the whole file once. Returns the bytes freed
+        """
+        size_before, _ = self.get_space_usage()
+        with self._connect() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        size_after, _ = self.get_space_usage()
+        return size_before - size_after
@@ -0,0 +1,118 @@
+import argparse
+import sys
+from pathlib import Path
+
+from database import Database
+from history_archive import export_history, import_history
+from retention import RetentionPolicy, apply_retention
+from snapshot_store import SnapshotStore
+
+def reindex(db: Database, args):
+    """Rebuild the full-text search index from chat_turns"""
+    if not db.search_available:
+        print("This SQLite build has no FTS5 support; search is unavailable.")
+        return 1
+    count = db.rebuild_search_index()
+    print(f"Indexed {count} chat turns.")
+    return 0
+
+def search(db: Database, args):
+    """Print the best matches for a query"""
+    for hit in db.search_history(" ".join(args.query), project_path=args.project,
+                                 limit=args.limit, highlight=("[", "]")):
+        print(f"#{hit.turn_id} session {hit.session_id} {hit.project_path} {hit.timestamp}")
+        print(f"    prompt:   {hit.prompt_snippet}")
+        print(f"    response: {hit.response_snippet}")
+    return 0
+
+def gc_snapshots(db: Database, args):
+    """Delete snapshot objects of a project that no chat turn references any more"""
+    project = str(Path(args.project).absolute())
+    store = SnapshotStore(str(Path(project) / ".gemini-versions"))
+    removed, freed = store.gc(db.get_snapshot_refs(project))
+    print(f"Removed {removed} snapshot objects, freed {freed / 1024:.1f} KB.")
+    return 0
+
+def export_archive(db: Database, args):
+    """Write chat history to a compressed archive"""
+    project = str(Path(args.project).absolute()) if args.project else None
+    stats = export_history(db, args.archive, session_ids=args.session, project_path=project,
+                           include_snapshots=not args.no_snapshots)
+    print(f"Exported {stats.sessions} sessions, {stats.turns} chat turns and "
+          f"{stats.snapshots} snapshots to {args.archive}.")
+    if stats.missing_snapshots:
+        print(f"{stats.missing_snapshots} referenced snapshots were not found and are not included.")
+    return 0
+
+def import_archive(db: Database, args):
+    """Add the sessions of an archive to the database"""
+    try:
+        stats = import_history(db, args.archive)
+    except (OSError, EOFError, ValueError, KeyError) as e:
+        print(f"Cannot import {args.archive}, nothing was imported: {e}")
+        return 1
+    print(f"Imported {stats.sessions} sessions, {stats.turns} chat turns and {stats.snapshots} snapshots.")
+    if stats.missing_snapshots:
+        print(f"{stats.missing_snapshots} snapshots belong to project directories that do not exist here.")
+    return 0
+
+def retention(db: Database, args):
+    """Apply history limits, compress old turns and give free space back"""
+    if args.enable_vacuum:
+        freed = db.enable_incremental_vacuum()
+        print(f"Incremental vacuum enabled; the full VACUUM freed {freed / 1024 / 1024:.1f} MB.")
+    policy = RetentionPolicy(
+        max_age_days=args.max_age_days,
+        max_sessions_per_project=args.max_sessions_per_project,
+        max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+    )
+    print(apply_retention(db, policy, dry_run=args.dry_run).summary())
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance commands for the Gemini Agent Desktop database")
+    parser.add_argument("--db", default="agent_data.db", help="Path to the SQLite database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("reindex", help="Backfill or rebuild the full-text search index")
+
+    search_parser = commands.add_parser("search", help="Search chat history")
+    search_parser.add_argument("query", nargs="+")
+    search_parser.add_argument("--project", help="Only search sessions of this project path")
+    search_parser.add_argument("--limit", type=int, default=20)
+
+    gc_parser = commands.add_parser("gc-snapshots", help="Garbage-collect a project's .gemini-versions")
+    gc_parser.add_argument("project", help="Project directory")
+
+    export_parser = commands.add_parser("export", help="Export chat history to a compressed JSONL archive")
+    export_parser.add_argument("archive", help="Archive to write, e.g. history.jsonl.gz")
+    export_parser.add_argument("--project", help="Only export sessions of this project directory")
+    export_parser.add_argument("--session", type=int, action="append", help="Only export this session (repeatable)")
+    export_parser.add_argument("--no-snapshots", action="store_true", help="Leave out file version snapshots")
+
+    import_parser = commands.add_parser("import", help="Import an archive's sessions as new sessions")
+    import_parser.add_argument("archive", help="Archive written by export")
+
+    retention_parser = commands.add_parser(
+        "retention", help="Delete old history, compress stored turns and reclaim free space"
+    )
+    retention_parser.add_argument("--max-age-days", type=float, help="Delete sessions inactive for longer")
+    retention_parser.add_argument("--max-sessions-per-project", type=int,
+                                  help="Keep only this many most recently active sessions per project")
+    retention_parser.add_argument("--max-mb", type=float,
+                                  help="Delete the least recently active sessions beyond this much history")
+    retention_parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    retention_parser.add_argument("--enable-vacuum", action="store_true",
+                                  help="Convert an older database to incremental vacuum with a full VACUUM")
+
+    args = parser.parse_args(argv)
+    db = Database(args.db)
+    try:
+        handlers = {"reindex": reindex, "search": search, "gc-snapshots": gc_snapshots,
+                    "export": export_archive, "import": import_archive, "retention": retention}
+        return handlers[args.command](db, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_FENCE = re.compile(r"^(`{3,}|~{3,})([^\n]*)\n(.*?)^\1[ \t]*$", re.M | re.S)
+_SEARCH_REPLACE = re.compile(r"^<{7} ?SEARCH[^\n]*\n(.*?)^={7}[ \t]*\n(.*?)^>{7} ?REPLACE[^\n]*$", re.M | re.S)
+_BEFORE_LABEL = re.compile(r"\b(?:before|original|old|current)\b", re.I)
+_AFTER_LABEL = re.compile(r"\b(?:after|updated|new|fixed|changed|replacement)\b", re.I)
+_PATH_IN_LABEL = re.compile(r"[\w./\\-]+\.\w+")
+
+class PatchConflict(ValueError):
+    """A change does not match the text it is applied to"""
+
+@dataclass
+class Hunk:
+    """Replace ``old`` (context and removed lines) with ``new``"""
+    old: List[str]
+    new: List[str]
+    line_hint: Optional[int] = None  # 0-based line where ``old`` is expected, None to search for it
+
+@dataclass
+class Change:
+    """The hunks a response proposes for one file"""
+    path: Optional[str]  # As written in the response, None when it names no file
+    hunks: List[Hunk] = field(default_factory=list)
+
+@dataclass
+class Edit:
+    """Replace lines [start, end) of a text with ``lines``"""
+    start: int
+    end: int
+    lines: List[str]
+
+def _diff_path(header: str) -> Optional[str]:
+    path = header[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path or None
+
+def parse_unified_diff(text: str) -> List[Change]:
+    """
+    Parse the unified diffs in a text, e.g. ```diff blocks of a response.
+    Hunk line counts are not trusted, since models often get them wrong:
+    a hunk ends at the first line that is not context, removal or addition
+    """
+    changes = []
+    change = None
+    hunk = None
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        if line.startswith("--- ") and index + 1 < len(lines) and lines[index + 1].startswith("+++ "):
+            hunk = None
+            continue
+        if line.startswith("+++ "):
+            change = Change(_diff_path(line))
+            changes.append(change)
+            hunk = None
+            continue
+        header = _HUNK_HEADER.match(line)
+        if header is not None:
+            if change is None:
+                change = Change(None)
+                changes.append(change)
+            hunk = Hunk([], [], max(0, int(header.group(1)) - 1))
+            change.hunks.append(hunk)
+            continue
+        if hunk is None:
+            continue
+        if line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        if line.startswith("-"):
+            hunk.old.append(line[1:])
+        elif line.startswith("+"):
+            hunk.new.append(line[1:])
+        elif line.startswith(" ") or line == "":
+            # Blank context lines often lose their leading space
+            hunk.old.append(line[1:])
+            hunk.new.append(line[1:])
+        else:
+            hunk = None
+    for change in changes:
+        for hunk in change.hunks:
+            # A trailing blank line is more likely the gap after the diff than context
+            while hunk.old and hunk.new and hunk.old[-1] == "" and hunk.new[-1] == "":
+                hunk.old.pop()
+                hunk.new.pop()
+    return [change for change in changes if change.hunks]
+
+def parse_before_after(text: str) -> List[Change]:
+    """
+    Parse replacement pairs: SEARCH/REPLACE conflict-marker blocks, and
+    fenced code blocks labelled "before" followed by one labelled "after".
+    A label is the fence's info string plus the line above the fence
+    """
+    changes = []
+    pending_before = None
+    for fence in _FENCE.finditer(text):
+        body = fence.group(3)
+        preceding = text[:fence.start()].rstrip("\n").rpartition("\n")[2]
+        label = fence.group(2) + " " + preceding
+        path_match = _PATH_IN_LABEL.search(preceding)
+        path = path_match.group(0).strip("`'\"") if path_match else None
+
+        pairs = list(_SEARCH_REPLACE.finditer(body))
+        if pairs:
+            change = Change(path)
+            for pair in pairs:
+                change.hunks.append(Hunk(pair.group(1).rstrip("\n").split("\n"),
+                                         pair.group(2).rstrip("\n").split("\n") if pair.group(2) else []))
+            changes.append(change)
+            pending_before = None
+            continue
+
+        lines = body.rstrip("\n").split("\n") if body.strip() else []
+        if _BEFORE_LABEL.search(label) and not _AFTER_LABEL.search(label):
+            pending_before = (path, lines)
+        elif _AFTER_LABEL.search(label) and pending_before is not None:
+            before_path, before = pending_before
+            if before:
+                changes.append(Change(path or before_path, [Hunk(before, lines)]))
+            pending_before = None
+    return changes
+
+def parse_changes(text: str) -> List[Change]:
+    """Every change proposed in a response, as unified diffs or before/after blocks"""
+    return parse_unified_diff(text) or parse_before_after(text)
+
+def _locate(keys: List[str], positions: Dict[str, List[int]], old: List[str], hint: Optional[int]) -> int:
+    """
+    Line where ``old`` occurs, nearest to the hint, or the only occurrence
+    when there is none. ``positions`` lists the lines holding each first line
+    """
+    if not old:
+        if hint is None:
+            raise PatchConflict("A change with no context has no position")
+        return min(hint, len(keys))
+    size = len(old)
+    matches = [i for i in positions.get(old[0], ()) if keys[i:i + size] == old]
+    if not matches:
+        raise PatchConflict("Expected text not found: %r" % "\n".join(old[:3]))
+    if hint is None:
+        if len(matches) > 1:
+            raise PatchConflict("Expected text occurs %d times: %r" % (len(matches), "\n".join(old[:3])))
+        return matches[0]
+    return min(matches, key=lambda i: abs(i - hint))
+
+def plan_edits(text: str, change: Change) -> List[Edit]:
+    """
+    Locate each hunk in the text and reduce it to minimal line edits, in
+    document order. Lines are matched ignoring trailing whitespace; raises
+    PatchConflict when a hunk cannot be placed or hunks overlap
+    """
+    keys = [line.rstrip() for line in text.split("\n")]
+    olds = [[line.rstrip() for line in hunk.old] for hunk in change.hunks]
+    # One pass over the text finds every candidate position of every hunk
+    positions: Dict[str, List[int]] = {old[0]: [] for old in olds if old}
+    for i, key in enumerate(keys):
+        if key in positions:
+            positions[key].append(i)
+
+    edits = []
+    for hunk, old in zip(change.hunks, olds):
+        # Hunk positions refer to the original text, so every hunk is placed in it
+        start = _locate(keys, positions, old, hunk.line_hint)
+        matcher = SequenceMatcher(None, old, [line.rstrip() for line in hunk.new], autojunk=False)
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op != "equal":
+                edits.append(Edit(start + i1, start + i2, hunk.new[j1:j2]))
+
+    edits.sort(key=lambda edit: (edit.start, edit.end))
+    for previous, edit in zip(edits, edits[1:]):
+        if edit.start < previous.end or (edit.start == previous.start == previous.end == edit.end):
+            raise PatchConflict("Hunks overlap at line %d" % (edit.start + 1))
+    return edits
+
+def _unique_anchors(old: List[str], new: List[str]) -> List[Tuple[int, int]]:
+    """
+    Pairs of positions of lines occurring exactly once in each text, reduced
+    to the longest run that is increasing in both (patience diff anchors)
+    """
+    counts: Dict[str, List[int]] = {}
+    for i, line in enumerate(old):
+        counts.setdefault(line, [0, 0, i, -1])[0] += 1
+    for j, line in enumerate(new):
+        entry = counts.get(line)
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    pairs = sorted((i, j) for n_old, n_new, i, j in counts.values() if n_old == 1 and n_new == 1)
+
+    # Longest increasing subsequence of the new positions, by patience sorting
+    tails: List[int] = []  # Index into pairs of the smallest tail of each run length
+    tail_values: List[int] = []  # The new positions of those tails, for bisecting
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        length = bisect_left(tail_values, j)
+        if length:
+            previous[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_values.append(j)
+        else:
+            tails[length] = index
+            tail_values[length] = j
+    anchors = []
+    index = tails[-1] if tails else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    return anchors[::-1]
+
+def diff_edits(old_text: str, new_text: str) -> List[Edit]:
+    """
+    Line edits turning one text into another, e.g. to revert a change.
+    Lines unique to both texts anchor the diff, so only the short gaps
+    between them are compared line by line
+    """
+    old = old_text.split("\n")
+    new = new_text.split("\n")
+    edits = []
+    i = j = 0
+    for anchor_i, anchor_j in _unique_anchors(old, new) + [(len(old), len(new))]:
+        if old[i:anchor_i] != new[j:anchor_j]:
+            matcher = SequenceMatcher(None, old[i:anchor_i], new[j:anchor_j], autojunk=False)
+            edits.extend(Edit(i + i1, i + i2, new[j + j1:j + j2])
+                         for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != "equal")
+        i, j = anchor_i + 1, anchor_j + 1
+    return edits
+
+def edit_ranges(edits: List[Edit], line_start: Callable[[int], int], line_count: int,
+                end_of_text: int) -> List[Tuple[int, int, str]]:
+    """
+    Position (start, end, replacement) ranges of line edits, in document
+    order. ``line_start`` maps a line number to its position, so editors
+    can use their own position units. Apply the ranges back to front so
+    earlier positions stay valid
+    """
+    ranges = []
+    for edit in edits:
+        if edit.end < line_count:
+            # Whole lines including their newlines
+            start, end = line_start(edit.start), line_start(edit.end)
+            replacement = "".join(line + "\n" for line in edit.lines)
+        elif edit.start >= line_count:
+            # Appending after the last line
+            start, end = end_of_text, end_of_text
+            replacement = "".join("\n" + line for line in edit.lines)
+        elif edit.lines or edit.start == 0:
+            # Up to the end of the text, which has no final newline of its own
+            start, end = line_start(edit.start), end_of_text
+            replacement = "\n".join(edit.lines)
+        else:
+            # Deleting the last lines also deletes the newline before them
+            start, end = line_start(edit.start) - 1, end_of_text
+            replacement = ""
+        ranges.append((start, end, replacement))
+    return ranges
+
+def apply_to_text(text: str, edits: List[Edit]) -> str:
+    """The text with the edits applied, e.g. to check a change before touching a document"""
+    lines = text.split("\n")
+    starts = [0] + list(accumulate(len(line) + 1 for line in lines))
+    for start, end, replacement in reversed(edit_ranges(edits, starts.__getitem__, len(lines), len(text))):
+        text = text[:start] + replacement + text[end:]
+    return text
@@ -0,0 +1,107 @@
+"""
+Chat history archives: gzip-compressed JSONL with one record per line.
+
+    {"type": "header", "format": "gemini-agent-history", "version": 1, ...}
+    {"type": "session", "id": ..., "project_path": ..., "created_at": ...}
+    {"type": "snapshot", "project_path": ..., "ref": ..., "data": <base64>}
+    {"type": "turn", "session_id": ..., "prompt": ..., "response": ..., ...}
+
+Sessions come first, then turns oldest first, each turn preceded by the
+version snapshot it references the first time it is used. Both directions
+stream record by record, so archives of any size use bounded memory.
+"""
+import base64
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from database import Database
+from snapshot_store import SnapshotStore
+
+FORMAT = "gemini-agent-history"
+VERSION = 1
+
+@dataclass
+class ArchiveStats:
+    sessions: int = 0
+    turns: int = 0
+    snapshots: int = 0
+    missing_snapshots: int = 0  # Referenced but not found on export, or not restorable on import
+
+def _snapshot_store(project_path: str) -> SnapshotStore:
+    return SnapshotStore(os.path.join(project_path, ".gemini-versions"))
+
+def _export_records(db: Database, stats: ArchiveStats, session_ids: Optional[List[int]],
+                    project_path: Optional[str], include_snapshots: bool) -> Iterator[dict]:
+    """The database's records with snapshot records inserted before the turns using them"""
+    projects: Dict[int, str] = {}
+    exported: Set[Tuple[str, str]] = set()
+    for record in db.iter_history_records(session_ids, project_path):
+        if record["type"] == "session":
+            projects[record["id"]] = record["project_path"]
+            stats.sessions += 1
+        else:
+            ref = record["version_snapshot"]
+            if include_snapshots and ref:
+                project = projects[record["session_id"]]
+                if (project, ref) not in exported:
+                    exported.add((project, ref))
+                    try:
+                        data = _snapshot_store(project).load(ref)
+                    except (OSError, ValueError):
+                        stats.missing_snapshots += 1
+                    else:
+                        stats.snapshots += 1
+                        yield {"type": "snapshot", "project_path": project, "ref": ref,
+                               "data": base64.b64encode(data).decode("ascii")}
+            stats.turns += 1
+        yield record
+
+def export_history(db: Database, path: str, session_ids: Optional[List[int]] = None,
+                   project_path: Optional[str] = None, include_snapshots: bool = True,
+                   compress_level: int = 6) -> ArchiveStats:
+    """Write the sessions (all, of one project, or the given IDs) and their turns to an archive"""
+    stats = ArchiveStats()
+    header = {"type": "header", "format": FORMAT, "version": VERSION,
+              "exported_at": datetime.now(timezone.utc).isoformat()}
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=compress_level) as f:
+        f.write(json.dumps(header) + "\n")
+        for record in _export_records(db, stats, session_ids, project_path, include_snapshots):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return stats
+
+def _import_records(f, stats: ArchiveStats) -> Iterator[dict]:
+    """Parse an archive's records, restoring snapshots as they pass by"""
+    header = json.loads(f.readline() or "{}")
+    if header.get("type") != "header" or header.get("format") != FORMAT:
+        raise ValueError("Not a chat history archive")
+    if header.get("version", 0) > VERSION:
+        raise ValueError("Archive version %s is newer than this version supports" % header["version"])
+    for line in f:
+        record = json.loads(line)
+        if record.get("type") != "snapshot":
+            yield record
+            continue
+        # Snapshots go back into the project's store when that project exists here
+        if not os.path.isdir(record["project_path"]):
+            stats.missing_snapshots += 1
+            continue
+        store = _snapshot_store(record["project_path"])
+        if store.exists(record["ref"]):
+            continue
+        if store.store(base64.b64decode(record["data"])) != record["ref"]:
+            raise ValueError("Snapshot %s in the archive is corrupted" % record["ref"])
+        stats.snapshots += 1
+
+def import_history(db: Database, path: str) -> ArchiveStats:
+    """
+    Add the sessions of an archive to the database as new sessions. The
+    import is one transaction: a damaged archive leaves the database as it was
+    """
+    stats = ArchiveStats()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        stats.sessions, stats.turns = db.insert_history_records(_import_records(f, stats))
+    return stats
@@ -0,0 +1,195 @@
+import fnmatch
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Names never shown in the file navigator nor indexed, unless configured otherwise
+DEFAULT_EXCLUDES = {
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", "env",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", "build", "dist",
+    ".gemini-versions", ".idea", ".vscode",
+}
+
+def _translate(pattern: str) -> str:
+    """Regex for a gitignore glob, matched against a path relative to the .gitignore's directory"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                # "**/" matches any number of directories, a trailing "**" everything inside
+                i += 2
+                if i < n and pattern[i] == "/":
+                    out.append("(?:.*/)?")
+                    i += 1
+                else:
+                    out.append(".*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[]", i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[%s]" % body)
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+def _parse_line(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """(regex, negated, directories only) for a .gitignore line, None for blanks and comments"""
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "  # An escaped trailing space is kept
+    line = stripped
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+    anchored = "/" in line
+    regex = _translate(line.lstrip("/"))
+    return (regex if anchored else "(?:.*/)?" + regex), negated, dir_only
+
+class _Level:
+    """The patterns of one directory's ignore files, compiled to one regex for files and one for directories"""
+
+    def __init__(self, lines: Iterable[str]):
+        rules = [rule for rule in map(_parse_line, lines) if rule is not None]
+        # Alternatives are tried in order, so the last pattern, which wins in git, goes first
+        rules.reverse()
+        self.files, self.file_negated = self._compile([rule for rule in rules if not rule[2]])
+        self.dirs, self.dir_negated = self._compile(rules)
+
+    @staticmethod
+    def _compile(rules: List[Tuple[str, bool, bool]]):
+        if not rules:
+            return None, []
+        regex = re.compile("|".join("(%s)" % pattern for pattern, _, _ in rules), re.S)
+        return regex, [negated for _, negated, _ in rules]
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no pattern matches"""
+        regex, negated = (self.dirs, self.dir_negated) if is_dir else (self.files, self.file_negated)
+        if regex is None:
+            return None
+        m = regex.fullmatch(path)
+        if m is None:
+            return None
+        return not negated[m.lastindex - 1]
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class IgnoreRules:
+    """
+    Decides which files and directories of a project are left out: names in
+    an exclude list (exact or glob), and the patterns of the project's
+    .gitignore files and .git/info/exclude with git's precedence.
+
+    Callers walk top-down and skip ignored directories, so as in git a file
+    inside an ignored directory cannot be re-included. A directory's own
+    .gitignore is re-read when it changed each time a matcher is made for
+    that directory; one instance is meant to be used by one thread.
+    """
+
+    def __init__(self, root: str, excludes: Iterable[str] = DEFAULT_EXCLUDES, use_gitignore: bool = True):
+        self.root = str(Path(root).absolute())
+        self.use_gitignore = use_gitignore
+        excludes = sorted(set(excludes))
+        globs = [name for name in excludes if any(c in name for c in "*?[")]
+        self._exclude_names = frozenset(name for name in excludes if name not in globs)
+        self._exclude_glob = re.compile("|".join(fnmatch.translate(g) for g in globs)) if globs else None
+        self._excludes_key = "\0".join(excludes)
+        self._levels: Dict[str, Tuple[tuple, Optional[_Level]]] = {}  # Directory -> (stat key, rules)
+
+    def matcher(self, relative_dir: str) -> Callable[[str, bool], bool]:
+        """A check ``ignored(name, is_dir)`` for the entries of a directory ("" for the root)"""
+        levels = []
+        if self.use_gitignore:
+            parts = relative_dir.split("/") if relative_dir else []
+            for depth in range(len(parts) + 1):
+                level = self._level("/".join(parts[:depth]), reload=depth == len(parts))
+                if level is not None:
+                    below = "/".join(parts[depth:])
+                    levels.append((below + "/" if below else "", level))
+            # Deeper ignore files take precedence
+            levels.reverse()
+        names, glob = self._exclude_names, self._exclude_glob
+
+        def ignored(name: str, is_dir: bool) -> bool:
+            if name in names or (glob is not None and glob.match(name)):
+                return True
+            for prefix, level in levels:
+                decision = level.match(prefix + name, is_dir)
+                if decision is not None:
+                    return decision
+            return False
+        return ignored
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Whether one path is ignored, assuming its parent directories are not"""
+        directory, _, name = relative_path.rpartition("/")
+        return self.matcher(directory)(name, is_dir)
+
+    def signature(self, relative_dir: str) -> str:
+        """
+        Changes whenever the rules for a directory's entries may have, e.g.
+        to validate cached listings. Call after matcher() for the directory
+        """
+        parts = relative_dir.split("/") if relative_dir else []
+        keys = [self._levels.get("/".join(parts[:depth]), (None,))[0] for depth in range(len(parts) + 1)]
+        data = repr((self.use_gitignore, self._excludes_key, keys)).encode("utf-8")
+        return hashlib.sha1(data).hexdigest()
+
+    def _level(self, directory: str, reload: bool) -> Optional[_Level]:
+        """A directory's ignore rules, read if not yet known or, with ``reload``, if changed"""
+        cached = self._levels.get(directory)
+        if cached is not None and not reload:
+            return cached[1]
+        paths = []
+        if not directory:
+            # Lower precedence than the root .gitignore, so read first
+            paths.append(os.path.join(self.root, ".git", "info", "exclude"))
+        paths.append(os.path.join(self.root, directory, ".gitignore"))
+        key = tuple(_stat_key(path) for path in paths)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        lines = []
+        for path, stat in zip(paths, key):
+            if stat is None:
+                continue
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    lines.extend(f)
+            except OSError:
+                continue
+        level = _Level(lines) if lines else None
+        self._levels[directory] = (key, level)
+        return level
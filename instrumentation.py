@@ -0,0 +1,332 @@
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import builtins
+import csv
+import json
+import sys
+import threading
+import time
+import traceback
+
+# Milestones of a prompt, in order; spans are measured from "queued"
+PHASES = ("queued", "started", "first_byte", "finished", "rendered", "persisted")
+
+class Histogram:
+    """Latency histogram with fixed, roughly logarithmic millisecond buckets"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value_ms: float):
+        self.counts[bisect_left(self.BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                bound = self.BOUNDS_MS[index] if index < len(self.BOUNDS_MS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        labels = ["<=%g" % bound for bound in self.BOUNDS_MS] + [">%g" % self.BOUNDS_MS[-1]]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+@dataclass
+class Stall:
+    """A period in which the GUI event loop did not run"""
+    started_at: float  # Unix time
+    duration_ms: float
+    stack: str  # GUI thread stack sampled while it was stuck
+
+class StallWatchdog:
+    """
+    Detects GUI event-loop stalls. A QTimer on the GUI thread records a
+    heartbeat; a watcher thread notices when the heartbeat is late by more
+    than the threshold and samples the GUI thread's Python stack.
+    """
+
+    def __init__(self, threshold_ms: float = 200, interval_ms: int = 50, max_stalls: int = 100,
+                 on_stall: Optional[Callable[[Stall], None]] = None):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.stalls = deque(maxlen=max_stalls)
+        self.on_stall = on_stall
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._current: Optional[Stall] = None
+        self._gui_thread = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._timer = None
+
+    def start(self):
+        """Start watching; must be called from the GUI thread"""
+        # Imported here so modules that only record spans, like database, stay Qt-free
+        from PySide6.QtCore import QTimer
+        self._gui_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._timer = QTimer()
+        self._timer.timeout.connect(self._beat)
+        self._timer.start(int(self.interval * 1000))
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            stall, self._current = self._current, None
+            if stall is not None:
+                stall.duration_ms = (now - self._last_beat - self.interval) * 1000
+            self._last_beat = now
+        if stall is not None and self.on_stall is not None:
+            self.on_stall(stall)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                late = time.monotonic() - self._last_beat - self.interval
+                if late < self.threshold or self._current is not None:
+                    continue
+                frame = sys._current_frames().get(self._gui_thread)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                self._current = Stall(time.time() - late, late * 1000, stack)
+                self.stalls.append(self._current)
+
+class Tracer:
+    """
+    Records per-prompt milestones, named timing spans and event-loop
+    stalls. Finished prompt traces are saved next to their chat turn when
+    a database is set. All methods are thread-safe.
+    """
+    enabled = True
+
+    def __init__(self, database=None):
+        self.database = database
+        self.histograms: Dict[str, Histogram] = {}
+        self.watchdog: Optional[StallWatchdog] = None
+        self._marks: Dict[int, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def start_watchdog(self, threshold_ms: float = 200):
+        self.watchdog = StallWatchdog(
+            threshold_ms, on_stall=lambda stall: self.record("event_loop.stall", stall.duration_ms)
+        )
+        self.watchdog.start()
+
+    def stop(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+    def mark(self, request_id: int, phase: str):
+        """Note the first time a request reaches a phase"""
+        now = time.monotonic()
+        with self._lock:
+            self._marks.setdefault(request_id, {}).setdefault(phase, now)
+
+    def discard(self, request_id: int):
+        """Forget a request that failed or was cancelled"""
+        with self._lock:
+            self._marks.pop(request_id, None)
+
+    def finish(self, request_id: int, turn_id: Optional[int] = None):
+        """Turn a request's marks into spans, record them and save them with the turn"""
+        with self._lock:
+            marks = self._marks.pop(request_id, None)
+            if not marks or "queued" not in marks:
+                return
+            queued = marks["queued"]
+            spans = {phase: (marks[phase] - queued) * 1000 for phase in PHASES[1:] if phase in marks}
+            for phase, value in spans.items():
+                self._histogram("prompt." + phase).record(value)
+        if turn_id is not None and self.database is not None:
+            self.database.add_prompt_trace(turn_id, spans)
+
+    def record(self, name: str, value_ms: float):
+        with self._lock:
+            self._histogram(name).record(value_ms)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block of code into the named histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def stalls(self) -> List[Stall]:
+        return list(self.watchdog.stalls) if self.watchdog is not None else []
+
+    def snapshot(self) -> dict:
+        """Histograms and stalls as plain data"""
+        with self._lock:
+            histograms = {name: h.to_dict() for name, h in sorted(self.histograms.items())}
+        stalls = [{"started_at": s.started_at, "duration_ms": s.duration_ms, "stack": s.stack}
+                  for s in self.stalls()]
+        return {"histograms": histograms, "stalls": stalls}
+
+    def export_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def export_csv(self, path: str):
+        """One row per histogram with its summary and bucket counts"""
+        histograms = self.snapshot()["histograms"]
+        labels = ["<=%g" % b for b in Histogram.BOUNDS_MS] + [">%g" % Histogram.BOUNDS_MS[-1]]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "count", "mean_ms", "min_ms", "max_ms", "p50_ms", "p95_ms", "p99_ms"] + labels)
+            for name, h in histograms.items():
+                writer.writerow([name, h["count"], h["mean_ms"], h["min_ms"], h["max_ms"],
+                                 h["p50_ms"], h["p95_ms"], h["p99_ms"]] + [h["buckets"][l] for l in labels])
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+class NullTracer(Tracer):
+    """Tracer used when instrumentation is off; every call is a no-op"""
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def start_watchdog(self, threshold_ms: float = 200):
+        pass
+
+    def mark(self, request_id: int, phase: str):
+        pass
+
+    def discard(self, request_id: int):
+        pass
+
+    def finish(self, request_id: int, turn_id: Optional[int] = None):
+        pass
+
+    def record(self, name: str, value_ms: float):
+        pass
+
+    def span(self, name: str):
+        return _NULL_SPAN
+
+class StartupProfile:
+    """
+    Timing breakdown of application start-up: named steps measured from
+    ``start`` and, while import tracing is on, every module first imported
+    by the main thread that took at least ``IMPORT_THRESHOLD_MS``
+    """
+
+    IMPORT_THRESHOLD_MS = 1.0
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.perf_counter() if start is None else start
+        self.steps: List[Tuple[str, float, float]] = []  # (name, ms since start, ms since previous step)
+        self.imports: List[Tuple[int, str, float]] = []  # (nesting depth, module, inclusive ms), in load order
+        self._last = self.start
+        self._original_import = None
+        self._depth = 0
+        self._thread = None
+
+    def mark(self, name: str):
+        """Note that a start-up step just finished"""
+        now = time.perf_counter()
+        self.steps.append((name, (now - self.start) * 1000, (now - self._last) * 1000))
+        self._last = now
+
+    def elapsed_ms(self, name: str) -> Optional[float]:
+        """Time from start to the end of a step"""
+        for step, at, _ in self.steps:
+            if step == name:
+                return at
+        return None
+
+    def trace_imports(self):
+        """Time first-time imports on the calling thread until stop_tracing_imports"""
+        if self._original_import is not None:
+            return
+        self._original_import = original = builtins.__import__
+        self._thread = threading.get_ident()
+
+        def traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules or threading.get_ident() != self._thread:
+                return original(name, globals, locals, fromlist, level)
+            index = len(self.imports)
+            self.imports.append((self._depth, name, 0.0))
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+                self.imports[index] = (self._depth, name, (time.perf_counter() - start) * 1000)
+
+        builtins.__import__ = traced_import
+
+    def stop_tracing_imports(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def report(self) -> str:
+        """The steps, then the slow imports indented under the modules that pulled them in"""
+        lines = ["Start-up profile (ms):", "  %9s %9s  step" % ("at", "took")]
+        lines += ["  %9.1f %9.1f  %s" % (at, took, name) for name, at, took in self.steps]
+        slow = [(depth, name, ms) for depth, name, ms in self.imports if ms >= self.IMPORT_THRESHOLD_MS]
+        if slow:
+            lines += ["", "Imports taking %g ms or more (inclusive):" % self.IMPORT_THRESHOLD_MS]
+            lines += ["  %9.1f  %s%s" % (ms, "  " * depth, name) for depth, name, ms in slow]
+        return "\n".join(lines)
+
+_NULL_SPAN = nullcontext()
+_tracer: Tracer = NullTracer()
+
+def get_tracer() -> Tracer:
+    """The active tracer, a NullTracer unless enable_tracing was called"""
+    return _tracer
+
+def enable_tracing(database=None, stall_threshold_ms: float = 200) -> Tracer:
+    """Switch instrumentation on; call from the GUI thread once the QApplication exists"""
+    global _tracer
+    if not _tracer.enabled:
+        _tracer = Tracer(database)
+        _tracer.start_watchdog(stall_threshold_ms)
+    return _tracer
@@ -0,0 +1,589 @@
+from PySide6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, Signal
+from array import array
+from itertools import islice
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import ast
+import hashlib
+import heapq
+import os
+import re
+import sqlite3
+import threading
+
+from ignore_rules import DEFAULT_EXCLUDES, IgnoreRules
+
+_NONZERO_BYTE = re.compile(b"[^\x00]")
+
+@dataclass
+class FileEntry:
+    path: str  # Relative to the project root, with forward slashes
+    mtime: float
+    size: int
+    hash: Optional[str]
+
+@dataclass(frozen=True)
+class Symbol:
+    name: str
+    kind: str  # "function" or "class"
+    path: str
+    line: int
+
+def extract_symbols(source: str) -> List[Tuple[str, str, int]]:
+    """Top-level functions and classes of a Python module as (name, kind, line)"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append((node.name, "function", node.lineno))
+        elif isinstance(node, ast.ClassDef):
+            symbols.append((node.name, "class", node.lineno))
+    return symbols
+
+class FuzzyIndex:
+    """
+    In-memory fuzzy matcher over many short keys.
+
+    Keys are indexed by their character trigrams in compact posting arrays;
+    trigrams shared by many keys also get a bitmap of entry ids. A query
+    intersects the sets for its trigrams and scores only those candidates.
+    Queries too short for trigrams, or with no trigram hit (e.g.
+    abbreviations), fall back to per-character bitmaps. Bitmaps are ANDed as
+    big integers, so the filtering runs in C. Removed entries are left as
+    tombstones.
+    """
+
+    MAX_CANDIDATES = 2000  # Scoring is the slow part, so very broad queries are capped
+    DENSE_POSTINGS = 4096  # Posting lists longer than this also keep a bitmap
+
+    def __init__(self):
+        self._keys: List[Optional[str]] = []
+        self._items: List[object] = []
+        self._ids: Dict[object, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._dense: Dict[str, bytearray] = {}  # Trigram -> bitmap, for long posting lists
+        self._char_bits: Dict[str, bytearray] = {}  # Character -> bitmap
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, key: str, item):
+        """Index an item under a key; items must be hashable"""
+        if item in self._ids:
+            self.remove(item)
+        entry_id = len(self._keys)
+        key = key.lower()
+        self._keys.append(key)
+        self._items.append(item)
+        self._ids[item] = entry_id
+        for gram in self._trigrams(key):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("i")
+            postings.append(entry_id)
+            bits = self._dense.get(gram)
+            if bits is not None:
+                self._set_bit(bits, entry_id)
+            elif len(postings) > self.DENSE_POSTINGS:
+                bits = self._dense[gram] = bytearray()
+                for posted in postings:
+                    self._set_bit(bits, posted)
+        for char in set(key):
+            bits = self._char_bits.get(char)
+            if bits is None:
+                bits = self._char_bits[char] = bytearray()
+            self._set_bit(bits, entry_id)
+
+    def remove(self, item):
+        """Drop an item; its index entries become tombstones"""
+        entry_id = self._ids.pop(item, None)
+        if entry_id is not None:
+            self._keys[entry_id] = None
+            self._items[entry_id] = None
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Best matching items, best first"""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        candidates = self._trigram_candidates(query)
+        if not candidates:
+            candidates = self._subsequence_candidates(query)
+
+        keys = self._keys
+        scored = []
+        for entry_id in candidates:
+            key = keys[entry_id]
+            if key is not None:
+                score = self._score(query, key)
+                if score is not None:
+                    scored.append((score, -entry_id))
+        return [self._items[-entry_id] for _, entry_id in heapq.nlargest(limit, scored)]
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _set_bit(bits: bytearray, entry_id: int):
+        byte = entry_id >> 3
+        if byte >= len(bits):
+            # Grow geometrically so adding n entries stays linear
+            bits.extend(bytes(max(byte + 1, 2 * len(bits)) - len(bits)))
+        bits[byte] |= 1 << (entry_id & 7)
+
+    def _trigram_candidates(self, query: str) -> List[int]:
+        grams = sorted(self._trigrams(query), key=lambda g: len(self._postings.get(g, ())))
+        if not grams or grams[0] not in self._postings:
+            return []
+
+        sparse = [g for g in grams if g not in self._dense]
+        dense = [self._dense[g] for g in grams if g in self._dense]
+        if not sparse:
+            return self._and_bitmaps(dense)
+
+        candidates = set(self._postings[sparse[0]])
+        for gram in sparse[1:]:
+            candidates = candidates.intersection(self._postings[gram])
+        for bits in dense:
+            size = len(bits)
+            candidates = [i for i in candidates if (i >> 3) < size and bits[i >> 3] >> (i & 7) & 1]
+        return list(islice(candidates, self.MAX_CANDIDATES))
+
+    def _subsequence_candidates(self, query: str) -> List[int]:
+        """Entries containing every character of the query"""
+        bitmaps = [self._char_bits.get(char) for char in set(query)]
+        if None in bitmaps:
+            return []
+        return self._and_bitmaps(bitmaps)
+
+    def _and_bitmaps(self, bitmaps: List[bytearray]) -> List[int]:
+        """Entry ids set in every bitmap, lowest first, up to MAX_CANDIDATES"""
+        mask = None
+        for bits in bitmaps:
+            value = int.from_bytes(bits, "little")
+            mask = value if mask is None else mask & value
+            if not mask:
+                return []
+
+        candidates = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        for m in _NONZERO_BYTE.finditer(data):
+            byte, first = data[m.start()], m.start() * 8
+            candidates.extend(first + bit for bit in range(8) if byte >> bit & 1)
+            if len(candidates) >= self.MAX_CANDIDATES:
+                break
+        return candidates
+
+    @staticmethod
+    def _score(query: str, key: str) -> Optional[float]:
+        """Higher is better; None when the query is not a subsequence of the key"""
+        base = key.rfind("/") + 1
+        penalty = len(key) * 0.1
+        found = key.find(query, base)
+        if found >= 0:
+            return 1000 - (found - base) + (100 if found == base else 0) - penalty
+        found = key.find(query)
+        if found >= 0:
+            return 500 - penalty
+
+        score, pos, previous = 0, 0, -2
+        for char in query:
+            found = key.find(char, pos)
+            if found < 0:
+                return None
+            score += 10 if found == previous + 1 else 1
+            if found >= base:
+                score += 2
+            previous, pos = found, found + 1
+        return score - penalty
+
+class ProjectIndex:
+    """
+    On-disk index of a project's files (path, mtime, size, content hash) and
+    top-level Python symbols, with fuzzy lookup over both.
+
+    Rescans are incremental: files whose mtime and size are unchanged are
+    not re-read. Any thread may call the methods; the fuzzy indexes are
+    guarded by a lock.
+    """
+
+    MAX_HASH_BYTES = 8 * 1024 * 1024  # Larger files are indexed without a content hash
+    MAX_PARSE_BYTES = 1024 * 1024  # Larger Python files are not parsed for symbols
+
+    def __init__(self, db_path: str, root: str, excludes: Iterable[str] = DEFAULT_EXCLUDES):
+        self.db_path = db_path
+        self.root = str(Path(root).absolute())
+        self.ignore = IgnoreRules(self.root, excludes)
+        self._lock = threading.RLock()
+        self._cancelled = threading.Event()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_db()
+        self._entries: Dict[str, FileEntry] = {}
+        self._symbols: Dict[str, List[Symbol]] = {}
+        self.files = FuzzyIndex()
+        self.symbols = FuzzyIndex()
+
+    def _init_db(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    hash TEXT,
+                    PRIMARY KEY (root, path)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    line INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_symbols_path ON symbols (root, path)"
+            )
+
+    def load(self):
+        """Fill the in-memory indexes from the last saved scan, before the first scan()"""
+        entries, files = {}, FuzzyIndex()
+        for path, mtime, size, digest in self._conn.execute(
+                "SELECT path, mtime, size, hash FROM files WHERE root = ?", (self.root,)):
+            entries[path] = FileEntry(path, mtime, size, digest)
+            files.add(path, path)
+        symbols_by_path, symbols = {}, FuzzyIndex()
+        for path, name, kind, line in self._conn.execute(
+                "SELECT path, name, kind, line FROM symbols WHERE root = ?", (self.root,)):
+            symbol = Symbol(name, kind, path, line)
+            symbols_by_path.setdefault(path, []).append(symbol)
+            symbols.add(name, symbol)
+
+        # Built without the lock so searches are not blocked meanwhile
+        with self._lock:
+            self._entries, self.files = entries, files
+            self._symbols, self.symbols = symbols_by_path, symbols
+
+    def cancel(self):
+        """Make a running scan stop early"""
+        self._cancelled.set()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def scan(self, progress: Optional[Callable[[int], None]] = None) -> Tuple[int, int]:
+        """
+        Walk the whole project, re-reading only new or changed files.
+        Returns (files added or changed, files removed)
+        """
+        seen = set()
+        changed = 0
+        for count, (relative, stat) in enumerate(self._walk(self.root), 1):
+            if self._cancelled.is_set():
+                self._conn.commit()
+                return changed, 0
+            seen.add(relative)
+            if self._update_file(relative, stat):
+                changed += 1
+            if progress is not None and count % 1000 == 0:
+                progress(count)
+        removed = [path for path in list(self._entries) if path not in seen]
+        for path in removed:
+            self._remove_file(path)
+        self._conn.commit()
+        return changed, len(removed)
+
+    def update_paths(self, paths: Iterable[str]) -> int:
+        """
+        Re-check changed files or directories reported by a file watcher.
+        Directories are compared against their direct children; new
+        subdirectories are walked. Returns the number of files updated
+        """
+        changed = 0
+        for path in paths:
+            absolute = Path(path).absolute()
+            relative = self._relative(absolute)
+            if relative is None:
+                continue
+            if absolute.is_dir():
+                changed += self._update_directory(absolute, relative)
+            elif absolute.is_file():
+                changed += self._update_file(relative, absolute.stat())
+            elif relative in self._entries:
+                self._remove_file(relative)
+                changed += 1
+            else:
+                # A removed directory: drop everything below it
+                prefix = relative + "/"
+                for entry in [p for p in self._entries if p.startswith(prefix)]:
+                    self._remove_file(entry)
+                    changed += 1
+        self._conn.commit()
+        return changed
+
+    def directories(self) -> List[str]:
+        """Absolute paths of indexed directories, shallowest first"""
+        dirs = {""}
+        for path in self._entries:
+            parent = path.rpartition("/")[0]
+            while parent not in dirs:
+                dirs.add(parent)
+                parent = parent.rpartition("/")[0]
+        ordered = sorted(dirs, key=lambda d: (d.count("/") + bool(d), d))
+        return [os.path.join(self.root, d) if d else self.root for d in ordered]
+
+    def search_files(self, query: str, limit: int = 50) -> List[str]:
+        """Fuzzy-match relative file paths"""
+        with self._lock:
+            return self.files.search(query, limit)
+
+    def search_symbols(self, query: str, limit: int = 50) -> List[Symbol]:
+        """Fuzzy-match top-level Python symbol names"""
+        with self._lock:
+            return self.symbols.search(query, limit)
+
+    def absolute_path(self, relative: str) -> str:
+        return os.path.join(self.root, relative)
+
+    def _walk(self, directory: str):
+        """Yield (relative path, stat) for every file below a directory that is not ignored"""
+        stack = [(directory, self._relative(Path(directory)))]
+        while stack:
+            current, relative = stack.pop()
+            if relative is None:
+                continue
+            ignored = self.ignore.matcher(relative)
+            prefix = relative + "/" if relative else ""
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if ignored(entry.name, is_dir):
+                                continue
+                            if is_dir:
+                                stack.append((entry.path, prefix + entry.name))
+                            elif entry.is_file(follow_symlinks=False):
+                                yield prefix + entry.name, entry.stat()
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _update_directory(self, absolute: Path, relative: str) -> int:
+        changed = 0
+        present = set()
+        prefix = relative + "/" if relative else ""
+        try:
+            entries = list(os.scandir(absolute))
+        except OSError:
+            return 0
+        ignored = self.ignore.matcher(relative)
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if ignored(entry.name, is_dir):
+                    continue
+                if is_dir:
+                    for child, stat in self._walk(entry.path):
+                        changed += self._update_file(child, stat)
+                elif entry.is_file(follow_symlinks=False):
+                    child = prefix + entry.name
+                    present.add(child)
+                    changed += self._update_file(child, entry.stat())
+            except OSError:
+                continue
+
+        # Files directly in this directory that disappeared
+        for path in list(self._entries):
+            if path.startswith(prefix) and "/" not in path[len(prefix):] and path not in present:
+                self._remove_file(path)
+                changed += 1
+        return changed
+
+    def _update_file(self, relative: str, stat: os.stat_result) -> bool:
+        """Index a file if it is new or its mtime/size changed"""
+        entry = self._entries.get(relative)
+        if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+            return False
+
+        absolute = os.path.join(self.root, relative)
+        digest = None
+        symbols = []
+        if stat.st_size <= self.MAX_HASH_BYTES:
+            try:
+                with open(absolute, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return False
+            digest = hashlib.sha1(data).hexdigest()
+            if relative.endswith(".py") and stat.st_size <= self.MAX_PARSE_BYTES:
+                if entry is not None and entry.hash == digest:
+                    symbols = [(s.name, s.kind, s.line) for s in self._symbols.get(relative, [])]
+                else:
+                    symbols = extract_symbols(data.decode("utf-8", errors="replace"))
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (root, path, mtime, size, hash) VALUES (?, ?, ?, ?, ?)",
+            (self.root, relative, stat.st_mtime, stat.st_size, digest)
+        )
+        self._conn.execute("DELETE FROM symbols WHERE root = ? AND path = ?", (self.root, relative))
+        self._conn.executemany(
+            "INSERT INTO symbols (root, path, name, kind, line) VALUES (?, ?, ?, ?, ?)",
+            [(self.root, relative, name, kind, line) for name, kind, line in symbols]
+        )
+
+        with self._lock:
+            if entry is None:
+                self.files.add(relative, relative)
+            self._entries[relative] = FileEntry(relative, stat.st_mtime, stat.st_size, digest)
+            for symbol in self._symbols.pop(relative, []):
+                self.symbols.remove(symbol)
+            for name, kind, line in symbols:
+                self._add_symbol(Symbol(name, kind, relative, line))
+        return True
+
+    def _remove_file(self, relative: str):
+        self._conn.execute("DELETE FROM files WHERE root = ? AND path = ?", (self.root, relative))
+        self._conn.execute("DELETE FROM symbols WHERE root = ? AND path = ?", (self.root, relative))
+        with self._lock:
+            self._entries.pop(relative, None)
+            self.files.remove(relative)
+            for symbol in self._symbols.pop(relative, []):
+                self.symbols.remove(symbol)
+
+    def _add_symbol(self, symbol: Symbol):
+        self._symbols.setdefault(symbol.path, []).append(symbol)
+        self.symbols.add(symbol.name, symbol)
+
+    def _relative(self, absolute: Path) -> Optional[str]:
+        try:
+            relative = absolute.relative_to(self.root)
+        except ValueError:
+            return None
+        return "" if str(relative) == "." else relative.as_posix()
+
+class _IndexTask(QThread):
+    """Runs one indexing job off the GUI thread"""
+
+    def __init__(self, job: Callable[[], None], parent=None):
+        super().__init__(parent)
+        self.job = job
+
+    def run(self):
+        self.job()
+
+class ProjectIndexer(QObject):
+    """
+    Keeps a ProjectIndex current in the background: one full incremental
+    scan when a project opens, then QFileSystemWatcher deltas
+    """
+    index_updated = Signal(int)  # Emitted with the number of indexed files
+
+    MAX_WATCHED_DIRS = 2000  # Stay well below the inotify watch limit
+    DEBOUNCE_MS = 300
+
+    def __init__(self, db_path: str, parent=None, excludes: Iterable[str] = DEFAULT_EXCLUDES):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.excludes = set(excludes)
+        self.index: Optional[ProjectIndex] = None
+        self._task = None
+        self._pending: Set[str] = set()
+        self._rescan = False
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.path_changed)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._run_pending)
+
+    def open_project(self, root: str):
+        """Switch to a project and start its incremental scan"""
+        self.close()
+        self.index = ProjectIndex(self.db_path, root, self.excludes)
+        self._rescan = True
+        self._run_pending()
+
+    def close(self):
+        """Wait for the running job and release the current index"""
+        if self._task is not None:
+            self.index.cancel()
+            self._task.wait()
+            self._task = None
+        watched = self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+        self._pending.clear()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def path_changed(self, path: str):
+        """Queue a changed file or directory for re-indexing"""
+        if self.index is None:
+            return
+        self._pending.add(path)
+        self._debounce.start()
+
+    def search_files(self, query: str, limit: int = 50) -> List[str]:
+        return self.index.search_files(query, limit) if self.index is not None else []
+
+    def search_symbols(self, query: str, limit: int = 50) -> List[Symbol]:
+        return self.index.search_symbols(query, limit) if self.index is not None else []
+
+    def _run_pending(self):
+        """Start the next job unless one is already running"""
+        if self._task is not None or self.index is None:
+            return
+        index = self.index
+        if self._rescan:
+            self._rescan = False
+            job = lambda: (index.load(), index.scan())
+        elif self._pending:
+            paths, self._pending = self._pending, set()
+            job = lambda: index.update_paths(paths)
+        else:
+            return
+        self._task = _IndexTask(job, self)
+        self._task.finished.connect(partial(self._task_finished, self._task))
+        self._task.start()
+
+    def _task_finished(self, task: _IndexTask):
+        task.deleteLater()
+        # close() already waited for a task of a previous project; one of the new project may be running
+        if task is not self._task:
+            return
+        self._task = None
+        if self.index is None:
+            return
+        self._watch_directories()
+        self.index_updated.emit(len(self.index))
+        self._run_pending()
+
+    def _watch_directories(self):
+        """Watch indexed directories, shallowest first, up to the cap"""
+        watched = set(self.watcher.directories())
+        wanted = self.index.directories()[:self.MAX_WATCHED_DIRS]
+        wanted_set = set(wanted)
+        stale = [d for d in watched if d not in wanted_set]
+        if stale:
+            self.watcher.removePaths(stale)
+        new = [d for d in wanted if d not in watched]
+        if new:
+            self.watcher.addPaths(new)
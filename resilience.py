@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import random
+import re
+import time
+
+from instrumentation import Histogram
+
+# Kinds of CLI failure
+RATE_LIMITED = "rate_limited"  # Quota or throttling; retried, and concurrency backs off
+TRANSIENT = "transient"  # Server, network or crash trouble that may clear up; retried
+TIMEOUT = "timeout"  # The request produced no output for its timeout; retried
+FATAL = "fatal"  # Bad arguments, auth, missing CLI or anything unrecognised; not retried
+
+RETRYABLE = frozenset((RATE_LIMITED, TRANSIENT, TIMEOUT))
+
+# Checked against stderr in this order, so fatal causes win over the transient-looking noise
+# that often follows them
+_PATTERNS = (
+    (FATAL, re.compile(
+        r"\b(?:401|403)\b|unauthori[sz]ed|permission[ _]denied|invalid[ _]api[ _]key|api key not valid"
+        r"|unauthenticated|invalid[ _]argument|not logged in|login required", re.I)),
+    (RATE_LIMITED, re.compile(
+        r"\b429\b|rate[ -]?limit|resource[ _]exhausted|quota|too many requests", re.I)),
+    (TRANSIENT, re.compile(
+        r"\b(?:500|502|503|504)\b|unavailable|overloaded|internal (?:server )?error|deadline[ _]exceeded"
+        r"|timed? ?out|econnreset|econnrefused|etimedout|enotfound|eai_again|socket hang up"
+        r"|network|connection (?:reset|refused|closed)|fetch failed", re.I)),
+)
+
+# "retry after 30s", "retryDelay": "30s", "Retry-After: 30", "retry in 1.5 seconds"
+_RETRY_AFTER = re.compile(
+    r"retry[ _-]?(?:after|delay|in)[\"']?\s*[:=]?\s*[\"']?(\d+(?:\.\d+)?)\s*(ms|s|sec|seconds?)?\b", re.I)
+
+@dataclass
+class Failure:
+    kind: str
+    message: str
+    retry_after_ms: Optional[float] = None  # Delay the CLI asked for, if it said
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in RETRYABLE
+
+def classify_failure(exit_code: Optional[int], stderr: str, message: str = "",
+                     crashed: bool = False, timed_out: bool = False) -> Failure:
+    """
+    Sort a failed CLI run into one of the failure kinds from its exit code
+    and stderr. ``message`` is what the caller reports for it; a crash with
+    nothing recognisable on stderr counts as transient
+    """
+    message = message or f"Gemini CLI Error (Exit code: {exit_code}): {stderr.strip()}"
+    if timed_out:
+        return Failure(TIMEOUT, message)
+    kind = None
+    for candidate, pattern in _PATTERNS:
+        if pattern.search(stderr):
+            kind = candidate
+            break
+    if kind is None:
+        kind = TRANSIENT if crashed else FATAL
+    retry_after = None
+    if kind == RATE_LIMITED:
+        m = _RETRY_AFTER.search(stderr)
+        if m:
+            retry_after = float(m.group(1)) * (1 if (m.group(2) or "s").lower() == "ms" else 1000)
+    return Failure(kind, message, retry_after)
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently failed requests are retried"""
+    max_attempts: int = 4  # Including the first; 1 disables retries
+    base_delay_ms: float = 1000
+    max_delay_ms: float = 60_000
+    timeout_ms: Optional[int] = 180_000  # Without any output, restarted by each chunk; None waits forever
+
+    def delay_ms(self, attempt: int, failure: Optional[Failure] = None,
+                 rng: Optional[random.Random] = None) -> float:
+        """
+        Backoff before attempt ``attempt + 1``: "full jitter", uniform up to
+        an exponentially growing cap, so clients that failed together do not
+        retry together. A delay the CLI asked for is a lower bound
+        """
+        cap = min(self.max_delay_ms, self.base_delay_ms * 2 ** max(0, attempt - 1))
+        delay = (rng or random).uniform(0, cap)
+        if failure is not None and failure.retry_after_ms is not None:
+            delay = max(delay, min(failure.retry_after_ms, self.max_delay_ms))
+        return delay
+
+class ConcurrencyLimit:
+    """
+    Additive-increase, multiplicative-decrease limit on concurrent requests.
+    Each success adds 1/limit, about one slot per limit's worth of
+    successes; a rate-limit failure halves it. Requests that were already
+    running when the limit was last cut do not cut it again, so a burst of
+    rejections from one overload costs one halving, not one per request.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, decrease: float = 0.5, adaptive: bool = True):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.decrease = decrease
+        self.adaptive = adaptive
+        self.value = float(self.maximum)
+        self.last_decrease = float("-inf")  # time.monotonic() of the last cut
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_success(self):
+        if self.adaptive and self.value < self.maximum:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+
+    def on_rate_limited(self, started_at: float) -> bool:
+        """Cut the limit for a request started at ``started_at``; False if that overload was already handled"""
+        if not self.adaptive or started_at < self.last_decrease:
+            return False
+        self.value = max(self.minimum, self.value * self.decrease)
+        self.last_decrease = time.monotonic()
+        self.decreases += 1
+        return True
+
+@dataclass
+class ResilienceStats:
+    """Counters of attempts, failures by kind and time spent backing off"""
+    attempts: int = 0
+    succeeded: int = 0
+    retries: int = 0
+    gave_up: int = 0
+    failures: Dict[str, int] = field(default_factory=dict)
+    backoff: Histogram = field(default_factory=Histogram)  # Delays before retries, in ms
+
+    def record_failure(self, failure: Failure):
+        self.failures[failure.kind] = self.failures.get(failure.kind, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "succeeded": self.succeeded,
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "failures": dict(self.failures),
+            "backoff_total_ms": self.backoff.total,
+            "backoff": self.backoff.to_dict(),
+        }
@@ -0,0 +1,80 @@
+import hashlib
+import re
+import time
+from typing import Iterable, Optional, Tuple
+
+from database import Database
+
+class ResponseCache:
+    """
+    Caches Gemini responses in the Database, keyed by a hash of the
+    normalized prompt plus the content of any attached files.
+
+    Entries older than ``max_age_days`` expire, and the least recently used
+    ones are evicted once the cache grows past ``max_bytes``. Lookups only
+    read; their use times are written in one batch with the next store,
+    eviction or ``flush``.
+    """
+
+    EVICT_EVERY = 20  # Stores between eviction passes
+
+    def __init__(self, database: Database, max_bytes: int = 50 * 1024 * 1024,
+                 max_age_days: float = 30):
+        self.database = database
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._used = {}  # Key -> time of hits not yet written
+
+    @staticmethod
+    def make_key(prompt: str, attachments: Iterable[Tuple[str, str]] = ()) -> str:
+        """Hash a prompt and its (path, content) attachments into a cache key"""
+        digest = hashlib.sha256()
+        digest.update(re.sub(r"\s+", " ", prompt).strip().encode("utf-8"))
+        for path, content in sorted(attachments):
+            digest.update(b"\0" + path.encode("utf-8") + b"\0")
+            digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, counting the hit or miss"""
+        response = self.database.get_cached_response(key, self.max_age_seconds)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._used[key] = time.time()
+        return response
+
+    def put(self, key: str, response: str):
+        """Store a response, periodically evicting old and excess entries"""
+        self.flush()
+        self.database.store_cached_response(key, response)
+        self._stores += 1
+        if self._stores % self.EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self) -> int:
+        """Apply the age and size limits now"""
+        self.flush()
+        return self.database.evict_cached_responses(self.max_bytes, self.max_age_seconds)
+
+    def flush(self):
+        """Write the use times of recent hits, which eviction orders by"""
+        if self._used:
+            used, self._used = self._used, {}
+            self.database.touch_cached_responses(list(used.items()))
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current cache size"""
+        lookups = self.hits + self.misses
+        entries, size = self.database.get_response_cache_size()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,129 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Collection, Dict, List, Optional
+
+from database import Database, SessionUsage
+from snapshot_store import SnapshotStore
+
+@dataclass
+class RetentionPolicy:
+    """Limits on kept history; None keeps everything as far as that limit goes"""
+    max_age_days: Optional[float] = None  # Since the session's last turn
+    max_sessions_per_project: Optional[int] = None  # The most recently active are kept
+    max_bytes: Optional[int] = None  # Stored size of all prompts and responses
+
+    def is_unlimited(self) -> bool:
+        return self.max_age_days is None and self.max_sessions_per_project is None and self.max_bytes is None
+
+@dataclass
+class RetentionReport:
+    sessions_deleted: int = 0
+    turns_deleted: int = 0
+    turns_compressed: int = 0
+    compression_saved: int = 0  # Bytes
+    snapshot_bytes_freed: int = 0
+    size_before: int = 0  # Database bytes
+    size_after: int = 0
+    free_before: int = 0  # Bytes of free pages inside the database
+    free_after: int = 0
+    index_before: Optional[int] = None  # Bytes of the search index, if SQLite can tell
+    index_after: Optional[int] = None
+    dry_run: bool = False
+    vacuum_available: bool = True  # False for databases created before incremental vacuum
+
+    @property
+    def reclaimed(self) -> int:
+        """
+        Bytes freed in the database, tables and search index alike, and in the
+        snapshot stores. Without incremental vacuum the freed pages stay in
+        the file for reuse
+        """
+        used_before = self.size_before - self.free_before
+        used_after = self.size_after - self.free_after
+        return used_before - used_after + self.snapshot_bytes_freed
+
+    def summary(self) -> str:
+        verb = "Would delete" if self.dry_run else "Deleted"
+        lines = [f"{verb} {self.sessions_deleted} sessions with {self.turns_deleted} chat turns."]
+        if not self.dry_run:
+            lines.append(f"Compressed {self.turns_compressed} chat turns, saving {self.compression_saved / 1024:.1f} KB.")
+            lines.append(f"Freed {self.snapshot_bytes_freed / 1024:.1f} KB of unreferenced snapshots.")
+            lines.append(f"Database: {self.size_before / 1024 / 1024:.1f} MB -> {self.size_after / 1024 / 1024:.1f} MB; "
+                         f"{self.reclaimed / 1024 / 1024:.1f} MB reclaimed in total.")
+            if self.index_before is not None and self.index_after is not None:
+                lines.append(f"Search index: {self.index_before / 1024 / 1024:.1f} MB -> "
+                             f"{self.index_after / 1024 / 1024:.1f} MB.")
+            if not self.vacuum_available:
+                lines.append("Free pages stay in the file until a one-time full VACUUM "
+                             "(db_tools.py retention --enable-vacuum).")
+        return "\n".join(lines)
+
+def select_expired_sessions(usage: List[SessionUsage], policy: RetentionPolicy,
+                            keep: Collection[int] = (), now: Optional[datetime] = None) -> List[SessionUsage]:
+    """
+    The sessions a policy drops. ``usage`` must be most recently active
+    first, as get_session_usage returns it; sessions in ``keep`` survive
+    every limit but still count towards them
+    """
+    now = now or datetime.now(timezone.utc)
+    # Timestamps are stored as SQLite's UTC CURRENT_TIMESTAMP text, which sorts like a date
+    cutoff = None
+    if policy.max_age_days is not None:
+        cutoff = (now - timedelta(days=policy.max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    expired = []
+    per_project: Dict[str, int] = {}
+    kept_bytes = 0
+    for session in usage:
+        rank = per_project[session.project_path] = per_project.get(session.project_path, 0) + 1
+        if session.id not in keep and (
+                (cutoff is not None and session.last_active < cutoff)
+                or (policy.max_sessions_per_project is not None and rank > policy.max_sessions_per_project)
+                or (policy.max_bytes is not None and kept_bytes + session.bytes > policy.max_bytes)):
+            expired.append(session)
+        else:
+            kept_bytes += session.bytes
+    return expired
+
+def apply_retention(db: Database, policy: RetentionPolicy, keep: Collection[int] = (),
+                    dry_run: bool = False, should_stop: Optional[Callable[[], bool]] = None) -> RetentionReport:
+    """
+    Delete the sessions the policy drops, garbage-collect the snapshots they
+    referenced, merge the search index, compress turns stored before
+    compression existed and give free pages back with an incremental
+    vacuum. Each step works in short transactions, so it can run in the
+    background while the app is in use; ``should_stop`` is checked between
+    them
+    """
+    stopped = should_stop or (lambda: False)
+    report = RetentionReport(dry_run=dry_run)
+    report.size_before, report.free_before = db.get_space_usage()
+    report.index_before = db.get_search_index_size()
+
+    expired = select_expired_sessions(db.get_session_usage(), policy, keep) if not policy.is_unlimited() else []
+    report.sessions_deleted = len(expired)
+    report.turns_deleted = sum(session.turns for session in expired)
+    if dry_run:
+        report.size_after, report.free_after = report.size_before, report.free_before
+        report.index_after = report.index_before
+        return report
+
+    if expired:
+        report.turns_deleted = db.delete_sessions([session.id for session in expired])
+        for project in {session.project_path for session in expired}:
+            versions = os.path.join(project, ".gemini-versions")
+            if os.path.isdir(versions):
+                _, freed = SnapshotStore(versions).gc(db.get_snapshot_refs(project))
+                report.snapshot_bytes_freed += freed
+        if not stopped():
+            db.merge_search_index(should_stop=stopped)
+
+    if not stopped():
+        report.turns_compressed, report.compression_saved = db.compress_turns(should_stop=stopped)
+    report.vacuum_available = db.incremental_vacuum_available()
+    if not stopped() and report.vacuum_available:
+        db.incremental_vacuum()
+    report.size_after, report.free_after = db.get_space_usage()
+    report.index_after = db.get_search_index_size()
+    return report
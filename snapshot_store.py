@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+def atomic_write(path: Path, data: bytes):
+    """Write to a temporary file in the same directory, fsync it and rename it over path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            # Keep the permissions of the file being replaced
+            os.chmod(tmp_path, path.stat().st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class SnapshotStore:
+    """
+    Content-addressed, compressed store for file snapshots in .gemini-versions/.
+
+    A snapshot is referenced by the SHA-256 of the file content, so identical
+    versions are stored once. Small files become a single zlib blob. Larger
+    ones are split into content-defined chunks at line boundaries and stored
+    as a manifest of chunk hashes; an edit only produces new chunks around
+    the changed lines, which acts as a delta against earlier versions.
+    Every object is written to a temporary file, fsynced and renamed into place.
+    """
+
+    BLOB = b"B"
+    MANIFEST = b"M"
+
+    CHUNK_THRESHOLD = 64 * 1024  # Files larger than this are chunked
+    MIN_CHUNK = 2 * 1024
+    MAX_CHUNK = 64 * 1024
+    BOUNDARY_MASK = 0x1F  # On average one boundary candidate every 32 lines
+
+    def __init__(self, root: str = ".gemini-versions", compress_level: int = 6):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.compress_level = compress_level
+
+    def snapshot(self, file_path: str) -> str:
+        """Store the current content of a file and return its snapshot reference"""
+        with open(file_path, "rb") as f:
+            return self.store(f.read())
+
+    def store(self, data: bytes) -> str:
+        """Store content and return its reference, reusing an existing copy"""
+        ref = hashlib.sha256(data).hexdigest()
+        if self._object_path(ref).exists():
+            return ref
+
+        if len(data) <= self.CHUNK_THRESHOLD:
+            self._write_object(ref, self.BLOB, data)
+            return ref
+
+        chunk_refs = []
+        for chunk in self._chunks(data):
+            chunk_ref = hashlib.sha256(chunk).hexdigest()
+            if not self._object_path(chunk_ref).exists():
+                self._write_object(chunk_ref, self.BLOB, chunk)
+            chunk_refs.append(chunk_ref)
+        self._write_object(ref, self.MANIFEST, json.dumps(chunk_refs).encode("ascii"))
+        return ref
+
+    def load(self, ref: str) -> bytes:
+        """Return the content of a snapshot"""
+        kind, payload = self._read_object(ref)
+        if kind == self.MANIFEST:
+            return b"".join(self._read_object(chunk_ref)[1] for chunk_ref in json.loads(payload))
+        return payload
+
+    def restore(self, ref: str, file_path: str):
+        """Atomically replace a file with the content of a snapshot"""
+        data = self.load(ref)
+        if hashlib.sha256(data).hexdigest() != ref:
+            raise ValueError(f"Snapshot {ref} is corrupted")
+        atomic_write(Path(file_path), data)
+
+    def exists(self, ref: str) -> bool:
+        """Whether a snapshot is present in the store"""
+        return self._object_path(ref).exists()
+
+    def gc(self, live_refs: Iterable[str]) -> Tuple[int, int]:
+        """
+        Delete objects that no live snapshot references.
+        Returns (objects removed, bytes freed)
+        """
+        refcounts = Counter()
+        for ref in set(filter(None, live_refs)):
+            if not self.exists(ref):
+                continue
+            refcounts[ref] += 1
+            kind, payload = self._read_object(ref)
+            if kind == self.MANIFEST:
+                refcounts.update(json.loads(payload))
+
+        removed = freed = 0
+        for path in self._all_objects():
+            ref = path.parent.name + path.name
+            if refcounts[ref] == 0:
+                freed += path.stat().st_size
+                path.unlink()
+                removed += 1
+        return removed, freed
+
+    def disk_usage(self) -> int:
+        """Total bytes used by stored objects"""
+        return sum(path.stat().st_size for path in self._all_objects())
+
+    def _chunks(self, data: bytes) -> List[bytes]:
+        """Split content into chunks whose boundaries depend only on nearby lines"""
+        chunks = []
+        current = []
+        size = 0
+        for line in data.splitlines(keepends=True):
+            # Very long lines (minified or binary data) are cut at fixed offsets
+            pieces = [line[i:i + self.MAX_CHUNK] for i in range(0, len(line), self.MAX_CHUNK)]
+            for piece in pieces:
+                current.append(piece)
+                size += len(piece)
+                if size >= self.MAX_CHUNK or (
+                        size >= self.MIN_CHUNK and zlib.crc32(piece) & self.BOUNDARY_MASK == 0):
+                    chunks.append(b"".join(current))
+                    current = []
+                    size = 0
+        if current:
+            chunks.append(b"".join(current))
+        return chunks
+
+    def _object_path(self, ref: str) -> Path:
+        return self.objects / ref[:2] / ref[2:]
+
+    def _all_objects(self) -> Iterable[Path]:
+        if not self.objects.exists():
+            return []
+        return [path for path in self.objects.glob("??/*") if path.is_file()]
+
+    def _write_object(self, ref: str, kind: bytes, data: bytes):
+        atomic_write(self._object_path(ref), kind + zlib.compress(data, self.compress_level))
+
+    def _read_object(self, ref: str) -> Tuple[bytes, bytes]:
+        with open(self._object_path(ref), "rb") as f:
+            raw = f.read()
+        return raw[:1], zlib.decompress(raw[1:])
@@ -0,0 +1,33 @@
+import os
+
+import context_packer
+from context_packer import ContextPacker
+
+SOURCE = '# Größe des Caches\n\ndef grüße(name):\n    return "Grüß dich, " + name\n'
+
+def no_open(*args, **kwargs):
+    raise AssertionError("file was read again")
+
+def test_unchanged_non_ascii_file_is_not_reread(tmp_path, monkeypatch):
+    path = tmp_path / "greet.py"
+    path.write_text(SOURCE, encoding="utf-8")
+    packer = ContextPacker()
+    first = packer.file_chunks(str(path))
+
+    monkeypatch.setattr(context_packer, "open", no_open, raising=False)
+    assert packer.file_chunks(str(path)) is first
+    assert (packer.hits, packer.misses) == (1, 1)
+
+def test_touched_file_is_rehashed_once(tmp_path, monkeypatch):
+    path = tmp_path / "greet.py"
+    path.write_text(SOURCE, encoding="utf-8")
+    packer = ContextPacker()
+    first = packer.file_chunks(str(path))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    # Same content under a new mtime: rehashed, then trusted by mtime and size
+    assert packer.file_chunks(str(path)) is first
+    monkeypatch.setattr(context_packer, "open", no_open, raising=False)
+    assert packer.file_chunks(str(path)) is first
+    assert (packer.hits, packer.misses) == (2, 1)
@@ -0,0 +1,67 @@
+import sqlite3
+
+from database import Database, _snippet
+from retention import RetentionPolicy, apply_retention
+
+LONG_PROMPT = "needle " + " ".join("word%d" % (i % 300) for i in range(600))
+
+def turn_ids(db, text):
+    return [hit.turn_id for hit in db.search_history(text)]
+
+def test_plain_sqlite_client_keeps_index_in_sync(tmp_path):
+    path = str(tmp_path / "agent.db")
+    db = Database(path)
+    session = db.create_session("/project")
+    first = db.add_chat_turn(session, "hello world", "reply")
+
+    # No custom functions registered on this connection
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO chat_turns (session_id, prompt, response) VALUES (?, 'zebra stripes', 'ok')",
+                 (session,))
+    conn.execute("UPDATE chat_turns SET response = 'giraffe' WHERE id = ?", (first,))
+    conn.commit()
+    assert turn_ids(db, "zebra") == [first + 1]
+    assert turn_ids(db, "giraffe") == [first]
+    assert turn_ids(db, "reply") == []
+
+    conn.execute("DELETE FROM chat_turns WHERE id = ?", (first,))
+    conn.commit()
+    conn.close()
+    assert turn_ids(db, "hello") == []
+    db.close()
+
+def test_search_compressed_turn(tmp_path):
+    db = Database(str(tmp_path / "agent.db"))
+    session = db.create_session("/project")
+    turn_id = db.add_chat_turn(session, LONG_PROMPT, "the answer")
+    stored = db._connect().execute("SELECT compressed FROM chat_turns WHERE id = ?", (turn_id,)).fetchone()[0]
+    assert bool(stored) == db.compression_enabled
+
+    hits = db.search_history("needl", highlight=("[", "]"))
+    assert [hit.turn_id for hit in hits] == [turn_id]
+    assert hits[0].prompt_snippet.startswith("[needle] word0 word1")
+    assert hits[0].prompt_snippet.endswith("…")
+    assert hits[0].response_snippet == "the answer"
+
+    db.rebuild_search_index()
+    assert turn_ids(db, "needle") == [turn_id]
+    db.close()
+
+def test_snippet_window():
+    text = " ".join("w%d" % i for i in range(100)) + " target"
+    assert _snippet(text, "target", ("<", ">"), 4) == "…w97 w98 w99 <target>"
+    assert _snippet("short text", "other", ("<", ">"), 4) == "short text"
+
+def test_retention_keeps_search_of_remaining_sessions(tmp_path):
+    db = Database(str(tmp_path / "agent.db"))
+    old = db.create_session("/project")
+    for i in range(50):
+        db.add_chat_turn(old, "old prompt %d" % i, LONG_PROMPT)
+    new = db.create_session("/project")
+    kept = db.add_chat_turn(new, "new prompt", LONG_PROMPT)
+
+    report = apply_retention(db, RetentionPolicy(max_sessions_per_project=1))
+    assert report.sessions_deleted == 1 and report.turns_deleted == 50
+    assert report.reclaimed > 0
+    assert turn_ids(db, "needle") == [kept]
+    db.close()
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from ui.file_io import FileLoadThread, FileSaveThread
+
+def load(path, first_chunk, chunk):
+    loader = FileLoadThread(str(path))
+    loader.FIRST_CHUNK = first_chunk
+    loader.CHUNK = chunk
+    chunks = []
+    loader.chunk_loaded.connect(chunks.append)
+    loader.run()
+    return loader, chunks
+
+def test_crlf_split_across_chunks(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"abc\r\ndef\r\nghi\r\n")
+    # The first chunk ends between "\r" and "\n"
+    loader, chunks = load(path, 4, 3)
+    assert "".join(chunks) == "abc\ndef\nghi\n"
+    assert loader.newline == "\r\n"
+
+def test_save_keeps_crlf(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"one\r\ntwo\r\n")
+    loader, chunks = load(path, 4, 4)
+    FileSaveThread(str(path), "".join(chunks) + "three\n", loader.newline).run()
+    assert path.read_bytes() == b"one\r\ntwo\r\nthree\r\n"
+
+def test_mixed_line_endings_save_as_lf(tmp_path):
+    path = tmp_path / "mixed.txt"
+    path.write_bytes(b"one\r\ntwo\nthree\r")
+    loader, chunks = load(path, 2, 2)
+    assert "".join(chunks) == "one\ntwo\nthree\n"
+    assert loader.newline == "\n"
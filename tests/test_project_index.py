@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from project_index import ProjectIndexer
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+def make_project(root, files):
+    for i in range(files):
+        package = root / ("pkg%d" % (i // 50))
+        package.mkdir(parents=True, exist_ok=True)
+        (package / ("mod%d.py" % i)).write_text("def func%d():\n    return %d\n" % (i, i))
+    return str(root)
+
+def test_switch_projects_mid_scan(app, tmp_path):
+    first = make_project(tmp_path / "first", 2000)
+    second = make_project(tmp_path / "second", 300)
+    indexer = ProjectIndexer(str(tmp_path / "index.db"))
+    updates = []
+    indexer.index_updated.connect(updates.append)
+
+    indexer.open_project(first)
+    # The first scan's finished signal is still queued when the second scan starts
+    indexer.open_project(second)
+    loop = QEventLoop()
+    indexer.index_updated.connect(lambda _count: loop.quit())
+    QTimer.singleShot(30000, loop.quit)
+    loop.exec()
+    app.processEvents()
+
+    assert updates == [300]
+    assert len(indexer.index) == 300
+    assert indexer.search_symbols("func299")[0].name == "func299"
+    indexer.close()
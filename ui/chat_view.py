@@ -0,0 +1,291 @@
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView, QApplication
+from PySide6.QtCore import Qt, Signal, QAbstractListModel, QModelIndex, QSize, QRectF
+from PySide6.QtGui import QTextDocument, QPainter, QColor, QKeySequence
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html import escape
+from itertools import count
+from typing import List, Optional
+
+from instrumentation import get_tracer
+
+MESSAGE_ROLE = Qt.UserRole + 1
+
+_message_ids = count(1)
+
+@dataclass(eq=False)
+class ChatMessage:
+    """One bubble in the chat view"""
+    text: str
+    is_user: bool
+    is_error: bool = False
+    html: Optional[str] = None  # Rendered markdown; agent messages show as plain text until it is set
+    turn_id: Optional[int] = None
+    uid: int = field(default_factory=lambda: next(_message_ids))
+    version: int = 0  # Bumped whenever the content changes
+
+class ChatModel(QAbstractListModel):
+    """
+    List model holding the loaded chat messages, oldest first
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages: List[ChatMessage] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self._messages[index.row()]
+        if role == MESSAGE_ROLE:
+            return message
+        if role == Qt.DisplayRole:
+            return message.text
+        return None
+
+    def messages(self) -> List[ChatMessage]:
+        """All loaded messages, oldest first"""
+        return self._messages
+
+    def append_message(self, message: ChatMessage):
+        """Add a message at the bottom"""
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append(message)
+        self.endInsertRows()
+
+    def prepend_messages(self, messages: List[ChatMessage]):
+        """Add a page of older messages at the top"""
+        if not messages:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(messages) - 1)
+        self._messages[:0] = messages
+        self.endInsertRows()
+
+    def remove_oldest(self, count: int) -> List[ChatMessage]:
+        """Remove messages from the top and return them"""
+        count = min(count, len(self._messages))
+        if count <= 0:
+            return []
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        removed = self._messages[:count]
+        del self._messages[:count]
+        self.endRemoveRows()
+        return removed
+
+    def clear(self):
+        """Remove every message"""
+        self.beginResetModel()
+        self._messages = []
+        self.endResetModel()
+
+    def message_changed(self, message: ChatMessage) -> QModelIndex:
+        """Notify views that a message's content changed and return its index"""
+        message.version += 1
+        # Updated messages are almost always the newest ones, so search backwards
+        for row in range(len(self._messages) - 1, -1, -1):
+            if self._messages[row] is message:
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                return index
+        return QModelIndex()
+
+class ChatDelegate(QStyledItemDelegate):
+    """
+    Paints messages as rounded bubbles of rich text.
+
+    Laid-out documents are cached per message version and view width in a
+    bounded LRU, so only visible messages keep a QTextDocument alive;
+    heights, needed for every row on each layout, in a larger one.
+    Markdown is never parsed here: messages carry their rendered HTML.
+    """
+
+    MARGIN = 5
+    PADDING = 10
+    RADIUS = 10
+    MAX_CACHED_DOCUMENTS = 200
+    MAX_CACHED_HEIGHTS = 2000
+
+    def __init__(self, view: QListView):
+        super().__init__(view)
+        self.view = view
+        self._documents = OrderedDict()
+        self._heights = OrderedDict()
+        self._heights_width = None
+
+    def paint(self, painter, option, index):
+        message = index.data(MESSAGE_ROLE)
+        bubble = option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        document = self._document(message, self._content_width())
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(self._bubble_color(message)))
+        painter.drawRoundedRect(bubble, self.RADIUS, self.RADIUS)
+        painter.translate(bubble.left() + self.PADDING, bubble.top() + self.PADDING)
+        document.drawContents(painter, QRectF(0, 0, document.textWidth(), document.size().height()))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        message = index.data(MESSAGE_ROLE)
+        width = self._content_width()
+        if width != self._heights_width:
+            self._heights.clear()
+            self._heights_width = width
+
+        key = (message.uid, message.version)
+        height = self._heights.get(key)
+        if height is None:
+            height = int(self._document(message, width).size().height())
+            self._heights[key] = height
+            if len(self._heights) > self.MAX_CACHED_HEIGHTS:
+                self._heights.popitem(last=False)
+        else:
+            self._heights.move_to_end(key)
+        return QSize(self.view.viewport().width(), height + 2 * (self.MARGIN + self.PADDING))
+
+    def forget(self, message: ChatMessage):
+        """Drop cached layouts of a message's older versions"""
+        self.forget_all([message])
+
+    def forget_all(self, messages: List[ChatMessage]):
+        """Drop cached layouts of messages that changed or left the view"""
+        uids = {message.uid for message in messages}
+        for key in [k for k in self._documents if k[0] in uids]:
+            del self._documents[key]
+        for key in [k for k in self._heights if k[0] in uids]:
+            del self._heights[key]
+
+    def clear_cache(self):
+        """Drop every cached layout"""
+        self._documents.clear()
+        self._heights.clear()
+
+    def _content_width(self) -> int:
+        return max(50, self.view.viewport().width() - 2 * (self.MARGIN + self.PADDING))
+
+    def _document(self, message: ChatMessage, width: int) -> QTextDocument:
+        """Return the laid-out document for a message, building it on a cache miss"""
+        key = (message.uid, message.version, width)
+        document = self._documents.get(key)
+        if document is not None:
+            self._documents.move_to_end(key)
+            return document
+
+        with get_tracer().span("chat.layout"):
+            document = QTextDocument()
+            document.setDocumentMargin(0)
+            document.setDefaultFont(self.view.font())
+            if message.html is not None:
+                document.setHtml(message.html)
+            else:
+                document.setHtml("<p>%s</p>" % escape(message.text).replace("\n", "<br>"))
+            document.setTextWidth(width)
+
+        self._documents[key] = document
+        if len(self._documents) > self.MAX_CACHED_DOCUMENTS:
+            self._documents.popitem(last=False)
+        return document
+
+    @staticmethod
+    def _bubble_color(message: ChatMessage) -> str:
+        return (
+            "#e3f2fd" if message.is_user else  # Light blue for user
+            "#ffebee" if message.is_error else  # Light red for errors
+            "#f5f5f5"                           # Light gray for agent
+        )
+
+class ChatListView(QListView):
+    """
+    Virtualized chat history: only visible messages are painted, and
+    ``older_requested`` asks for the previous page when scrolled to the top.
+    """
+    older_requested = Signal()
+
+    LOAD_THRESHOLD_PX = 50  # Distance from the top that triggers loading older messages
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.chat_model = ChatModel(self)
+        self.setModel(self.chat_model)
+        self.chat_delegate = ChatDelegate(self)
+        self.setItemDelegate(self.chat_delegate)
+
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.Adjust)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setUniformItemSizes(False)
+        self.setStyleSheet("QListView { border: none; }")
+        self.verticalScrollBar().valueChanged.connect(self._check_top)
+
+    def add_message(self, message: ChatMessage):
+        """Append a message and keep the newest one in view"""
+        self.chat_model.append_message(message)
+        self.scroll_to_bottom()
+
+    def update_message(self, message: ChatMessage):
+        """Re-layout a message whose text, HTML or style changed"""
+        self.chat_delegate.forget(message)
+        index = self.chat_model.message_changed(message)
+        if index.isValid():
+            self.chat_delegate.sizeHintChanged.emit(index)
+
+    def drop_oldest(self, keep: int) -> List[ChatMessage]:
+        """
+        Remove the oldest messages beyond ``keep``, without splitting a
+        turn's prompt from its answer, and return them
+        """
+        messages = self.chat_model.messages()
+        count = len(messages) - keep
+        if count <= 0:
+            return []
+        while count < len(messages) and messages[count].turn_id is not None \
+                and messages[count].turn_id == messages[count - 1].turn_id:
+            count += 1
+        removed = self.chat_model.remove_oldest(count)
+        self.chat_delegate.forget_all(removed)
+        return removed
+
+    def prepend_messages(self, messages: List[ChatMessage]):
+        """Insert older messages above the current ones without moving the viewport"""
+        scroll_bar = self.verticalScrollBar()
+        distance_from_bottom = scroll_bar.maximum() - scroll_bar.value()
+        self.chat_model.prepend_messages(messages)
+        self.doItemsLayout()
+        scroll_bar.setValue(scroll_bar.maximum() - distance_from_bottom)
+
+    def clear(self):
+        """Remove every message and cached layout"""
+        self.chat_model.clear()
+        self.chat_delegate.clear_cache()
+
+    def scroll_to_turn(self, turn_id: int):
+        """Scroll so the prompt of a turn is at the top and select it"""
+        for row, message in enumerate(self.chat_model.messages()):
+            if message.turn_id == turn_id:
+                index = self.chat_model.index(row)
+                self.setCurrentIndex(index)
+                self.scrollTo(index, QAbstractItemView.PositionAtTop)
+                return
+
+    def scroll_to_bottom(self):
+        """Keep the newest message in view"""
+        self.scrollToBottom()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            message = self.currentIndex().data(MESSAGE_ROLE)
+            if message is not None:
+                QApplication.clipboard().setText(message.text)
+                return
+        super().keyPressEvent(event)
+
+    def _check_top(self, value: int):
+        """Ask for older messages once the user scrolls near the top"""
+        if value <= self.LOAD_THRESHOLD_PX and self.chat_model.rowCount() > 0:
+            self.older_requested.emit()
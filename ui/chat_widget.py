@@ -1,15 +1,99 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QScrollArea
-from PySide6.QtCore import Qt, Signal
-from markdown_it import MarkdownIt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QCheckBox, QLabel
+from PySide6.QtCore import Signal, QTimer
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
-from agent_worker import AgentWorker
+from agent_worker import AgentWorker, INTERACTIVE
+from context_packer import PackedContext
+from diff_apply import parse_changes
+from instrumentation import get_tracer
+from database import Database
+from response_cache import ResponseCache
+from ui.chat_view import ChatListView, ChatMessage, MESSAGE_ROLE
+from ui.markdown_renderer import MarkdownRenderer
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+
+class IncrementalMarkdown:
+    """
+    Renders a growing markdown document, re-rendering only the unfinished tail.
+
+    Everything up to the last blank line outside a fenced code block is
+    rendered once and kept; later renders only parse the text after it.
+    """
+
+    def __init__(self, md: "MarkdownIt"):
+        self.md = md
+        self.text = ""
+        self._stable_end = 0  # Offset up to which _stable_html is rendered
+        self._stable_html = ""
+
+    def append(self, chunk: str):
+        """Append newly streamed text"""
+        self.text += chunk
+
+    def render(self) -> str:
+        """Render the document, reusing the HTML of completed blocks"""
+        boundary = self._find_boundary()
+        if boundary > self._stable_end:
+            self._stable_html += self.md.render(self.text[self._stable_end:boundary])
+            self._stable_end = boundary
+        return self._stable_html + self.md.render(self.text[self._stable_end:])
+
+    def _find_boundary(self) -> int:
+        """Find the last paragraph break in the tail that is not inside a code fence"""
+        boundary = self._stable_end
+        in_fence = False
+        pos = self._stable_end
+        while True:
+            newline = self.text.find("\n", pos)
+            if newline == -1:
+                break
+            line = self.text[pos:newline]
+            if line.lstrip().startswith(("```", "~~~")):
+                in_fence = not in_fence
+            elif not line.strip() and not in_fence:
+                boundary = newline + 1
+            pos = newline + 1
+        return boundary
+
+@dataclass
+class PendingReply:
+    """Chat state for a request that has not finished yet"""
+    prompt: str
+    session_id: Optional[int]
+    message: ChatMessage
+    markdown: IncrementalMarkdown
+    cache_key: Optional[str] = None
+    streamed: bool = False
 
 class ChatWidget(QWidget):
     prompt_submitted = Signal(str)  # Emitted when user submits a prompt
+    apply_requested = Signal(object)  # Emits the answer's ChatMessage whose code changes to apply
+    revert_requested = Signal(object)  # Emits the answer's ChatMessage whose applied changes to revert
+    # Emitted from the database writer thread with the message, request ID and turn ID (None if
+    # saving failed); delivered queued on the GUI thread
+    turn_saved = Signal(object, object, object)
 
-    def __init__(self, agent_worker: AgentWorker):
+    RENDER_INTERVAL_MS = 50  # Minimum delay between re-renders of a streaming message
+    HISTORY_PAGE_SIZE = 50  # Turns loaded per scroll-up
+    MAX_SHOWN_MESSAGES = 300  # New messages push the oldest out; they load again on scroll-up
+
+    def __init__(self, agent_worker: AgentWorker, database: Optional[Database] = None,
+                 response_cache: Optional[ResponseCache] = None):
         super().__init__()
         self.agent_worker = agent_worker
+        self.database = database
+        self.response_cache = response_cache
+        self.session_id = None
+        self.context_provider: Optional[Callable[[str], PackedContext]] = None
+        self._pending: Dict[int, PendingReply] = {}
+        self._dirty = set()  # Request IDs whose streamed text has not been rendered yet
+        self._awaiting_render: Dict[str, List[Tuple[ChatMessage, str]]] = {}  # Render key -> (message, text)
+        self._oldest_turn_id = None  # Keyset cursor for loading older history
+        self._history_exhausted = True
+        self._has_changes = (None, None, False)  # (message uid, version, whether it proposes changes)
         self.setup_ui()
         self.connect_signals()
 
@@ -17,38 +101,130 @@ class ChatWidget(QWidget):
         """Initialize the chat widget UI components"""
         layout = QVBoxLayout(self)
         
-        # Chat history scroll area
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        # Chat history content widget
-        self.chat_content = QWidget()
-        self.chat_layout = QVBoxLayout(self.chat_content)
-        self.chat_layout.addStretch()
-        self.scroll_area.setWidget(self.chat_content)
+        # Finished messages are rendered in the background and cached by content
+        self.renderer = MarkdownRenderer(self.database, parent=self)
+        self.renderer.rendered.connect(self._apply_rendered)
+
+        # Chat history view, only lays out the messages on screen
+        self.chat_view = ChatListView()
+        self.chat_view.older_requested.connect(self.load_older_history)
+
+        # Apply the code changes of the selected (or latest) answer to the editor, or revert them
+        self.apply_button = QPushButton("Apply changes")
+        self.apply_button.setToolTip("Apply the diff or before/after code of the selected answer to the editor")
+        self.apply_button.clicked.connect(lambda: self._request_edit(self.apply_requested))
+        self.revert_button = QPushButton("Revert")
+        self.revert_button.setToolTip("Restore the file as it was before the selected answer was applied")
+        self.revert_button.clicked.connect(lambda: self._request_edit(self.revert_requested))
+        edit_row = QHBoxLayout()
+        edit_row.addWidget(self.apply_button)
+        edit_row.addWidget(self.revert_button)
+        edit_row.addStretch()
+        model = self.chat_view.chat_model
+        model.rowsInserted.connect(self.update_edit_buttons)
+        model.dataChanged.connect(self.update_edit_buttons)
+        model.modelReset.connect(self.update_edit_buttons)
+        self.chat_view.selectionModel().currentChanged.connect(self.update_edit_buttons)
+        self.update_edit_buttons()
         
         # Input area
         self.input_text = QTextEdit()
         self.input_text.setPlaceholderText("Type your prompt here...")
         self.input_text.setMaximumHeight(100)
         
-        # Submit button
+        # Submit and stop buttons
         self.submit_button = QPushButton("Send")
         self.submit_button.clicked.connect(self.submit_prompt)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_last_request)
+        self.skip_cache_checkbox = QCheckBox("Skip cache")
+        self.skip_cache_checkbox.setToolTip("Always ask Gemini, ignoring cached answers")
+        self.skip_cache_checkbox.setVisible(self.response_cache is not None)
+        self.attach_context_checkbox = QCheckBox("Attach code")
+        self.attach_context_checkbox.setToolTip("Send the selection and relevant project code with the prompt")
+        self.attach_context_checkbox.setChecked(True)
+        self.attach_context_checkbox.setVisible(False)
+        button_row = QHBoxLayout()
+        button_row.addWidget(self.attach_context_checkbox)
+        button_row.addWidget(self.skip_cache_checkbox)
+        button_row.addWidget(self.submit_button)
+        button_row.addWidget(self.stop_button)
+
+        # Size of the context sent with the last prompt, and cache hit-rate counters
+        self.context_label = QLabel()
+        self.context_label.setVisible(False)
+        self.cache_label = QLabel()
+        self.cache_label.setVisible(self.response_cache is not None)
         
         # Add widgets to layout
-        layout.addWidget(self.scroll_area)
+        layout.addWidget(self.chat_view)
+        layout.addLayout(edit_row)
         layout.addWidget(self.input_text)
-        layout.addWidget(self.submit_button)
+        layout.addLayout(button_row)
+        layout.addWidget(self.context_label)
+        layout.addWidget(self.cache_label)
 
-        # Initialize markdown parser
-        self.md = MarkdownIt()
+        # Coalesces streamed chunks into at most one render per interval
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(self.RENDER_INTERVAL_MS)
+        self._render_timer.timeout.connect(self._render_streams)
 
     def connect_signals(self):
         """Connect agent worker signals"""
+        self.agent_worker.request_started.connect(self.handle_started)
         self.agent_worker.response_ready.connect(self.handle_response)
+        self.agent_worker.chunk_received.connect(self.handle_chunk)
         self.agent_worker.error_occurred.connect(self.handle_error)
+        self.agent_worker.request_cancelled.connect(self.handle_cancelled)
+        self.agent_worker.request_retrying.connect(self.handle_retrying)
+        self.turn_saved.connect(self._handle_turn_saved)
+
+    def set_session(self, session_id: Optional[int]):
+        """Set the session that new prompts are recorded in and show its latest turns"""
+        self.session_id = session_id
+        self.chat_view.clear()
+        self._awaiting_render.clear()
+        self._oldest_turn_id = None
+        self._history_exhausted = self.database is None or session_id is None
+        self.load_older_history()
+        self.chat_view.scroll_to_bottom()
+
+    def load_older_history(self):
+        """Prepend the page of turns preceding the oldest one shown"""
+        if self._history_exhausted:
+            return
+        turns = self.database.get_history_page(
+            self.session_id, self._oldest_turn_id, self.HISTORY_PAGE_SIZE
+        )
+        if len(turns) < self.HISTORY_PAGE_SIZE:
+            self._history_exhausted = True
+        if not turns:
+            return
+        self._oldest_turn_id = turns[0].id
+        messages = []
+        for turn in turns:
+            messages.append(ChatMessage(turn.prompt, is_user=True, turn_id=turn.id))
+            reply = ChatMessage(turn.response, is_user=False, turn_id=turn.id)
+            self._render_markdown(reply)
+            messages.append(reply)
+        self.chat_view.prepend_messages(messages)
+
+    def show_turn(self, session_id: int, turn_id: int):
+        """Open a session and scroll to one of its turns, loading older pages as needed"""
+        if session_id != self.session_id:
+            self.set_session(session_id)
+        while not self._history_exhausted and (
+                self._oldest_turn_id is None or self._oldest_turn_id > turn_id):
+            self.load_older_history()
+        self.chat_view.scroll_to_turn(turn_id)
+
+    def set_context_provider(self, provider: Optional[Callable[[str], PackedContext]]):
+        """Set the callable that packs the code context to send with a prompt"""
+        self.context_provider = provider
+        self.attach_context_checkbox.setVisible(provider is not None)
+        self.context_label.setVisible(provider is not None)
 
     def submit_prompt(self):
         """Handle prompt submission"""
@@ -59,49 +235,237 @@ class ChatWidget(QWidget):
         # Clear input and add prompt to chat
         self.input_text.clear()
         self.add_message(prompt, is_user=True)
+
+        # Gather the code the prompt is sent with
+        context = None
+        if self.context_provider is not None and self.attach_context_checkbox.isChecked():
+            context = self.context_provider(prompt)
+            self.context_label.setText(
+                "Context: ~%d tokens from %d file%s%s" % (
+                    context.tokens, len(context.files), "" if len(context.files) == 1 else "s",
+                    ", %d chunks left out" % context.dropped if context.dropped else ""
+                )
+            )
+
+        # Answer from the cache when the prompt and its context are unchanged
+        cache_key = None
+        if self.response_cache is not None and not self.skip_cache_checkbox.isChecked():
+            cache_key = ResponseCache.make_key(prompt, context.attachments if context else [])
+            cached = self.response_cache.get(cache_key)
+            self._update_cache_label()
+            if cached is not None:
+                reply = self.add_message(cached, is_user=False)
+                self._record_turn(self.session_id, prompt, cached, reply)
+                self.prompt_submitted.emit(prompt)
+                return
+
+        # Reserve the reply bubble now so concurrent answers stay under their prompts
+        reply = self.add_message("*Queued…*", is_user=False)
         
         # Send to agent worker
-        self.agent_worker.send_prompt(prompt)
+        request_id = self.agent_worker.send_prompt(
+            context.text if context else prompt, INTERACTIVE, self.session_id
+        )
+        self._pending[request_id] = PendingReply(
+            prompt, self.session_id, reply, IncrementalMarkdown(self.renderer.md), cache_key
+        )
+        self.stop_button.setEnabled(True)
         self.prompt_submitted.emit(prompt)
 
-    def handle_response(self, response: str):
+    def stop_last_request(self):
+        """Cancel the most recently submitted request that is still pending"""
+        if self._pending:
+            self.agent_worker.cancel(max(self._pending))
+
+    def handle_started(self, request_id: int):
+        """Show that a queued request is now running"""
+        pending = self._pending.get(request_id)
+        if pending is not None and not pending.streamed:
+            self._update_message(pending.message, "*Thinking…*")
+
+    def handle_chunk(self, request_id: int, chunk: str):
+        """Append a partial response to the message being streamed for a request"""
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return
+        pending.streamed = True
+        pending.markdown.append(chunk)
+        self._dirty.add(request_id)
+        if not self._render_timer.isActive():
+            self._render_timer.start()
+
+    def handle_response(self, request_id: int, response: str):
         """Handle response from agent worker"""
-        self.add_message(response, is_user=False)
+        pending = self._take_pending(request_id)
+        if pending is None:
+            return
+
+        # Keep the streamed rendering on screen until the full one, which gets
+        # constructs split across blocks right, arrives from the renderer
+        self._update_message(pending.message, response, html=pending.markdown.render())
+        self.chat_view.scroll_to_bottom()
+        get_tracer().mark(request_id, "rendered")
 
-    def handle_error(self, error: str):
+        if pending.cache_key is not None:
+            self.response_cache.put(pending.cache_key, response)
+            self._update_cache_label()
+        self._record_turn(pending.session_id, pending.prompt, response, pending.message, request_id)
+
+    def _record_turn(self, session_id: Optional[int], prompt: str, response: str,
+                     message: ChatMessage, request_id: Optional[int] = None):
+        """Save a finished turn to its session and tag its message with the turn ID"""
+        if self.database is None or session_id is None:
+            if request_id is not None:
+                get_tracer().finish(request_id)
+            return
+
+        def saved(future):
+            # Runs on the database writer thread
+            turn_id = future.result() if future.exception() is None else None
+            self.turn_saved.emit(message, request_id, turn_id)
+
+        self.database.queue_chat_turn(session_id, prompt, response).add_done_callback(saved)
+
+    def _handle_turn_saved(self, message: ChatMessage, request_id: Optional[int], turn_id: Optional[int]):
+        """Tag a saved answer with its turn ID, which enables Revert for it"""
+        tracer = get_tracer()
+        if turn_id is None:
+            if request_id is not None:
+                tracer.discard(request_id)
+            return
+        message.turn_id = turn_id
+        if request_id is not None:
+            tracer.mark(request_id, "persisted")
+            tracer.finish(request_id, turn_id)
+        self.update_edit_buttons()
+
+    def _update_cache_label(self):
+        """Show the response cache hit rate"""
+        stats = self.response_cache.stats()
+        self.cache_label.setText(
+            "Cache: %d/%d hits (%.0f%%), %d entries, %.1f KB" % (
+                stats["hits"], stats["hits"] + stats["misses"], stats["hit_rate"] * 100,
+                stats["entries"], stats["bytes"] / 1024
+            )
+        )
+
+    def handle_error(self, request_id: int, error: str):
         """Handle error from agent worker"""
-        self.add_message(f"Error: {error}", is_user=False, is_error=True)
+        pending = self._take_pending(request_id)
+        if pending is None:
+            return
+        self._update_message(pending.message, f"Error: {error}", is_error=True)
+
+    def handle_retrying(self, request_id: int, attempt: int, delay_ms: int, error: str):
+        """Show that a failed request will be tried again"""
+        pending = self._pending.get(request_id)
+        if pending is not None:
+            self._update_message(pending.message, f"*Retrying in {delay_ms / 1000:.0f} s (attempt {attempt})…*")
+
+    def handle_cancelled(self, request_id: int):
+        """Mark a cancelled request's reply"""
+        pending = self._take_pending(request_id)
+        if pending is None:
+            return
+        self._update_message(pending.message, pending.markdown.text + "\n\n*Cancelled.*")
+
+    def _take_pending(self, request_id: int) -> Optional[PendingReply]:
+        """Stop tracking a request and return its chat state"""
+        self._dirty.discard(request_id)
+        pending = self._pending.pop(request_id, None)
+        self.stop_button.setEnabled(bool(self._pending))
+        return pending
+
+    def _render_streams(self):
+        """Re-render every streaming message that received text since the last render"""
+        for request_id in self._dirty:
+            pending = self._pending.get(request_id)
+            if pending is not None:
+                with get_tracer().span("chat.render_stream"):
+                    html = pending.markdown.render()
+                self._update_message(pending.message, pending.markdown.text, html=html, final=False)
+        self._dirty.clear()
+        self.chat_view.scroll_to_bottom()
 
-    def add_message(self, text: str, is_user: bool, is_error: bool = False):
+    def _update_message(self, message: ChatMessage, text: str,
+                        html: Optional[str] = None, is_error: bool = False, final: bool = True):
+        """
+        Replace a message's content and re-layout it. Final content is shown
+        with its cached rendering, or with ``html`` until the background
+        render arrives.
+        """
+        message.text = text
+        message.html = html
+        message.is_error = is_error
+        if final:
+            self._render_markdown(message)
+        self.chat_view.update_message(message)
+
+    def _render_markdown(self, message: ChatMessage):
+        """Set an agent message's HTML from the cache, or have it rendered in the background"""
+        if message.is_user or message.is_error:
+            return
+        key, html = self.renderer.lookup(message.text)
+        if html is not None:
+            message.html = html
+            return
+        self._awaiting_render.setdefault(key, []).append((message, message.text))
+        self.renderer.request(key, message.text)
+
+    def _apply_rendered(self, key: str, html: str):
+        """Show a background render on the messages still displaying its text"""
+        for message, text in self._awaiting_render.pop(key, ()):
+            if message.text == text and not message.is_error:
+                message.html = html
+                self.chat_view.update_message(message)
+
+    def close_renderer(self):
+        """Stop the background renderer; call before closing the database"""
+        self.renderer.close()
+
+    def target_message(self) -> Optional[ChatMessage]:
+        """The selected answer, or the latest finished one when no answer is selected"""
+        streaming = {pending.message for pending in self._pending.values()}
+        selected = self.chat_view.currentIndex().data(MESSAGE_ROLE)
+        if selected is not None and not selected.is_user and not selected.is_error and selected not in streaming:
+            return selected
+        for message in reversed(self.chat_view.chat_model.messages()):
+            if not message.is_user and not message.is_error and message not in streaming:
+                return message
+        return None
+
+    def _request_edit(self, signal):
+        message = self.target_message()
+        if message is not None:
+            signal.emit(message)
+
+    def update_edit_buttons(self, *_args):
+        """Enable Apply for answers proposing changes, and Revert for saved answers"""
+        message = self.target_message()
+        has_changes = False
+        if message is not None:
+            uid, version, has_changes = self._has_changes
+            if (uid, version) != (message.uid, message.version):
+                has_changes = bool(parse_changes(message.text))
+                self._has_changes = (message.uid, message.version, has_changes)
+        self.apply_button.setEnabled(has_changes)
+        self.revert_button.setEnabled(message is not None and message.turn_id is not None)
+
+    def add_message(self, text: str, is_user: bool, is_error: bool = False) -> ChatMessage:
         """Add a new message to the chat history"""
-        # Create message widget
-        message = QTextEdit()
-        message.setReadOnly(True)
-        
-        # Style based on message type
-        style = """
-            QTextEdit {
-                background-color: %s;
-                border-radius: 10px;
-                padding: 10px;
-                margin: 5px;
-            }
-        """ % (
-            "#e3f2fd" if is_user else  # Light blue for user
-            "#ffebee" if is_error else  # Light red for errors
-            "#f5f5f5"                   # Light gray for agent
-        )
-        message.setStyleSheet(style)
-        
-        # Convert markdown to HTML if it's an agent message
-        if not is_user:
-            html = self.md.render(text)
-            message.setHtml(html)
-        else:
-            message.setPlainText(text)
-        
-        # Add to layout and scroll to bottom
-        self.chat_layout.insertWidget(self.chat_layout.count() - 1, message)
-        self.scroll_area.verticalScrollBar().setValue(
-            self.scroll_area.verticalScrollBar().maximum()
-        )
\ No newline at end of file
+        message = ChatMessage(text, is_user, is_error)
+        self._render_markdown(message)
+        self._drop_oldest(self.MAX_SHOWN_MESSAGES - 1)
+        self.chat_view.add_message(message)
+        return message
+
+    def _drop_oldest(self, keep: int):
+        """Keep the view's layout cost bounded by unloading the oldest saved turns"""
+        removed = self.chat_view.drop_oldest(keep)
+        if not removed or self.database is None or self.session_id is None:
+            return
+        remaining = [m.turn_id for m in self.chat_view.chat_model.messages() if m.turn_id is not None]
+        if remaining:
+            # Paging resumes right above what is still shown
+            self._oldest_turn_id = min(remaining)
+            self._history_exhausted = False
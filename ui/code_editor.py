@@ -1,56 +1,38 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit, QFileDialog
 from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QTextCharFormat, QSyntaxHighlighter, QColor, QTextCursor
-import re
+from PySide6.QtGui import QTextCursor
+from functools import partial
+from typing import List
+import os
 
-class PythonHighlighter(QSyntaxHighlighter):
+from diff_apply import Edit, edit_ranges
+from instrumentation import get_tracer
+from ui.file_io import FileLoadThread, FileSaveThread
+from ui.syntax import SyntaxHighlighter, PYTHON, language_for_path
+
+class PythonHighlighter(SyntaxHighlighter):
     """Simple Python syntax highlighter"""
     
     def __init__(self, parent=None):
-        super().__init__(parent)
-        
-        self.highlight_rules = []
-        
-        # Keywords
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#FF6B68"))
-        keywords = [
-            "and", "as", "assert", "break", "class", "continue", "def",
-            "del", "elif", "else", "except", "False", "finally", "for",
-            "from", "global", "if", "import", "in", "is", "lambda", "None",
-            "nonlocal", "not", "or", "pass", "raise", "return", "True",
-            "try", "while", "with", "yield"
-        ]
-        for word in keywords:
-            pattern = re.compile(r"\b" + re.escape(word) + r"\b")
-            self.highlight_rules.append((pattern, keyword_format))
-        
-        # Strings
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#6A8759"))
-        self.highlight_rules.append((re.compile(r'".*?"'), string_format))
-        self.highlight_rules.append((re.compile(r"'.*?'") , string_format))
-        
-        # Comments
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#808080"))
-        self.highlight_rules.append((re.compile(r"#[^\n]*"), comment_format))
-
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlight_rules:
-            for m in pattern.finditer(text):
-                start = m.start()
-                length = m.end() - m.start()
-                self.setFormat(start, length, fmt)
+        super().__init__(parent, PYTHON)
 
 class CodeEditor(QWidget):
     text_changed = Signal()  # Emitted when editor content changes
     file_saved = Signal(str)  # Emitted when file is saved, passes file path
+    file_loaded = Signal(str)  # Emitted when a file has finished loading, passes file path
+
+    LARGE_FILE_BYTES = 8 * 1024 * 1024  # Larger files open read-only without highlighting
 
     def __init__(self):
         super().__init__()
-        self.setup_ui()
         self.current_file = None
+        self.read_only = False
+        self.newline = "\n"  # Line ending the current file is saved with
+        self._loader = None
+        self._saver = None
+        self._save_again = False
+        self._pending_line = None
+        self.setup_ui()
 
     def setup_ui(self):
         """Initialize the code editor UI"""
@@ -63,7 +45,7 @@ class CodeEditor(QWidget):
         layout.addWidget(self.editor)
 
         # Connect signals
-        self.editor.textChanged.connect(self.text_changed.emit)
+        self.editor.textChanged.connect(self._handle_text_changed)
 
     def setup_editor(self):
         """Configure the editor instance"""
@@ -89,31 +71,57 @@ class CodeEditor(QWidget):
         )
         
         if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.editor.setPlainText(content)
-                    self.current_file = file_path
-                    return True
-            except Exception as e:
-                print(f"Error opening file: {e}")
-                return False
+            return self.load_file(file_path)
         return False
 
+    def load_file(self, file_path: str) -> bool:
+        """Start loading a file in the background, showing its text as it arrives"""
+        try:
+            size = os.path.getsize(file_path)
+        except OSError as e:
+            print(f"Error opening file: {e}")
+            return False
+
+        self._cancel_load()
+        self._pending_line = None
+        self.current_file = file_path
+        self.read_only = size > self.LARGE_FILE_BYTES
+
+        # Pick the rule set first so the text is only highlighted once
+        self.highlighter.set_language(None if self.read_only else language_for_path(file_path))
+        self.editor.setReadOnly(True)
+        self.editor.document().setUndoRedoEnabled(False)
+        self.editor.clear()
+
+        loader = FileLoadThread(file_path, self)
+        loader.chunk_loaded.connect(self._append_chunk)
+        loader.load_finished.connect(self._finish_load)
+        loader.load_failed.connect(self._fail_load)
+        loader.finished.connect(loader.deleteLater)
+        self._loader = loader
+        loader.start()
+        return True
+
     def save_file(self):
-        """Save the current file"""
+        """Save the current file in the background"""
         if not self.current_file:
             return self.save_file_as()
-            
-        try:
-            with open(self.current_file, 'w', encoding='utf-8') as file:
-                file.write(self.editor.toPlainText())
-            self.file_saved.emit(self.current_file)
-            return True
-        except Exception as e:
-            print(f"Error saving file: {e}")
+        if self.read_only or self._loader is not None:
             return False
 
+        if self._saver is not None:
+            # Save the latest text again once the running save completes
+            self._save_again = True
+            return True
+
+        saver = FileSaveThread(self.current_file, self.editor.toPlainText(), self.newline, self)
+        saver.save_finished.connect(self._finish_save)
+        saver.save_failed.connect(self._fail_save)
+        saver.finished.connect(partial(self._saver_done, saver))
+        self._saver = saver
+        saver.start()
+        return True
+
     def save_file_as(self):
         """Save the current file with a new name"""
         file_path, _ = QFileDialog.getSaveFileName(
@@ -128,9 +136,97 @@ class CodeEditor(QWidget):
             return self.save_file()
         return False
 
+    def wait_for_io(self):
+        """Stop loading and block until pending saves are on disk"""
+        self._cancel_load()
+        while self._saver is not None:
+            saver = self._saver
+            saver.wait()
+            self._saver_done(saver)
+
+    def _handle_text_changed(self):
+        """Forward edits, but not the text streamed in while loading"""
+        if self._loader is None:
+            self.text_changed.emit()
+
+    def _from_current_loader(self) -> bool:
+        """Whether the signal being handled comes from the active loader"""
+        return self._loader is not None and self.sender() is self._loader
+
+    def _append_chunk(self, text: str):
+        """Append the next piece of a loading file"""
+        if not self._from_current_loader():
+            return
+        with get_tracer().span("editor.append_chunk"):
+            cursor = QTextCursor(self.editor.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+
+    def _finish_load(self, file_path: str):
+        if not self._from_current_loader():
+            return
+        self.newline = self._loader.newline
+        self._loader = None
+        self.editor.setReadOnly(self.read_only)
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.document().setModified(False)
+        if self._pending_line is not None:
+            line, self._pending_line = self._pending_line, None
+            self.go_to_line(line)
+        self.file_loaded.emit(file_path)
+
+    def _fail_load(self, file_path: str, error: str):
+        if not self._from_current_loader():
+            return
+        print(f"Error opening file: {error}")
+        self._loader = None
+        self._pending_line = None
+        self.current_file = None
+        self.newline = "\n"
+        self.editor.clear()
+        self.editor.setReadOnly(False)
+        self.editor.document().setUndoRedoEnabled(True)
+
+    def _cancel_load(self):
+        """Abandon a file that is still loading"""
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            loader.cancel()
+            loader.wait()
+            self.editor.setReadOnly(False)
+            self.editor.document().setUndoRedoEnabled(True)
+
+    def _finish_save(self, file_path: str):
+        self.file_saved.emit(file_path)
+
+    def _fail_save(self, file_path: str, error: str):
+        print(f"Error saving file: {error}")
+
+    def _saver_done(self, saver: FileSaveThread):
+        """Release the finished save thread and run a save requested meanwhile"""
+        if saver is not self._saver:
+            return
+        saver.deleteLater()
+        self._saver = None
+        if self._save_again:
+            self._save_again = False
+            self.save_file()
+
+    def go_to_line(self, line: int):
+        """Move the cursor to a 1-based line, once the file has finished loading"""
+        if self._loader is not None:
+            self._pending_line = line
+            return
+        block = self.editor.document().findBlockByNumber(max(0, line - 1))
+        if block.isValid():
+            self.editor.setTextCursor(QTextCursor(block))
+            self.editor.centerCursor()
+        self.editor.setFocus()
+
     def get_selected_text(self) -> str:
         """Get the currently selected text"""
-        return self.editor.textCursor().selectedText()
+        # Qt separates selected lines with U+2029
+        return self.editor.textCursor().selectedText().replace("\u2029", "\n")
 
     def get_current_line(self) -> str:
         """Get the text of the current line"""
@@ -138,14 +234,42 @@ class CodeEditor(QWidget):
         cursor.select(QTextCursor.LineUnderCursor)
         return cursor.selectedText()
 
+    def get_current_line_number(self) -> int:
+        """Get the 1-based number of the line holding the cursor"""
+        return self.editor.textCursor().blockNumber() + 1
+
     def set_text(self, text: str):
         """Set the editor's text content"""
+        self._cancel_load()
         self.editor.setPlainText(text)
 
     def insert_text(self, text: str):
         """Insert text at the current cursor position"""
         self.editor.insertPlainText(text)
 
+    def is_editable(self) -> bool:
+        """Whether the buffer can be changed now: loaded and not opened read-only"""
+        return self._loader is None and not self.read_only
+
+    def apply_edits(self, edits: List[Edit]):
+        """
+        Apply line edits as a single undo step. Only the touched blocks are
+        re-highlighted, and the cursor and scroll position are kept
+        """
+        document = self.editor.document()
+        ranges = edit_ranges(
+            edits, lambda line: document.findBlockByNumber(line).position(),
+            document.blockCount(), document.characterCount() - 1
+        )
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        # Back to front, so the positions of earlier edits stay valid
+        for start, end, replacement in reversed(ranges):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(replacement)
+        cursor.endEditBlock()
+
     def replace_selection(self, text: str):
         """Replace the current selection with new text"""
         cursor = self.editor.textCursor()
@@ -0,0 +1,71 @@
+from PySide6.QtCore import QThread, Signal
+import os
+
+from snapshot_store import atomic_write
+
+class FileLoadThread(QThread):
+    """
+    Reads a file in chunks off the GUI thread. The first chunk is small so
+    the first screen can be shown immediately; the rest streams in after it.
+    Line endings arrive as "\n"; ``newline`` is the one the file used
+    """
+    chunk_loaded = Signal(str)  # Emitted with each decoded piece of text
+    load_finished = Signal(str)  # Emitted with the file path once everything is read
+    load_failed = Signal(str, str)  # Emitted with the file path and an error message
+
+    FIRST_CHUNK = 64 * 1024  # Characters
+    CHUNK = 1024 * 1024
+
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._cancelled = False
+        self.newline = "\n"
+
+    def cancel(self):
+        """Stop reading at the next chunk boundary"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            # Universal newlines hold back a "\r" at the end of a chunk until the next one shows
+            # whether it starts a "\r\n"
+            with open(self.file_path, "r", encoding="utf-8", newline=None) as f:
+                size = self.FIRST_CHUNK
+                while not self._cancelled:
+                    text = f.read(size)
+                    if not text:
+                        break
+                    self.chunk_loaded.emit(text)
+                    size = self.CHUNK
+                # A tuple when the file mixes line endings; those are saved as "\n"
+                if isinstance(f.newlines, str):
+                    self.newline = f.newlines
+        except (OSError, UnicodeDecodeError) as e:
+            self.load_failed.emit(self.file_path, str(e))
+            return
+        if not self._cancelled:
+            self.load_finished.emit(self.file_path)
+
+class FileSaveThread(QThread):
+    """
+    Saves text atomically off the GUI thread: temp file, fsync, rename.
+    Each "\n" in the text is written as ``newline``
+    """
+    save_finished = Signal(str)  # Emitted with the file path once the file is replaced
+    save_failed = Signal(str, str)  # Emitted with the file path and an error message
+
+    def __init__(self, file_path: str, text: str, newline: str = "\n", parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.text = text
+        self.newline = newline
+
+    def run(self):
+        try:
+            text = self.text if self.newline == "\n" else self.text.replace("\n", self.newline)
+            atomic_write(os.path.abspath(self.file_path), text.encode("utf-8"))
+        except OSError as e:
+            self.save_failed.emit(self.file_path, str(e))
+            return
+        self.save_finished.emit(self.file_path)
@@ -1,41 +1,478 @@
-from PySide6.QtWidgets import QTreeView, QFileSystemModel
-from PySide6.QtCore import Qt, QDir
+from PySide6.QtWidgets import QTreeView, QFileIconProvider
+from PySide6.QtCore import (Qt, QAbstractItemModel, QFileSystemWatcher, QMimeData, QModelIndex,
+                            QThread, QUrl, Signal)
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import queue
+import sqlite3
+import time
+
+from ignore_rules import DEFAULT_EXCLUDES, IgnoreRules
+
+def list_directory(path: str, ignored: Callable[[str, bool], bool]) -> List[Tuple[str, bool]]:
+    """The (name, is_dir) entries of a directory that are not ignored, directories first, by name"""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                # Symlinked directories expand too; they are only listed on demand
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if not ignored(entry.name, is_dir):
+                entries.append((entry.name, is_dir))
+    entries.sort(key=lambda entry: (not entry[1], entry[0].casefold()))
+    return entries
+
+class ListingCache:
+    """
+    Directory listings kept across restarts. An entry is used while the
+    directory's mtime and the ignore rules that filtered it are unchanged,
+    so reopening a project shows unchanged directories without listing them.
+    """
+
+    MAX_DIRECTORIES = 20000  # The least recently used listings beyond this are dropped
+    EVICT_EVERY = 100  # Stores between eviction passes
+
+    def __init__(self, db_path: str):
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS directory_listings (
+                    path TEXT PRIMARY KEY,
+                    mtime INTEGER NOT NULL,
+                    rules TEXT NOT NULL,
+                    entries TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+        self._stores = 0
+
+    def get(self, path: str, mtime: int, rules: str) -> Optional[List[Tuple[str, bool]]]:
+        row = self._conn.execute(
+            "SELECT entries FROM directory_listings WHERE path = ? AND mtime = ? AND rules = ?",
+            (path, mtime, rules)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._conn.execute("UPDATE directory_listings SET last_used = ? WHERE path = ?", (time.time(), path))
+        return [(name, bool(is_dir)) for name, is_dir in json.loads(row[0])]
+
+    def put(self, path: str, mtime: int, rules: str, entries: List[Tuple[str, bool]]):
+        data = json.dumps([(name, int(is_dir)) for name, is_dir in entries], ensure_ascii=False)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO directory_listings (path, mtime, rules, entries, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", (path, mtime, rules, data, time.time())
+            )
+            self._stores += 1
+            if self._stores % self.EVICT_EVERY == 1:
+                self._conn.execute("""
+                    DELETE FROM directory_listings WHERE path IN (
+                        SELECT path FROM directory_listings ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.MAX_DIRECTORIES,))
+
+    def close(self):
+        self._conn.close()
+
+class _ListingThread(QThread):
+    """
+    Lists requested directories off the GUI thread, from the cache when it
+    is still valid. First listings are emitted in batches so a huge
+    directory fills in progressively instead of blocking one slot.
+    """
+    listed = Signal(int, str, list, bool)  # Generation, directory, (name, is_dir) entries, whether complete
+    failed = Signal(int, str, str)  # Generation, directory, error message
+
+    BATCH_SIZE = 2000
+
+    def __init__(self, cache_path: Optional[str], parent=None):
+        super().__init__(parent)
+        self.cache_path = cache_path
+        self.queue = queue.Queue()  # (generation, root, excludes, directory, batched) or None to stop
+        self._rules: Optional[IgnoreRules] = None
+
+    def run(self):
+        cache = None
+        if self.cache_path is not None:
+            try:
+                cache = ListingCache(self.cache_path)
+            except sqlite3.Error as e:
+                print(f"Error opening the directory listing cache: {e}")
+        while True:
+            request = self.queue.get()
+            if request is None:
+                break
+            generation, root, excludes, directory, batched = request
+            if self._rules is None or self._rules.root != root:
+                self._rules = IgnoreRules(root, excludes)
+            try:
+                entries = self._list(cache, root, directory)
+            except OSError as e:
+                self.failed.emit(generation, directory, str(e))
+                continue
+            if not batched or len(entries) <= self.BATCH_SIZE:
+                self.listed.emit(generation, directory, entries, True)
+                continue
+            for start in range(0, len(entries), self.BATCH_SIZE):
+                end = start + self.BATCH_SIZE
+                self.listed.emit(generation, directory, entries[start:end], end >= len(entries))
+        if cache is not None:
+            cache.close()
+
+    def _list(self, cache: Optional[ListingCache], root: str, directory: str) -> List[Tuple[str, bool]]:
+        relative = os.path.relpath(directory, root).replace(os.sep, "/")
+        ignored = self._rules.matcher("" if relative == "." else relative)
+        rules = self._rules.signature("" if relative == "." else relative)
+        mtime = os.stat(directory).st_mtime_ns
+        entries = None
+        if cache is not None:
+            try:
+                entries = cache.get(directory, mtime, rules)
+            except sqlite3.Error:
+                pass
+        if entries is None:
+            entries = list_directory(directory, ignored)
+            if cache is not None:
+                try:
+                    cache.put(directory, mtime, rules, entries)
+                except sqlite3.Error as e:
+                    print(f"Error caching the listing of {directory}: {e}")
+        return entries
+
+class _Node:
+    __slots__ = ("name", "path", "is_dir", "parent", "row", "children", "loading")
+
+    def __init__(self, name: str, path: str, is_dir: bool, parent: Optional["_Node"], row: int):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children: Optional[List["_Node"]] = None  # None until listed
+        self.loading = False
+
+class FileTreeModel(QAbstractItemModel):
+    """
+    Lazy tree of a project's files. A directory's children are listed by a
+    background thread the first time it is expanded, skipping what the
+    .gitignore files and the exclude list leave out, and are added to the
+    model in batches. Relisting a directory applies only the differences,
+    so expanded subdirectories stay expanded.
+    """
+    directory_loaded = Signal(str)  # Emitted with a directory's path once its listing is complete
+
+    # The view asks for flags, indexes and children of every row of an
+    # expanded directory on each layout, so these paths stay minimal;
+    # combining Qt flags is slow enough in Python to dominate otherwise
+    ITEM_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def __init__(self, cache_path: Optional[str] = None, excludes: Iterable[str] = DEFAULT_EXCLUDES, parent=None):
+        super().__init__(parent)
+        self.excludes = sorted(set(excludes))
+        self._root: Optional[_Node] = None
+        self._generation = 0
+        self._directories: Dict[str, _Node] = {}  # Listed or loading directories by path
+        icons = QFileIconProvider()
+        self._folder_icon = icons.icon(QFileIconProvider.Folder)
+        self._file_icon = icons.icon(QFileIconProvider.File)
+        self.cache_path = cache_path
+        self._thread = None  # Started with the first listing
+
+    def set_root_path(self, path: str):
+        """Show a new directory, listing its top level right away"""
+        self.beginResetModel()
+        self._generation += 1
+        path = os.path.abspath(path)
+        self._root = _Node(os.path.basename(path), path, True, None, 0)
+        self._directories = {}
+        self.endResetModel()
+        self._request(self._root)
+
+    def root_path(self) -> Optional[str]:
+        return self._root.path if self._root is not None else None
+
+    def file_path(self, index: QModelIndex) -> str:
+        node = self._node(index)
+        return node.path if node is not None else ""
+
+    def is_dir(self, index: QModelIndex) -> bool:
+        node = self._node(index)
+        return node is not None and node.is_dir
+
+    def index_for_path(self, path: str) -> QModelIndex:
+        """Index of a listed directory, invalid for the root or unlisted paths"""
+        node = self._directories.get(path)
+        if node is None or node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def refresh(self, path: str):
+        """List a directory again, e.g. after a file watcher reported a change"""
+        node = self._directories.get(path)
+        if node is not None and not node.loading:
+            self._request(node)
+
+    def close(self):
+        """Stop the listing thread"""
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.queue.put(None)
+            self._thread.wait()
+
+    # QAbstractItemModel
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        node = parent.internalPointer() if parent.isValid() else self._root
+        children = node.children if node is not None else None
+        if children is None or column or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, 0, children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        node = self._node(index)
+        if node is None or node.parent is None or node.parent is self._root:
+            return QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        node = self._node(parent) if parent.isValid() else self._root
+        if node is None or node.children is None:
+            return 0
+        return len(node.children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        node = parent.internalPointer() if parent.isValid() else self._root
+        # Unlisted directories show an expander; listing happens on expand
+        return node is not None and node.is_dir and (node.children is None or bool(node.children))
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        node = self._node(parent) if parent.isValid() else self._root
+        return node is not None and node.is_dir and node.children is None and not node.loading
+
+    def fetchMore(self, parent: QModelIndex):
+        node = self._node(parent) if parent.isValid() else self._root
+        if node is not None and node.children is None and not node.loading:
+            self._request(node)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        node = self._node(index)
+        if node is None:
+            return None
+        if role == Qt.DisplayRole:
+            return node.name
+        if role == Qt.DecorationRole:
+            return self._folder_icon if node.is_dir else self._file_icon
+        if role == Qt.ToolTipRole:
+            return node.path
+        return None
+
+    def flags(self, index: QModelIndex):
+        return self.ITEM_FLAGS if index.isValid() else Qt.NoItemFlags
+
+    def mimeTypes(self) -> List[str]:
+        return ["text/uri-list"]
+
+    def mimeData(self, indexes: List[QModelIndex]) -> QMimeData:
+        mime = QMimeData()
+        mime.setUrls([QUrl.fromLocalFile(self.file_path(index)) for index in indexes if index.isValid()])
+        return mime
+
+    # Listing
+
+    def _node(self, index: QModelIndex) -> Optional[_Node]:
+        return index.internalPointer() if index.isValid() else None
+
+    def _index(self, node: _Node) -> QModelIndex:
+        return QModelIndex() if node is self._root else self.createIndex(node.row, 0, node)
+
+    def _request(self, node: _Node):
+        if self._thread is None:
+            self._thread = _ListingThread(self.cache_path, self)
+            self._thread.listed.connect(self._listed)
+            self._thread.failed.connect(self._failed)
+            self._thread.start()
+        first = node.children is None
+        node.loading = first
+        self._directories[node.path] = node
+        self._thread.queue.put((self._generation, self._root.path, self.excludes, node.path, first))
+
+    def _listed(self, generation: int, path: str, entries: list, complete: bool):
+        node = self._directories.get(path)
+        if generation != self._generation or node is None:
+            return
+        if node.loading:
+            self._append(node, entries)
+            if complete:
+                node.loading = False
+        else:
+            self._update(node, entries)
+        if complete:
+            self.directory_loaded.emit(path)
+
+    def _failed(self, generation: int, path: str, error: str):
+        node = self._directories.get(path)
+        if generation != self._generation or node is None:
+            return
+        if node.loading:
+            node.loading = False
+            node.children = node.children or []
+        print(f"Error listing {path}: {error}")
+
+    def _make_node(self, parent: _Node, name: str, is_dir: bool, row: int) -> _Node:
+        return _Node(name, os.path.join(parent.path, name), is_dir, parent, row)
+
+    def _append(self, node: _Node, entries: List[Tuple[str, bool]]):
+        """Add one batch of a first listing"""
+        if node.children is None:
+            node.children = []
+        if not entries:
+            return
+        start = len(node.children)
+        self.beginInsertRows(self._index(node), start, start + len(entries) - 1)
+        node.children.extend(self._make_node(node, name, is_dir, row)
+                             for row, (name, is_dir) in enumerate(entries, start))
+        self.endInsertRows()
+
+    def _update(self, node: _Node, entries: List[Tuple[str, bool]]):
+        """Apply a new listing as row removals and insertions, keeping unchanged nodes"""
+        parent = self._index(node)
+        wanted = set(entries)
+        # Removals, back to front in contiguous runs
+        row = len(node.children) - 1
+        while row >= 0:
+            if (node.children[row].name, node.children[row].is_dir) in wanted:
+                row -= 1
+                continue
+            end = row
+            while row >= 0 and (node.children[row].name, node.children[row].is_dir) not in wanted:
+                row -= 1
+            self.beginRemoveRows(parent, row + 1, end)
+            for child in node.children[row + 1:end + 1]:
+                self._forget(child)
+            del node.children[row + 1:end + 1]
+            self.endRemoveRows()
+        self._renumber(node, 0)
+
+        # Insertions in contiguous runs; the kept children are already in listing order
+        row = 0
+        while row < len(entries):
+            if row < len(node.children) and (node.children[row].name, node.children[row].is_dir) == entries[row]:
+                row += 1
+                continue
+            start = row
+            present = node.children[row] if row < len(node.children) else None
+            while row < len(entries) and (present is None or (present.name, present.is_dir) != entries[row]):
+                row += 1
+            self.beginInsertRows(parent, start, row - 1)
+            node.children[start:start] = [self._make_node(node, name, is_dir, start)
+                                          for name, is_dir in entries[start:row]]
+            self._renumber(node, start)
+            self.endInsertRows()
+
+    def _renumber(self, node: _Node, start: int):
+        for row in range(start, len(node.children)):
+            node.children[row].row = row
+
+    def _forget(self, node: _Node):
+        """Drop a removed directory and everything listed below it"""
+        if node.children is None and not node.loading:
+            return
+        self._directories.pop(node.path, None)
+        for child in node.children or []:
+            self._forget(child)
 
 class FileNavigator(QTreeView):
-    def __init__(self):
+    """
+    Project file tree on a lazy, ignore-aware FileTreeModel. Only expanded
+    directories are watched for changes, at most MAX_WATCHED_DIRS of them,
+    dropping the longest-expanded first.
+    """
+
+    MAX_WATCHED_DIRS = 256  # The project indexer needs inotify watches too
+
+    def __init__(self, cache_path: Optional[str] = None, excludes: Iterable[str] = DEFAULT_EXCLUDES):
         super().__init__()
-        self.setup_model()
+        self._watched: "OrderedDict[str, None]" = OrderedDict()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        self.setup_model(cache_path, excludes)
         self.setup_view()
 
-    def setup_model(self):
-        """Initialize the file system model"""
-        self.model = QFileSystemModel()
-        self.model.setRootPath("")  # Will be set when opening a project
-        self.model.setNameFilters(["*.py", "*.md", "*.txt", "*.json"])
-        self.model.setNameFilterDisables(False)  # Hide filtered files
+    def setup_model(self, cache_path: Optional[str] = None, excludes: Iterable[str] = DEFAULT_EXCLUDES):
+        """Initialize the file tree model"""
+        self.model = FileTreeModel(cache_path, excludes, self)
+        self.model.directory_loaded.connect(self._directory_loaded)
         self.setModel(self.model)
 
     def setup_view(self):
         """Configure the tree view appearance and behavior"""
-        # Hide size, type, and date columns
         self.setHeaderHidden(True)
-        for i in range(1, 4):  # Columns 1-3
-            self.hideColumn(i)
-        
-        # Enable selection and drag-drop
+        # Lets the view lay out huge directories without measuring every row
+        self.setUniformRowHeights(True)
         self.setSelectionMode(QTreeView.SingleSelection)
         self.setDragEnabled(True)
-        self.setAcceptDrops(True)
-        self.setDropIndicatorShown(True)
+        self.expanded.connect(self._expanded)
+        self.collapsed.connect(self._collapsed)
 
     def set_root_path(self, path: str):
         """Set the root directory for the file navigator"""
-        root_index = self.model.setRootPath(path)
-        self.setRootIndex(root_index)
+        self._unwatch(list(self._watched))
+        self.model.set_root_path(path)
 
     def get_selected_path(self) -> str:
         """Get the absolute path of the selected file/directory"""
         indexes = self.selectedIndexes()
         if not indexes:
             return ""
-        return self.model.filePath(indexes[0])
\ No newline at end of file
+        return self.model.file_path(indexes[0])
+
+    def directory_changed(self, path: str):
+        """Relist a watched directory that changed on disk"""
+        if os.path.isdir(path):
+            self.model.refresh(path)
+        else:
+            self._unwatch([path])
+
+    def close_model(self):
+        """Stop watching and stop the listing thread"""
+        self._unwatch(list(self._watched))
+        self.model.close()
+
+    def _directory_loaded(self, path: str):
+        """Watch a directory once it has been listed for the root or an expanded item"""
+        if path in self._watched:
+            self._watched.move_to_end(path)
+            return
+        if path != self.model.root_path() and not self.isExpanded(self.model.index_for_path(path)):
+            return
+        if len(self._watched) >= self.MAX_WATCHED_DIRS:
+            self._unwatch([next(iter(self._watched))])
+        if self.watcher.addPath(path):
+            self._watched[path] = None
+
+    def _expanded(self, index: QModelIndex):
+        # A directory listed before may have changed while it was not watched;
+        # one not listed yet is fetched by the view and watched once loaded
+        self.model.refresh(self.model.file_path(index))
+
+    def _collapsed(self, index: QModelIndex):
+        path = self.model.file_path(index)
+        # Directories below a collapsed one are hidden too
+        prefix = path + os.sep
+        self._unwatch([watched for watched in self._watched if watched == path or watched.startswith(prefix)])
+
+    def _unwatch(self, paths: List[str]):
+        for path in paths:
+            self._watched.pop(path, None)
+        if paths:
+            self.watcher.removePaths(paths)
@@ -1,18 +1,59 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QSplitter
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QSplitter, QTabWidget
+from PySide6.QtCore import Qt, QSettings, QTimer
+from PySide6.QtGui import QShortcut, QKeySequence
+from typing import Callable, Collection, List, Optional
+import os
+import sqlite3
+import threading
 
 from ui.file_navigator import FileNavigator
 from ui.chat_widget import ChatWidget
+from ui.search_panel import SearchPanel
 from agent_worker import AgentWorker
+from database import Database
+from project_index import ProjectIndexer
+from context_packer import ContextPacker, PackedContext
+from diff_apply import Change, PatchConflict, diff_edits, parse_changes, plan_edits
+from ignore_rules import DEFAULT_EXCLUDES
+from instrumentation import StartupProfile, enable_tracing, get_tracer
+from response_cache import ResponseCache
+from retention import RetentionPolicy, apply_retention
+from snapshot_store import SnapshotStore
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    """
+    Application window. Construction only builds the widgets; opening the
+    database, pre-starting CLI processes and restoring the last project
+    wait until the window has painted once (see ``call_after_first_paint``).
+    """
+
+    RETENTION_DELAY_MS = 10000  # History retention and compaction start this long after start-up
+
+    def __init__(self, warm_pool_size: int = 0, context_budget: int = 4000, trace: bool = False,
+                 startup_profile: Optional[StartupProfile] = None):
         super().__init__()
         self.setWindowTitle("Gemini Agent Desktop")
         self.resize(1200, 800)
+        self.startup_profile = startup_profile or StartupProfile()
+        self.warm_pool_size = warm_pool_size
+        self._painted = False
+        self._after_first_paint = []
+        self.project_path = None
+        self._after_load = None  # (file path, callback) to run once that file finishes loading
+        self._retention_thread = None
+        self._retention_stop = threading.Event()
 
-        # Initialize the agent worker
+        # Initialize the agent worker and history database; the schema is
+        # created or migrated on first use
         self.agent_worker = AgentWorker()
+        self.database = Database(lazy=True)
+        self.response_cache = ResponseCache(self.database)
+        if trace:
+            enable_tracing(self.database)
+        # The project index lives next to the history database
+        index_path = os.path.join(os.path.dirname(os.path.abspath(self.database.db_path)), "project_index.db")
+        self.project_indexer = ProjectIndexer(index_path, self, excludes=self.file_excludes())
+        self.context_packer = ContextPacker(context_budget, symbol_lookup=self.files_defining)
         
         # Create the central widget and main layout
         central_widget = QWidget()
@@ -23,9 +64,14 @@ class MainWindow(QMainWindow):
         self.main_splitter = QSplitter(Qt.Horizontal)
         main_layout.addWidget(self.main_splitter)
         
-        # Add the file navigator (left panel)
-        self.file_navigator = FileNavigator()
-        self.main_splitter.addWidget(self.file_navigator)
+        # Add the file navigator and history search (left panel)
+        self.left_tabs = QTabWidget()
+        # Directory listings are cached next to the project index
+        self.file_navigator = FileNavigator(index_path, self.file_excludes())
+        self.left_tabs.addTab(self.file_navigator, "Files")
+        self.search_panel = SearchPanel(self.database)
+        self.left_tabs.addTab(self.search_panel, "Search")
+        self.main_splitter.addWidget(self.left_tabs)
         
         # Create a second splitter for editor and chat
         self.editor_chat_splitter = QSplitter(Qt.Horizontal)
@@ -39,23 +85,312 @@ class MainWindow(QMainWindow):
         # Connect editor signals
         self.code_editor.text_changed.connect(self.handle_editor_change)
         self.code_editor.file_saved.connect(self.handle_file_saved)
+        self.code_editor.file_loaded.connect(self._file_loaded)
         
         # Add chat widget (right panel)
-        self.chat_widget = ChatWidget(self.agent_worker)
+        self.chat_widget = ChatWidget(self.agent_worker, self.database, self.response_cache)
+        self.chat_widget.set_context_provider(self.build_context)
         self.editor_chat_splitter.addWidget(self.chat_widget)
+        self.search_panel.result_activated.connect(self.chat_widget.show_turn)
+        self.chat_widget.apply_requested.connect(self.apply_changes)
+        self.chat_widget.revert_requested.connect(self.revert_changes)
+        self.chat_widget.renderer.cache_failed.connect(lambda error: self.statusBar().showMessage(error, 10000))
         
+        # Quick-open palette for files (Ctrl+P) and symbols (Ctrl+Shift+O)
+        self.quick_open = None
+        QShortcut(QKeySequence("Ctrl+P"), self, activated=self.show_quick_open)
+        QShortcut(QKeySequence("Ctrl+Shift+O"), self, activated=lambda: self.show_quick_open(symbols=True))
+
+        # Latency and stall stats (Ctrl+Shift+I), only while tracing
+        self.stats_dialog = None
+        if get_tracer().enabled:
+            QShortcut(QKeySequence("Ctrl+Shift+I"), self, activated=self.show_stats)
+
         # Set initial splitter sizes (ratios: 1:2:1)
         self.main_splitter.setSizes([200, 800])
         self.editor_chat_splitter.setSizes([500, 300])
 
-    def open_project(self, project_path: str):
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.startup_profile.mark("first paint")
+            # Let this frame reach the screen before doing deferred work
+            QTimer.singleShot(0, self._finish_startup)
+
+    def call_after_first_paint(self, callback: Callable[[], None]):
+        """Run a callback once the window has been shown, or soon if it already has"""
+        if self._after_first_paint is None:
+            QTimer.singleShot(0, callback)
+        else:
+            self._after_first_paint.append(callback)
+
+    def _finish_startup(self):
+        """Start-up work deferred until after the first frame"""
+        self.agent_worker.start_warm_pool(self.warm_pool_size)
+        callbacks, self._after_first_paint = self._after_first_paint, None
+        for callback in callbacks:
+            callback()
+        QTimer.singleShot(self.RETENTION_DELAY_MS, self._start_retention)
+
+    def file_excludes(self) -> List[str]:
+        """
+        Names and globs the file tree and project index leave out besides
+        .gitignore patterns: the files/exclude setting, or DEFAULT_EXCLUDES
+        """
+        excludes = QSettings().value("files/exclude")
+        if excludes is None:
+            return sorted(DEFAULT_EXCLUDES)
+        # A one-item list reads back as a plain string
+        return [excludes] if isinstance(excludes, str) else list(excludes)
+
+    def retention_policy(self) -> RetentionPolicy:
         """
-        Opens a project directory and initializes the UI components
+        History limits from the settings retention/max_age_days,
+        retention/max_sessions_per_project and retention/max_mb; with none
+        set, nothing is deleted and retention only compacts the database
         """
+        settings = QSettings()
+
+        def number(key: str, kind):
+            try:
+                return kind(settings.value("retention/" + key))
+            except (TypeError, ValueError):
+                return None
+
+        max_mb = number("max_mb", float)
+        return RetentionPolicy(number("max_age_days", float), number("max_sessions_per_project", int),
+                               int(max_mb * 1024 * 1024) if max_mb is not None else None)
+
+    def _start_retention(self):
+        """Apply the retention policy and compact the history database on a background thread"""
+        if self._retention_thread is not None or self._retention_stop.is_set():
+            return
+        keep = {self.chat_widget.session_id} - {None}
+        self._retention_thread = threading.Thread(
+            target=self._run_retention, args=(self.retention_policy(), keep), name="retention", daemon=True
+        )
+        self._retention_thread.start()
+
+    def _run_retention(self, policy: RetentionPolicy, keep: Collection[int]):
+        try:
+            report = apply_retention(self.database, policy, keep, should_stop=self._retention_stop.is_set)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error applying history retention: {e}")
+            return
+        if report.sessions_deleted or report.reclaimed > 0:
+            print(report.summary())
+
+    def open_project(self, project_path: str, session_id: Optional[int] = None):
+        """
+        Opens a project directory and initializes the UI components.
+        Continues ``session_id`` if given, otherwise starts a new session.
+        """
+        self.project_path = project_path
         self.file_navigator.set_root_path(project_path)
-        # TODO: Initialize database session
+        self.project_indexer.open_project(project_path)
+        self.context_packer.set_project(project_path)
+        # Requests already in flight keep reporting to the session they were sent from
+        if session_id is None:
+            session_id = self.database.create_session(project_path)
+        self.chat_widget.set_session(session_id)
+        self.search_panel.set_scope(project_path, session_id)
+        settings = QSettings()
+        settings.setValue("last_project", project_path)
+        settings.setValue("last_session", session_id)
         # TODO: Load recent files in editor
 
+    def restore_last_project(self) -> bool:
+        """Reopen the project and session used last, if they still exist"""
+        settings = QSettings()
+        project_path = settings.value("last_project")
+        if not project_path or not os.path.isdir(project_path):
+            return False
+        try:
+            session_id = int(settings.value("last_session"))
+        except (TypeError, ValueError):
+            session_id = None
+        if session_id is not None and self.database.get_session_project(session_id) != project_path:
+            session_id = None
+        self.open_project(project_path, session_id)
+        return True
+
+    def show_quick_open(self, symbols: bool = False):
+        """Open the quick-open palette, creating it on first use"""
+        if self.quick_open is None:
+            from ui.quick_open import QuickOpenDialog
+            self.quick_open = QuickOpenDialog(self.project_indexer, self)
+            self.quick_open.location_selected.connect(self.open_location)
+        self.quick_open.open_palette(self.quick_open.SYMBOL_PREFIX if symbols else "")
+
+    def open_location(self, file_path: str, line: int):
+        """Open a file from the quick-open palette at a line"""
+        if self.code_editor.load_file(file_path):
+            self.code_editor.go_to_line(line)
+
+    def apply_changes(self, message, open_target: bool = True):
+        """
+        Apply the diff or before/after blocks of an answer to the editor as
+        one undo step, after snapshotting the buffer so the turn can be reverted
+        """
+        changes = parse_changes(message.text)
+        if not changes:
+            self.statusBar().showMessage("This answer contains no diff or before/after code to apply", 5000)
+            return
+        editor = self.code_editor
+        change = self._change_for_current_file(changes)
+        if change is None and open_target:
+            # The answer edits another file: open it, then apply
+            for candidate in changes:
+                path = self._resolve_path(candidate.path)
+                if path is not None and os.path.isfile(path) and editor.load_file(path):
+                    self._after_load = (path, lambda: self.apply_changes(message, open_target=False))
+                    return
+        if change is None:
+            self.statusBar().showMessage("Open the file this answer changes to apply it", 5000)
+            return
+        if not editor.is_editable():
+            self.statusBar().showMessage("The file is still loading or is read-only", 5000)
+            return
+
+        text = editor.editor.toPlainText()
+        try:
+            edits = plan_edits(text, change)
+        except PatchConflict as e:
+            self.statusBar().showMessage(self._describe_conflict(change, e), 10000)
+            return
+        if not edits:
+            self.statusBar().showMessage("The changes are already in the file", 5000)
+            return
+
+        try:
+            ref = self._snapshot_store().store(text.encode("utf-8"))
+        except OSError as e:
+            print(f"Error saving snapshot: {e}")
+            return
+        if message.turn_id is not None:
+            self.database.set_turn_snapshot(message.turn_id, os.path.abspath(editor.current_file), ref)
+        editor.apply_edits(edits)
+        self.chat_widget.update_edit_buttons()
+        self.statusBar().showMessage(
+            "Applied %d edit%s to %s; Ctrl+Z undoes them" % (
+                len(edits), "" if len(edits) == 1 else "s", os.path.basename(editor.current_file)
+            ), 5000
+        )
+
+    def revert_changes(self, message):
+        """Restore the file an answer was applied to from the snapshot taken before"""
+        snapshot = self.database.get_turn_snapshot(message.turn_id) if message.turn_id is not None else None
+        if snapshot is None:
+            self.statusBar().showMessage("No applied change to revert for this answer", 5000)
+            return
+        path, ref = snapshot
+        editor = self.code_editor
+        if editor.current_file is None or os.path.abspath(editor.current_file) != path:
+            if os.path.isfile(path) and editor.load_file(path):
+                self._after_load = (path, lambda: self.revert_changes(message))
+            return
+        if not editor.is_editable():
+            return
+        try:
+            original = self._snapshot_store().load(ref).decode("utf-8", errors="replace")
+        except (OSError, ValueError) as e:
+            print(f"Error loading snapshot: {e}")
+            return
+        # Only the lines that differ are replaced, again as one undo step
+        editor.apply_edits(diff_edits(editor.editor.toPlainText(), original))
+        self.statusBar().showMessage("Reverted %s; Ctrl+Z redoes the change" % os.path.basename(path), 5000)
+
+    def _change_for_current_file(self, changes: List[Change]) -> Optional[Change]:
+        """The change for the open file; one naming no known file applies to it too"""
+        current = self.code_editor.current_file
+        if current is None:
+            return None
+        current = os.path.abspath(current)
+        for change in changes:
+            if self._resolve_path(change.path) == current:
+                return change
+        for change in changes:
+            path = self._resolve_path(change.path)
+            if path is None or not os.path.exists(path):
+                if change.path is None or os.path.basename(change.path) == os.path.basename(current):
+                    return change
+        return None
+
+    def _describe_conflict(self, change: Change, error: PatchConflict) -> str:
+        """Explain a conflict, pointing out when unsaved edits are the cause"""
+        editor = self.code_editor
+        if editor.editor.document().isModified():
+            try:
+                with open(editor.current_file, encoding="utf-8", errors="replace") as f:
+                    plan_edits(f.read(), change)
+            except (OSError, PatchConflict):
+                pass
+            else:
+                return "The change conflicts with unsaved edits; save or undo them first"
+        return f"Cannot apply the change: {error}"
+
+    def _resolve_path(self, path: Optional[str]) -> Optional[str]:
+        """Absolute path of a file named in an answer, relative to the project"""
+        if not path:
+            return None
+        if not os.path.isabs(path) and self.project_path:
+            path = os.path.join(self.project_path, path)
+        return os.path.abspath(path)
+
+    def _snapshot_store(self) -> SnapshotStore:
+        root = self.project_path or os.path.dirname(os.path.abspath(self.code_editor.current_file))
+        return SnapshotStore(os.path.join(root, ".gemini-versions"))
+
+    def _file_loaded(self, file_path: str):
+        """Run the action that was waiting for this file to open"""
+        if self._after_load is not None and self._after_load[0] == os.path.abspath(file_path):
+            _, callback = self._after_load
+            self._after_load = None
+            callback()
+
+    def show_stats(self):
+        """Open the performance stats view"""
+        if self.stats_dialog is None:
+            from ui.stats_dialog import StatsDialog
+            self.stats_dialog = StatsDialog(get_tracer(), self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+    def build_context(self, prompt: str) -> PackedContext:
+        """Pack the selection, the open file and related project code for a prompt"""
+        editor = self.code_editor
+        if not editor.current_file:
+            return self.context_packer.pack(prompt, selection=editor.get_selected_text())
+        return self.context_packer.pack(
+            prompt, editor.current_file, editor.editor.toPlainText(),
+            editor.get_selected_text(), editor.get_current_line_number()
+        )
+
+    def files_defining(self, name: str):
+        """Absolute paths of indexed files with a top-level symbol of this name"""
+        index = self.project_indexer.index
+        if index is None:
+            return []
+        return [index.absolute_path(symbol.path) for symbol in index.search_symbols(name, 5)
+                if symbol.name.lower() == name.lower()]
+
+    def closeEvent(self, event):
+        """Stop CLI processes and write out queued history before closing"""
+        self.agent_worker.shutdown()
+        self.code_editor.wait_for_io()
+        self.project_indexer.close()
+        self.file_navigator.close_model()
+        self.chat_widget.close_renderer()
+        self._retention_stop.set()
+        if self._retention_thread is not None:
+            # It stops between batches, which are short
+            self._retention_thread.join()
+        self.response_cache.flush()
+        self.database.close()
+        get_tracer().stop()
+        super().closeEvent(event)
+
     def handle_editor_change(self):
         """Handle changes in the code editor"""
         # Update window title to indicate unsaved changes if a file is open
@@ -66,4 +401,5 @@ class MainWindow(QMainWindow):
         """Handle file save events"""
         # Update window title to show the saved file
         self.setWindowTitle(f"Gemini Agent Desktop - {file_path}")
+        self.project_indexer.path_changed(file_path)
         # Future: refresh file navigator or update session state
\ No newline at end of file
@@ -0,0 +1,216 @@
+from PySide6.QtCore import QObject, QThread, Signal
+from collections import OrderedDict
+from html import escape
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import hashlib
+import queue
+import threading
+
+from database import Database
+from instrumentation import get_tracer
+from ui.syntax import THEME, language_by_name, scan_line
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+
+# Bump when the generated HTML changes so persisted renders are not reused
+RENDERER_VERSION = 1
+
+class _CodeCache:
+    """Thread-safe LRU of highlighted fenced code blocks"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: tuple, html: str):
+        with self._lock:
+            self._entries[key] = html
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_code_cache = _CodeCache(500)
+
+def highlight_code(code: str, lang: str, _attrs=None) -> str:
+    """
+    HTML for a fenced code block's content with coloured tokens, or "" to
+    let markdown-it escape it as plain text. Results are cached, so a block
+    is only highlighted once however often its message is rendered.
+    """
+    rules = language_by_name(lang) if lang else None
+    if rules is None:
+        return ""
+    key = (rules.name, code)
+    html = _code_cache.get(key)
+    if html is not None:
+        return html
+
+    parts = []
+    state = 0
+    for line in code.split("\n"):
+        spans, state = scan_line(rules, line, state)
+        pos = 0
+        for start, length, token in spans:
+            parts.append(escape(line[pos:start]))
+            parts.append('<span style="color:%s">%s</span>' % (THEME[token], escape(line[start:start + length])))
+            pos = start + length
+        parts.append(escape(line[pos:]))
+        parts.append("\n")
+    html = "".join(parts[:-1])
+    _code_cache.put(key, html)
+    return html
+
+def make_markdown() -> "MarkdownIt":
+    """Markdown parser with syntax-highlighted fenced code blocks"""
+    # Imported on first use to keep markdown-it off the start-up path
+    from markdown_it import MarkdownIt
+    return MarkdownIt("commonmark", {"highlight": highlight_code})
+
+def render_key(text: str) -> str:
+    """Cache key of a markdown text's rendering"""
+    return hashlib.sha256(b"%d\0%s" % (RENDERER_VERSION, text.encode("utf-8"))).hexdigest()
+
+class _RenderThread(QThread):
+    """
+    Renders queued markdown off the GUI thread. Each batch is first looked
+    up in the database; only the misses are parsed, then stored.
+    """
+    rendered = Signal(list)  # Emitted with a batch of (key, html) pairs
+    failed = Signal(str)  # Emitted with an error message when the stored renders cannot be used
+
+    BATCH_SIZE = 50
+    EVICT_EVERY = 20  # Stored batches between eviction passes
+
+    def __init__(self, database: Optional[Database], max_stored_bytes: int, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.max_stored_bytes = max_stored_bytes
+        self.queue = queue.Queue()
+        self._stores = 0
+
+    def run(self):
+        md = make_markdown()
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            items = [item for item in batch if item is not None]
+            if items:
+                self.rendered.emit(self._render(md, items))
+            if stopping:
+                if self.database is not None:
+                    self.database.close_thread_connection()
+                return
+
+    def _render(self, md: "MarkdownIt", items: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        stored = {}
+        if self.database is not None:
+            try:
+                stored = self.database.get_rendered_html([key for key, _ in items])
+            except Exception as e:
+                self.failed.emit(f"Error reading rendered markdown: {e}")
+
+        results = []
+        fresh = []
+        for key, text in items:
+            html = stored.get(key)
+            if html is None:
+                with get_tracer().span("chat.render_markdown"):
+                    html = md.render(text)
+                fresh.append((key, html))
+            results.append((key, html))
+
+        if fresh and self.database is not None:
+            try:
+                self.database.store_rendered_html(fresh)
+                self._stores += 1
+                if self._stores % self.EVICT_EVERY == 1:
+                    self.database.evict_rendered_html(self.max_stored_bytes)
+            except Exception as e:
+                self.failed.emit(f"Error storing rendered markdown: {e}")
+        return results
+
+class MarkdownRenderer(QObject):
+    """
+    Turns agent messages into HTML without parsing on the GUI thread.
+
+    Renders are kept in an in-memory LRU keyed by a hash of the text and,
+    when a database is given, persisted so reopened sessions are not
+    parsed again. Misses are rendered by a worker thread, and ``rendered``
+    is emitted on the GUI thread once each one is ready. The parser and the
+    thread are only created when first needed.
+    """
+    rendered = Signal(str, str)  # Emitted with the render key and its HTML
+    cache_failed = Signal(str)  # Emitted with an error message when stored renders cannot be read or saved
+
+    MAX_CACHED = 1000  # Renders kept in memory
+    SYNC_RENDER_CHARS = 200  # Texts this short, e.g. status lines, are rendered inline
+
+    def __init__(self, database: Optional[Database] = None, max_stored_bytes: int = 50 * 1024 * 1024,
+                 parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.max_stored_bytes = max_stored_bytes
+        self._md = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight = set()
+        self._thread = None
+
+    @property
+    def md(self) -> "MarkdownIt":
+        """Parser for rendering on the GUI thread, e.g. streaming replies"""
+        if self._md is None:
+            self._md = make_markdown()
+        return self._md
+
+    def lookup(self, text: str) -> Tuple[str, Optional[str]]:
+        """Return a text's render key and its HTML if available without waiting"""
+        key = render_key(text)
+        html = self._cache.get(key)
+        if html is not None:
+            self._cache.move_to_end(key)
+        elif len(text) <= self.SYNC_RENDER_CHARS:
+            html = self.md.render(text)
+            self._remember(key, html)
+        return key, html
+
+    def request(self, key: str, text: str):
+        """Queue a text for rendering in the background; ``rendered`` follows"""
+        if key in self._in_flight:
+            return
+        if self._thread is None:
+            self._thread = _RenderThread(self.database, self.max_stored_bytes, self)
+            self._thread.rendered.connect(self._store)
+            self._thread.failed.connect(self.cache_failed)
+            self._thread.start()
+        self._in_flight.add(key)
+        self._thread.queue.put((key, text))
+
+    def close(self):
+        """Finish queued renders and stop the worker thread"""
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.queue.put(None)
+            self._thread.wait()
+
+    def _store(self, results: List[Tuple[str, str]]):
+        for key, html in results:
+            self._in_flight.discard(key)
+            self._remember(key, html)
+            self.rendered.emit(key, html)
+
+    def _remember(self, key: str, html: str):
+        self._cache[key] = html
+        if len(self._cache) > self.MAX_CACHED:
+            self._cache.popitem(last=False)
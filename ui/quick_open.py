@@ -0,0 +1,90 @@
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+from PySide6.QtCore import Qt, Signal
+
+from project_index import ProjectIndexer
+
+class QuickOpenDialog(QDialog):
+    """
+    Quick-open palette: fuzzy file search, or symbol search when the query
+    starts with "@". Results are refreshed on every keystroke.
+    """
+    location_selected = Signal(str, int)  # Emits absolute file path, 1-based line
+
+    SYMBOL_PREFIX = "@"
+    MAX_RESULTS = 50
+
+    def __init__(self, indexer: ProjectIndexer, parent=None):
+        super().__init__(parent)
+        self.indexer = indexer
+        self.setWindowTitle("Go to File or Symbol")
+        self.resize(600, 400)
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Initialize the palette UI components"""
+        layout = QVBoxLayout(self)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("File name, or @symbol")
+        self.query_input.textChanged.connect(self.update_results)
+        self.query_input.returnPressed.connect(self._accept_current)
+        self.query_input.installEventFilter(self)
+
+        self.results = QListWidget()
+        self.results.itemActivated.connect(self._activate)
+
+        self.status_label = QLabel()
+
+        layout.addWidget(self.query_input)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
+
+    def open_palette(self, query: str = ""):
+        """Show the palette with an initial query"""
+        self.query_input.setText(query)
+        self.query_input.selectAll()
+        self.update_results()
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.query_input.setFocus()
+
+    def update_results(self):
+        """Re-run the query against the project index"""
+        self.results.clear()
+        query = self.query_input.text()
+        if query.startswith(self.SYMBOL_PREFIX):
+            for symbol in self.indexer.search_symbols(query[1:], self.MAX_RESULTS):
+                self._add_result("%s  —  %s:%d" % (symbol.name, symbol.path, symbol.line),
+                                 symbol.path, symbol.line)
+        else:
+            for path in self.indexer.search_files(query, self.MAX_RESULTS):
+                self._add_result(path, path, 1)
+
+        index = self.indexer.index
+        self.status_label.setText("%d files indexed" % len(index) if index is not None else "No project open")
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def eventFilter(self, watched, event):
+        # Let the arrow keys move through the results while typing
+        if watched is self.query_input and event.type() == event.Type.KeyPress:
+            if event.key() in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+                self.results.keyPressEvent(event)
+                return True
+        return super().eventFilter(watched, event)
+
+    def _add_result(self, text: str, path: str, line: int):
+        item = QListWidgetItem(text)
+        item.setData(Qt.UserRole, (path, line))
+        self.results.addItem(item)
+
+    def _accept_current(self):
+        item = self.results.currentItem()
+        if item is not None:
+            self._activate(item)
+
+    def _activate(self, item: QListWidgetItem):
+        path, line = item.data(Qt.UserRole)
+        self.hide()
+        self.location_selected.emit(self.indexer.index.absolute_path(path), line)
@@ -0,0 +1,140 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QComboBox, QListWidget, QListWidgetItem, QLabel
+from PySide6.QtCore import Qt, Signal, QTimer
+from html import escape
+from typing import Optional
+
+from database import Database
+
+# Control characters cannot occur in chat text, so they are safe snippet markers
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+class SearchPanel(QWidget):
+    """
+    Searches all chat history as you type, loading more results on scroll
+    """
+    result_activated = Signal(int, int)  # Emits session_id, turn_id
+
+    DEBOUNCE_MS = 150
+    PAGE_SIZE = 30
+
+    SCOPE_ALL, SCOPE_PROJECT, SCOPE_SESSION = range(3)
+
+    def __init__(self, database: Database):
+        super().__init__()
+        self.database = database
+        self.project_path = None
+        self.session_id = None
+        self._offset = 0
+        self._exhausted = True
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Initialize the search panel UI components"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Search chat history...")
+        self.query_input.setClearButtonEnabled(True)
+
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItems(["All projects", "This project", "This session"])
+
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.results.setTextElideMode(Qt.ElideNone)
+        self.results.itemActivated.connect(self._activate)
+        self.results.verticalScrollBar().valueChanged.connect(self._check_bottom)
+
+        self.status_label = QLabel()
+        self._availability_checked = False
+
+        layout.addWidget(self.query_input)
+        layout.addWidget(self.scope_combo)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
+
+        # Re-query once typing pauses rather than on every keystroke
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.run_search)
+        self.query_input.textChanged.connect(self._debounce.start)
+        self.scope_combo.currentIndexChanged.connect(self.run_search)
+
+    def showEvent(self, event):
+        # Checked on first show rather than at construction, which would open
+        # the database during start-up
+        if not self._availability_checked:
+            self._availability_checked = True
+            if not self.database.search_available:
+                self.status_label.setText("Search needs SQLite with FTS5")
+                self.query_input.setEnabled(False)
+        super().showEvent(event)
+
+    def set_scope(self, project_path: Optional[str], session_id: Optional[int]):
+        """Set the project and session used by the narrower search scopes"""
+        self.project_path = project_path
+        self.session_id = session_id
+        if self.scope_combo.currentIndex() != self.SCOPE_ALL:
+            self.run_search()
+
+    def run_search(self):
+        """Start a new search from the first page"""
+        self.results.clear()
+        self._offset = 0
+        self._exhausted = False
+        self._load_page()
+
+    def _load_page(self):
+        """Append the next page of results"""
+        if self._exhausted:
+            return
+        scope = self.scope_combo.currentIndex()
+        hits = self.database.search_history(
+            self.query_input.text(),
+            session_id=self.session_id if scope == self.SCOPE_SESSION else None,
+            project_path=self.project_path if scope == self.SCOPE_PROJECT else None,
+            limit=self.PAGE_SIZE,
+            offset=self._offset,
+            highlight=(_MARK_START, _MARK_END),
+        )
+        self._offset += len(hits)
+        self._exhausted = len(hits) < self.PAGE_SIZE
+
+        for hit in hits:
+            label = QLabel(
+                "<small>%s &middot; %s</small><br><b>Q:</b> %s<br>%s" % (
+                    escape(hit.project_path), hit.timestamp.strftime("%Y-%m-%d %H:%M"),
+                    self._highlight(hit.prompt_snippet), self._highlight(hit.response_snippet)
+                )
+            )
+            label.setWordWrap(True)
+            label.setTextFormat(Qt.RichText)
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, (hit.session_id, hit.turn_id))
+            item.setSizeHint(label.sizeHint())
+            self.results.addItem(item)
+            self.results.setItemWidget(item, label)
+
+        if self.query_input.text().strip():
+            self.status_label.setText(
+                "%d result%s%s" % (self._offset, "" if self._offset == 1 else "s",
+                                   "" if self._exhausted else "+")
+            )
+        else:
+            self.status_label.clear()
+
+    @staticmethod
+    def _highlight(snippet: str) -> str:
+        """Escape a snippet and turn its match markers into bold text"""
+        return escape(snippet).replace(_MARK_START, "<b>").replace(_MARK_END, "</b>")
+
+    def _check_bottom(self, value: int):
+        """Load the next page when the results are scrolled to the end"""
+        if value >= self.results.verticalScrollBar().maximum():
+            self._load_page()
+
+    def _activate(self, item: QListWidgetItem):
+        session_id, turn_id = item.data(Qt.UserRole)
+        self.result_activated.emit(session_id, turn_id)
@@ -0,0 +1,113 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                               QListWidget, QListWidgetItem, QPlainTextEdit, QPushButton, QLabel,
+                               QFileDialog, QSplitter, QHeaderView)
+from PySide6.QtCore import Qt, QTimer
+from datetime import datetime
+
+from instrumentation import Tracer
+
+class StatsDialog(QDialog):
+    """
+    Live view of the tracer's latency histograms and recorded event-loop
+    stalls, with export to JSON or CSV
+    """
+
+    REFRESH_MS = 1000
+    COLUMNS = ("Name", "Count", "Mean ms", "p50 ms", "p95 ms", "p99 ms", "Max ms")
+
+    def __init__(self, tracer: Tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.setWindowTitle("Performance Stats")
+        self.resize(800, 600)
+        self.setup_ui()
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(self.REFRESH_MS)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+    def setup_ui(self):
+        """Initialize the stats dialog UI components"""
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+
+        # Stalls on the left, the stack sampled during the selected one on the right
+        self.stall_list = QListWidget()
+        self.stall_list.currentItemChanged.connect(self._show_stack)
+        self.stack_view = QPlainTextEdit()
+        self.stack_view.setReadOnly(True)
+        self.stack_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        stall_splitter = QSplitter(Qt.Horizontal)
+        stall_splitter.addWidget(self.stall_list)
+        stall_splitter.addWidget(self.stack_view)
+        stall_splitter.setSizes([250, 550])
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(stall_splitter)
+        layout.addWidget(splitter)
+
+        buttons = QHBoxLayout()
+        self.status_label = QLabel()
+        export_json = QPushButton("Export JSON...")
+        export_json.clicked.connect(lambda: self._export("JSON (*.json)", self.tracer.export_json))
+        export_csv = QPushButton("Export CSV...")
+        export_csv.clicked.connect(lambda: self._export("CSV (*.csv)", self.tracer.export_csv))
+        buttons.addWidget(self.status_label)
+        buttons.addStretch()
+        buttons.addWidget(export_json)
+        buttons.addWidget(export_csv)
+        layout.addLayout(buttons)
+
+    def showEvent(self, event):
+        self.refresh()
+        self._refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        """Reload histograms and stalls from the tracer"""
+        snapshot = self.tracer.snapshot()
+        histograms = snapshot["histograms"]
+        self.table.setRowCount(len(histograms))
+        for row, (name, h) in enumerate(histograms.items()):
+            values = [name, h["count"], h["mean_ms"], h["p50_ms"], h["p95_ms"], h["p99_ms"], h["max_ms"]]
+            for column, value in enumerate(values):
+                text = "%.1f" % value if isinstance(value, float) else str(value)
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        # Newest first; a stall's duration is final only once the event loop runs again
+        stalls = list(reversed(snapshot["stalls"]))
+        if len(stalls) != self.stall_list.count():
+            self.stall_list.clear()
+            for _ in stalls:
+                self.stall_list.addItem(QListWidgetItem())
+        for row, stall in enumerate(stalls):
+            item = self.stall_list.item(row)
+            item.setText("%s  %.0f ms" % (
+                datetime.fromtimestamp(stall["started_at"]).strftime("%H:%M:%S"), stall["duration_ms"]
+            ))
+            item.setData(Qt.UserRole, stall["stack"])
+        self.status_label.setText("%d stalls recorded" % len(stalls))
+
+    def _show_stack(self, item: QListWidgetItem, _previous=None):
+        self.stack_view.setPlainText(item.data(Qt.UserRole) if item is not None else "")
+
+    def _export(self, file_filter: str, export):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Stats", "", file_filter)
+        if path:
+            try:
+                export(path)
+            except OSError as e:
+                print(f"Error exporting stats: {e}")
@@ -0,0 +1,178 @@
+from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import re
+
+from instrumentation import get_tracer
+
+# Token type -> foreground colour
+THEME = {
+    "keyword": "#FF6B68",
+    "string": "#6A8759",
+    "comment": "#808080",
+    "number": "#6897BB",
+}
+
+@dataclass
+class MultilineRule:
+    """A construct that can span lines, e.g. a triple-quoted string"""
+    token: str
+    start: str  # Regex source for the opening delimiter
+    end: str  # Regex source matching from just after the opening up to the closing delimiter
+
+@dataclass(eq=False)
+class LanguageRules:
+    """
+    Highlighting rules for one language, compiled into a single alternation
+    so each line is scanned once. Compiled on first use, so defining and
+    registering languages costs nothing at start-up
+    """
+    name: str
+    extensions: Tuple[str, ...]
+    patterns: List[Tuple[str, str]]  # (token type, regex source), earlier wins on ties
+    keywords: List[str] = field(default_factory=list)
+    multiline: List[MultilineRule] = field(default_factory=list)
+
+    @cached_property
+    def pattern(self) -> "re.Pattern":
+        parts = ["(?P<ml%d>%s)" % (i, rule.start) for i, rule in enumerate(self.multiline)]
+        parts += ["(?P<%s>%s)" % (token, source) for token, source in self.patterns]
+        if self.keywords:
+            parts.append(r"(?P<keyword>\b(?:%s)\b)" % "|".join(map(re.escape, self.keywords)))
+        return re.compile("|".join(parts))
+
+    @cached_property
+    def end_patterns(self) -> List["re.Pattern"]:
+        return [re.compile(rule.end) for rule in self.multiline]
+
+def scan_line(rules: LanguageRules, text: str, state: int = 0) -> Tuple[List[Tuple[int, int, str]], int]:
+    """
+    Tokenize one line in a single pass.
+
+    ``state`` is 0 outside multi-line constructs, or 1 + the index of the
+    MultilineRule the previous line ended inside. Returns the
+    (start, length, token) spans and the state to carry to the next line.
+    """
+    spans = []
+    pos = 0
+    if state > 0:
+        rule = rules.multiline[state - 1]
+        end = rules.end_patterns[state - 1].match(text)
+        if end is None:
+            return [(0, len(text), rule.token)] if text else [], state
+        spans.append((0, end.end(), rule.token))
+        pos = end.end()
+
+    search = rules.pattern.search
+    while True:
+        m = search(text, pos)
+        if m is None:
+            return spans, 0
+        token = m.lastgroup
+        if token.startswith("ml"):
+            index = int(token[2:])
+            rule = rules.multiline[index]
+            end = rules.end_patterns[index].match(text, m.end())
+            if end is None:
+                spans.append((m.start(), len(text) - m.start(), rule.token))
+                return spans, index + 1
+            spans.append((m.start(), end.end() - m.start(), rule.token))
+            pos = end.end()
+        else:
+            spans.append((m.start(), m.end() - m.start(), token))
+            pos = m.end() if m.end() > m.start() else m.end() + 1
+
+_STRING_PREFIX = r"(?:\b[rRbBuUfF]{1,2})?"
+
+PYTHON = LanguageRules(
+    name="Python",
+    extensions=(".py", ".pyw", ".pyi"),
+    multiline=[
+        MultilineRule("string", _STRING_PREFIX + '"""', r'(?:\\.|[^\\"]|"(?!""))*"""'),
+        MultilineRule("string", _STRING_PREFIX + "'''", r"(?:\\.|[^\\']|'(?!''))*'''"),
+    ],
+    patterns=[
+        ("comment", r"#[^\n]*"),
+        ("string", _STRING_PREFIX + r'"(?:\\.|[^"\\\n])*"?|' + _STRING_PREFIX + r"'(?:\\.|[^'\\\n])*'?"),
+        ("number", r"\b(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?j?)\b"),
+    ],
+    keywords=[
+        "and", "as", "assert", "async", "await", "break", "class", "continue", "def",
+        "del", "elif", "else", "except", "False", "finally", "for",
+        "from", "global", "if", "import", "in", "is", "lambda", "None",
+        "nonlocal", "not", "or", "pass", "raise", "return", "True",
+        "try", "while", "with", "yield"
+    ],
+)
+
+JSON = LanguageRules(
+    name="JSON",
+    extensions=(".json",),
+    patterns=[
+        ("string", r'"(?:\\.|[^"\\\n])*"?'),
+        ("number", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+    ],
+    keywords=["true", "false", "null"],
+)
+
+_LANGUAGES: Dict[str, LanguageRules] = {}
+
+def register_language(rules: LanguageRules):
+    """Make a rule set available for files with its extensions"""
+    for extension in rules.extensions:
+        _LANGUAGES[extension.lower()] = rules
+
+def language_for_path(path: Optional[str]) -> Optional[LanguageRules]:
+    """Rule set for a file path, or None for plain text"""
+    if not path:
+        return None
+    return _LANGUAGES.get(Path(path).suffix.lower())
+
+def language_by_name(name: str) -> Optional[LanguageRules]:
+    """Rule set by language name or extension, e.g. for fenced code block info strings"""
+    name = name.strip().lower()
+    for rules in _LANGUAGES.values():
+        if rules.name.lower() == name:
+            return rules
+    return _LANGUAGES.get("." + name)
+
+register_language(PYTHON)
+register_language(JSON)
+
+class SyntaxHighlighter(QSyntaxHighlighter):
+    """
+    Single-pass highlighter driven by a LanguageRules set. Multi-line
+    constructs are tracked with the block state, so only lines whose state
+    changes cause the following lines to be re-highlighted
+    """
+
+    def __init__(self, parent=None, rules: Optional[LanguageRules] = None):
+        super().__init__(parent)
+        self.rules = rules
+        self.formats = {}
+        for token, color in THEME.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            self.formats[token] = fmt
+
+    def set_language(self, rules: Optional[LanguageRules]):
+        """Switch rule sets (None for plain text) and re-highlight the document"""
+        if rules is not self.rules:
+            self.rules = rules
+            with get_tracer().span("editor.rehighlight"):
+                self.rehighlight()
+
+    def highlightBlock(self, text):
+        if self.rules is None:
+            return
+        if not text:
+            # Nothing to colour; an empty line only carries the state over
+            self.setCurrentBlockState(max(0, self.previousBlockState()))
+            return
+        spans, state = scan_line(self.rules, text, max(0, self.previousBlockState()))
+        formats = self.formats
+        for start, length, token in spans:
+            self.setFormat(start, length, formats[token])
+        self.setCurrentBlockState(state)